@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Main.settings')
 
 application = get_asgi_application()
+
+# Model warm-up and watcher run in server processes only, not in manage.py commands
+from Moodflix.views import start_server_tasks  # noqa: E402
+
+start_server_tasks()
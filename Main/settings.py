@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Moodflix.metrics.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -118,8 +120,89 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+# Caches
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Point 'default' at a shared backend (Redis, Memcached) to share poster
+# lookups across workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Serialized /recommendations/ responses, keyed by request + model version
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'moodflix-responses',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Movie recommender settings
 MOVIE_DATA_PATH = BASE_DIR / 'data' / 'processed_movies.pkl'
-
+# Memory-mapped model bundle (manage.py export_model_bundle); used instead
+# of the pickles in Data/ when present
+MODEL_BUNDLE_DIR = os.environ.get('MOODFLIX_MODEL_BUNDLE', BASE_DIR / 'Data' / 'model_bundle')
+# Offset paging on /recommendations/: most titles per page, and deepest
+# offset + count served (each page re-selects every title before it)
+RECOMMENDATIONS_MAX_COUNT = 50
+RECOMMENDATIONS_MAX_DEPTH = 500
+# Cursor paging on /recommendations/: the candidate pool covers this many
+# pages of at most CURSOR_MAX_COUNT titles (larger counts are clamped), and
+# cursors expire after CURSOR_MAX_AGE seconds
+CURSOR_MAX_PAGES = 50
+CURSOR_MAX_COUNT = 50
+CURSOR_MAX_AGE = 60 * 60 * 6
+# /recommendations/ response cache and HTTP caching headers
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TTL = 60 * 60
+RESPONSE_CACHE_MAX_AGE = 300
+# Largest batch of mood blends accepted by /mixed-mood/, and most titles per blend
+MIXED_MOOD_MAX_BLENDS = 20
+MIXED_MOOD_MAX_COUNT = 50
+# /similar/ limits
+SIMILAR_MAX_IDS = 50
+SIMILAR_MAX_K = 100
+# Titles already served per session ("exclude_seen"): sessions kept in
+# memory, how many changed sessions / seconds before writing them back,
+# and seconds before re-reading a session other workers may have served
+SEEN_CACHE_SIZE = 10000
+SEEN_FLUSH_BATCH = 100
+SEEN_FLUSH_INTERVAL = 30
+SEEN_CACHE_TTL = 30
+# Genre profiles built from UserPreference ("personalize"): sessions kept in
+# memory, and seconds before re-reading preferences edited through another worker
+PREFERENCE_CACHE_SIZE = 10000
+PREFERENCE_CACHE_TTL = 60
+# Most titles one /surprise/ request can draw
+SURPRISE_MAX_COUNT = 50
+# Largest result list /search/ returns
+SEARCH_MAX_LIMIT = 50
+# Per-stage timings in a Server-Timing response header (the /metrics
+# histograms are always kept); turn off to hide them from clients
+SERVER_TIMING_HEADER = os.environ.get('MOODFLIX_SERVER_TIMING', '1') == '1'
+
+# Where /recommendations/ reads from: "memory" (the loaded model) or
+# "database" (indexed Movie queries and stored content vectors, no model in RAM).
+# /mixed-mood/, /similar/, /search/ and /surprise/ need the model and
+# answer 501 in database mode.
+RECOMMENDATION_BACKEND = os.environ.get('MOODFLIX_BACKEND', 'memory')
+
+# Load the model in a background thread when a server process starts
+# (Main/wsgi.py, Main/asgi.py; see /health/ready)
+MOODFLIX_WARMUP = os.environ.get('MOODFLIX_WARMUP', '0') == '1'
+# Seconds between checks for new model artifacts (0 = never reload)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MOODFLIX_MODEL_WATCH_INTERVAL', '0'))
+# Shared secret for POST /model/reload (empty = endpoint disabled)
+MODEL_RELOAD_TOKEN = os.environ.get('MOODFLIX_RELOAD_TOKEN', '')
+
+# TMDB poster lookups
+TMDB_API_URL = os.environ.get('TMDB_API_URL', 'https://api.themoviedb.org/3')
+TMDB_API_KEY = os.environ.get('TMDB_API_KEY', 'f1c2574ff595316f099a277d206ba900')
+TMDB_TIMEOUT = 2.0          # seconds per HTTP call
+TMDB_DEADLINE = 1.5         # seconds to wait for all posters of one response
+TMDB_MAX_WORKERS = 8        # concurrent TMDB calls per process
+POSTER_LRU_SIZE = 4096
+POSTER_CACHE_ALIAS = 'default'
+POSTER_CACHE_TTL = 60 * 60 * 24 * 7
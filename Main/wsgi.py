@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Main.settings')
 
 application = get_wsgi_application()
+
+# Model warm-up and watcher run in server processes only, not in manage.py commands
+from Moodflix.views import start_server_tasks  # noqa: E402
+
+start_server_tasks()
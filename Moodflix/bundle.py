@@ -0,0 +1,153 @@
+"""
+Model bundle: a directory of .npy arrays plus manifest.json.
+
+Arrays are opened with np.load(mmap_mode="r"), so every worker process on
+a host maps the same file pages instead of unpickling its own copy.
+Object columns of the catalog (titles, overviews, cast lists) cannot be
+memory-mapped and are kept in a pickle. File names carry the bundle
+version; manifest.json names the current ones.
+"""
+import hashlib
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+from scipy import sparse
+
+from .similarity import NeighborGraph
+
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def export_bundle(path, movies_df, content_matrix, neighbor_graph):
+    """
+    Write a bundle directory and return its manifest.
+
+    Live workers may have the current files memory-mapped, so nothing
+    is written in place. Files carry the version in their name and are
+    written to a temp name, fsynced and renamed. The manifest is swapped
+    last, and files of versions older than the previous one are removed.
+    A worker still holding the previous manifest can open its files.
+    Removing a file does not disturb the mappings of a worker that has
+    it open.
+    """
+    os.makedirs(path, exist_ok=True)
+    arrays = {}
+
+    if content_matrix is not None:
+        content_matrix = sparse.csr_matrix(content_matrix)
+        content_matrix.sum_duplicates()
+        arrays["content_data"] = content_matrix.data
+        arrays["content_indices"] = content_matrix.indices
+        arrays["content_indptr"] = content_matrix.indptr
+
+    if neighbor_graph is not None:
+        arrays.update(neighbor_graph.to_dict())
+
+    digest = hashlib.sha256()
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    for name, array in arrays.items():
+        digest.update(name.encode())
+        digest.update(array.tobytes())
+    catalog_bytes = pickle.dumps(movies_df, protocol=pickle.HIGHEST_PROTOCOL)
+    digest.update(catalog_bytes)
+    version = digest.hexdigest()[:16]
+
+    manifest_arrays = {}
+    for name, array in arrays.items():
+        filename = f"{name}.{version}.npy"
+        _write_file(path, filename, lambda f, array=array: np.save(f, array))
+        manifest_arrays[name] = {"file": filename, "dtype": str(array.dtype), "shape": list(array.shape)}
+    catalog_file = f"catalog.{version}.pkl"
+    _write_file(path, catalog_file, lambda f: f.write(catalog_bytes))
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "movies": len(movies_df),
+        "content_shape": list(content_matrix.shape) if content_matrix is not None else None,
+        "arrays": manifest_arrays,
+        "catalog": catalog_file,
+    }
+    previous = read_manifest(path) if bundle_exists(path) else None
+    # The manifest is written last, so a half-written bundle is never picked up
+    _write_file(path, MANIFEST, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+    keep = {MANIFEST} | manifest_files(manifest) | (manifest_files(previous) if previous else set())
+    for name in os.listdir(path):
+        if name not in keep and (name.endswith((".npy", ".pkl")) or name.endswith(".tmp")):
+            os.remove(os.path.join(path, name))
+    return manifest
+
+
+def _write_file(path, filename, write):
+    """Write through a temp file, fsync it and rename it over filename."""
+    tmp_path = os.path.join(path, f"{filename}.tmp")
+    with open(tmp_path, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(path, filename))
+    dir_fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def manifest_files(manifest):
+    return {spec["file"] for spec in manifest["arrays"].values()} | {manifest["catalog"]}
+
+
+def bundle_exists(path):
+    return os.path.exists(os.path.join(path, MANIFEST))
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model bundle format {manifest.get('format')} in {path}")
+    return manifest
+
+
+def load_bundle(path):
+    """
+    Open a bundle. Returns (movies_df, content_matrix, neighbor_graph, manifest).
+
+    The CSR and neighbor arrays stay memory-mapped and read-only.
+    """
+    manifest = read_manifest(path)
+    arrays = {
+        name: np.load(os.path.join(path, spec["file"]), mmap_mode="r")
+        for name, spec in manifest["arrays"].items()
+    }
+
+    with open(os.path.join(path, manifest["catalog"]), "rb") as f:
+        movies_df = pickle.load(f)
+
+    content_matrix = None
+    if "content_data" in arrays:
+        content_matrix = sparse.csr_matrix(
+            (arrays["content_data"], arrays["content_indices"], arrays["content_indptr"]),
+            shape=tuple(manifest["content_shape"]),
+            copy=False,
+        )
+        content_matrix.has_canonical_format = True
+
+    neighbor_graph = None
+    if "neighbor_indptr" in arrays:
+        neighbor_graph = NeighborGraph.from_dict(arrays, content_matrix=content_matrix)
+
+    return movies_df, content_matrix, neighbor_graph, manifest
+
+
+def bundle_nbytes(path):
+    """Size of the current version's files (the previous version may still be on disk)."""
+    names = manifest_files(read_manifest(path)) | {MANIFEST}
+    return sum(os.path.getsize(os.path.join(path, name)) for name in names)
@@ -0,0 +1,77 @@
+"""
+Pre-serialized movie cards.
+
+Every catalog row is formatted and JSON-encoded once at model load.
+The card bytes stop just before "poster_path" (posters are resolved per
+response). All cards sit in one contiguous buffer, indexed by an offset
+array. A response is then assembled by joining byte slices. Its body is
+byte-for-byte what json.dumps gives for the same formatted dicts.
+"""
+import json
+
+import numpy as np
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+# Columns format_movie_row reads
+CARD_COLUMNS = [
+    "id", "title", "overview", "genre_names", "vote_average", "vote_count", "release_date", "runtime",
+    "cast_names", "director", "poster_path",
+]
+
+
+def dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder).encode()
+
+
+class CardStore:
+    def __init__(self, buffer, offsets, ids, posters):
+        self.buffer = buffer
+        # Card i is buffer[offsets[i]:offsets[i + 1]]
+        self.offsets = offsets
+        self.ids = ids
+        # Stored poster paths, the fallback when TMDB has nothing
+        self.posters = posters
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return len(self.buffer) + self.offsets.nbytes + self.ids.nbytes
+
+    def cards(self, positions, posters):
+        """Complete card JSON per position, with the given poster paths."""
+        offsets = self.offsets
+        return [
+            self.buffer[offsets[pos]:offsets[pos + 1]] + b', "poster_path": ' + dumps(poster) + b"}"
+            for pos, poster in zip(np.asarray(positions).tolist(), posters)
+        ]
+
+
+def build_card_store(movies_df, format_row):
+    """Encode format_row(row) for every row of the catalog into one buffer."""
+    columns = [column for column in CARD_COLUMNS if column in movies_df.columns]
+    # Plain dicts answer get/[]/in like the Series format_row is written for
+    records = movies_df[columns].to_dict("records")
+
+    chunks, posters = [], []
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    for i, record in enumerate(records):
+        card = format_row(record)
+        posters.append(card.pop("poster_path"))
+        chunk = dumps(card)[:-1]
+        chunks.append(chunk)
+        offsets[i + 1] = offsets[i] + len(chunk)
+    return CardStore(b"".join(chunks), offsets, movies_df["id"].to_numpy(np.int64), posters)
+
+
+def payload(fields, key, cards, tail=None):
+    """
+    json.dumps({**fields, key: [cards...], **tail}) with the cards already
+    encoded.
+    """
+    body = dumps(fields)[:-1] + (b", " if fields else b"") + dumps(key) + b": [" + b", ".join(cards) + b"]"
+    for name, value in (tail or {}).items():
+        body += b", " + dumps(name) + b": " + dumps(value)
+    return body + b"}"
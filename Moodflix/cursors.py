@@ -0,0 +1,84 @@
+"""
+Cursor pagination for mood recommendations.
+
+A cursor is a signed, compressed token carrying the selection state: the
+pool it was drawn from and the pool indices already served. The next page
+rebuilds the running similarity sums with one sparse product and
+continues the greedy selection from there, instead of re-selecting every
+earlier page as offset paging does.
+
+The pool covers CURSOR_MAX_PAGES pages (count * 5 candidates per page)
+while offset paging draws from offset + count pages' worth, so the first
+cursor page is not the same as offset page 0: the diversity selection
+weighs different candidates.
+"""
+from django.conf import settings
+from django.core import signing
+
+from .diversity import DiverseSelection
+from .similarity import PoolSimilarity
+
+
+CURSOR_SALT = "moodflix.recommendations.cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(state):
+    return signing.dumps(state, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token):
+    if not isinstance(token, str):
+        raise InvalidCursor("Invalid or expired cursor")
+    try:
+        return signing.loads(token, salt=CURSOR_SALT, max_age=settings.CURSOR_MAX_AGE)
+    except signing.BadSignature as e:
+        raise InvalidCursor("Invalid or expired cursor") from e
+
+
+def recommend_page(sim_graph, rankings, mood, count, diversity_factor, model_version, cursor=None):
+    """
+    One page of mood recommendations.
+
+    Returns (catalog_positions, next_cursor, mood); next_cursor is None
+    once the candidate pool is exhausted, and mood is the cursor's when
+    one is given.
+    """
+    if cursor:
+        state = decode_cursor(cursor)
+        if state["v"] != model_version:
+            raise InvalidCursor("Cursor was issued for a different model version")
+        mood, diversity_factor, pool_size, selected = state["m"], state["d"], state["p"], state["s"]
+    else:
+        pool_size = count * 5 * settings.CURSOR_MAX_PAGES
+        selected = []
+
+    ranking = rankings.for_mood(mood)
+    if ranking is None or len(ranking) == 0:
+        # Fallback: top-rated movies in order
+        pool = rankings.top_rated[:pool_size]
+        pool_sims = PoolSimilarity(None, pool)
+        diversity_factor = 0.0
+    else:
+        pool, _ = ranking.candidates(pool_size)
+        pool_sims = PoolSimilarity(sim_graph, pool)
+
+    selection = DiverseSelection(
+        len(pool), pool_sims.column, diversity_factor,
+        selected=selected, sim_sums=pool_sims.sums(selected),
+    )
+    picks = selection.extend(count)
+
+    next_cursor = None
+    if len(picks) == count and len(selection.selected) < len(pool):
+        next_cursor = encode_cursor({
+            "v": model_version,
+            "m": mood,
+            "d": diversity_factor,
+            "p": pool_size,
+            "s": [int(idx) for idx in selection.selected],
+        })
+    return pool[picks], next_cursor, mood
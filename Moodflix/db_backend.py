@@ -0,0 +1,113 @@
+"""
+Database-backed recommendations.
+
+Candidates come from the indexed mood_<mood> columns (ORDER BY ... LIMIT),
+and diversity uses the packed TF-IDF rows stored on each Movie, so a
+worker serving this backend never loads the catalog DataFrame or the
+similarity model.
+"""
+import numpy as np
+from scipy import sparse
+
+from . import metrics
+from .diversity import select_diverse
+from .models import Movie
+from .moods import MOODS
+from .rankings import composite_scores
+
+
+MOVIE_FIELDS = (
+    "tmdb_id", "title", "overview", "genres", "vote_average", "vote_count", "popularity",
+    "release_date", "runtime", "cast", "director", "poster_path",
+)
+# Packed vectors: uint16 feature ids followed by float16 weights
+_INDEX_DTYPE = np.dtype("<u2")
+_VALUE_DTYPE = np.dtype("<f2")
+
+
+# ---------------------------
+# Packed content vectors
+# ---------------------------
+def pack_vector(indices, values):
+    """One sparse TF-IDF row as bytes, 4 bytes per non-zero."""
+    return (np.asarray(indices, dtype=_INDEX_DTYPE).tobytes() +
+            np.asarray(values, dtype=_VALUE_DTYPE).tobytes())
+
+
+def unpack_vectors(blobs, n_features=None):
+    """CSR matrix with one row per packed vector (empty rows for None)."""
+    indptr = [0]
+    indices, values = [], []
+    for blob in blobs:
+        blob = bytes(blob) if blob else b""
+        nnz = len(blob) // 4
+        indices.append(np.frombuffer(blob, dtype=_INDEX_DTYPE, count=nnz))
+        values.append(np.frombuffer(blob, dtype=_VALUE_DTYPE, count=nnz, offset=2 * nnz))
+        indptr.append(indptr[-1] + nnz)
+    indices = np.concatenate(indices) if indices else np.zeros(0, dtype=_INDEX_DTYPE)
+    values = np.concatenate(values).astype(np.float32) if values else np.zeros(0, dtype=np.float32)
+    if n_features is None:
+        n_features = int(indices.max()) + 1 if len(indices) else 1
+    return sparse.csr_matrix((values, indices.astype(np.int32), indptr), shape=(len(blobs), n_features))
+
+
+def pack_matrix_rows(content_matrix):
+    content_matrix = sparse.csr_matrix(content_matrix)
+    if content_matrix.shape[1] > np.iinfo(_INDEX_DTYPE).max + 1:
+        raise ValueError(f"{content_matrix.shape[1]} features do not fit packed uint16 ids")
+    for start, end in zip(content_matrix.indptr[:-1], content_matrix.indptr[1:]):
+        yield pack_vector(content_matrix.indices[start:end], content_matrix.data[start:end])
+
+
+# ---------------------------
+# Recommendations
+# ---------------------------
+def movie_dict(row):
+    """A values() row in the shape format_movie_row returns."""
+    return {
+        "id": row["tmdb_id"],
+        "title": row["title"],
+        "overview": row["overview"],
+        "genres": row["genres"],
+        "rating": float(row["vote_average"]),
+        "vote_count": int(row["vote_count"]),
+        "release_date": str(row["release_date"] or ""),
+        "runtime": row["runtime"] or None,
+        "cast": row["cast"][:5],
+        "director": row["director"] or "",
+        "poster_path": row["poster_path"] or "",
+    }
+
+
+def mood_candidates(mood, size):
+    """Top `size` movies by one mood column, read through its index."""
+    column = f"mood_{mood}"
+    return list(
+        Movie.objects.order_by(f"-{column}", "tmdb_id")
+        .values(column, "content_vector", *MOVIE_FIELDS)[:size]
+    )
+
+
+def recommend(mood, n=5, diversity_factor=0.3):
+    """Formatted movies for a mood, like get_mood_based_recommendations_proc."""
+    if mood not in MOODS:
+        # Fallback: top-rated movies
+        return [movie_dict(row) for row in Movie.objects.order_by("-vote_average").values(*MOVIE_FIELDS)[:n]]
+
+    with metrics.span("candidates"):
+        rows = mood_candidates(mood, n * 5)
+        if not rows:
+            return []
+        features = np.array([[row[f"mood_{mood}"], row["vote_average"], row["popularity"]] for row in rows]).T
+        composite = composite_scores(features, features.min(axis=1, keepdims=True),
+                                     features.max(axis=1, keepdims=True))
+        rows = [rows[i] for i in np.argsort(-composite, kind="stable")]
+
+    with metrics.span("similarity"):
+        vectors = unpack_vectors([row["content_vector"] for row in rows])
+        sim_block = (vectors @ vectors.T).toarray()
+        np.fill_diagonal(sim_block, 1.0)
+    with metrics.span("diversity"):
+        selected = select_diverse(sim_block, n, diversity_factor)
+    with metrics.span("format"):
+        return [movie_dict(rows[i]) for i in selected]
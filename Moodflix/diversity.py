@@ -0,0 +1,112 @@
+import numpy as np
+
+
+# ---------------------------
+# Diversity re-ranking
+# ---------------------------
+class DiverseSelection:
+    """
+    Resumable greedy diversity selection over a fixed candidate pool.
+
+    Each step scores every remaining candidate as
+
+        (1 - diversity_factor) * position_score + diversity_factor * (1 - avg_sim)
+
+    where avg_sim is its mean similarity to the picks so far. The sum of
+    similarities to the selected set is kept per candidate and updated with
+    one column add per pick, so a step costs O(m) instead of O(m * picks).
+
+    sim_column(i) returns the similarity of every candidate to candidate i.
+    Passing back `selected` and `sim_sums` continues a previous selection.
+    """
+
+    def __init__(self, n_candidates, sim_column, diversity_factor=0.3, selected=(), sim_sums=None):
+        self.sim_column = sim_column
+        self.diversity_factor = diversity_factor
+        self.position_score = 1 - np.arange(n_candidates) / n_candidates if n_candidates else np.zeros(0)
+        self.remaining = np.ones(n_candidates, dtype=bool)
+        self.selected = list(selected)
+        self.remaining[self.selected] = False
+        if sim_sums is None:
+            sim_sums = np.zeros(n_candidates)
+            for idx in self.selected:
+                sim_sums += self.sim_column(idx)
+        self.sim_sums = np.asarray(sim_sums, dtype=np.float64)
+
+    def _pick(self, idx):
+        self.selected.append(idx)
+        self.remaining[idx] = False
+        self.sim_sums += self.sim_column(idx)
+
+    def extend(self, count):
+        """Select up to `count` more candidates and return them."""
+        start = len(self.selected)
+        target = start + count
+
+        # The top-ranked candidate always goes first
+        if not self.selected and self.remaining.any():
+            self._pick(0)
+
+        while len(self.selected) < target and self.remaining.any():
+            diversity_score = 1 - self.sim_sums / len(self.selected)
+            combined = (
+                (1 - self.diversity_factor) * self.position_score +
+                self.diversity_factor * diversity_score
+            )
+            combined[~self.remaining] = -np.inf
+
+            best = int(np.argmax(combined))
+            if not combined[best] > -1:
+                break
+            self._pick(best)
+
+        return self.selected[start:]
+
+
+def select_diverse(sim_block, n, diversity_factor=0.3):
+    """
+    Greedily pick n candidate positions, trading rank for diversity.
+
+    sim_block is the candidates' pairwise similarity matrix, in ranking
+    order. See DiverseSelection for the scoring.
+    """
+    sim_block = np.asarray(sim_block, dtype=np.float64)
+    selection = DiverseSelection(len(sim_block), lambda idx: sim_block[:, idx], diversity_factor)
+    return selection.extend(n)
+
+
+def select_diverse_reference(sim_block, n, diversity_factor=0.3):
+    """
+    The original pure-Python selection loop, kept as the parity baseline
+    for select_diverse in tests and benchmarks.
+    """
+    m = len(sim_block)
+    remaining_indices = list(range(m))
+    selected_indices = []
+
+    if remaining_indices:
+        selected_indices.append(0)
+        remaining_indices.remove(0)
+
+    while len(selected_indices) < n and remaining_indices:
+        max_score = -1
+        best_idx = None
+
+        for idx in remaining_indices:
+            similarities = [sim_block[idx][sel_idx] for sel_idx in selected_indices]
+            avg_sim = np.mean(similarities) if similarities else 0
+            diversity_score = 1 - avg_sim
+            position_score = 1 - (idx / m)
+            combined_score = (1 - diversity_factor) * position_score + diversity_factor * diversity_score
+
+            if combined_score > max_score:
+                max_score = combined_score
+                best_idx = idx
+
+        if best_idx is not None:
+            selected_indices.append(best_idx)
+            remaining_indices.remove(best_idx)
+        else:
+            break
+
+    return selected_indices
@@ -0,0 +1,189 @@
+"""
+Attribute filters for /recommendations/.
+
+At model load, AttributeIndex keeps one packed bitset per genre and,
+for release year, runtime and rating, the catalog positions sorted by
+value. A filter is a few bitset ORs (genres), binary searches (ranges)
+and one AND, all over N / 8 bytes, instead of pandas masks per request.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Range filters, each taking <name>_min / <name>_max parameters
+RANGE_FILTERS = ("year", "runtime", "rating")
+
+
+# ---------------------------
+# Bitsets
+# ---------------------------
+class Bitset:
+    """Fixed set of catalog positions, packed 8 per byte (little bit order)."""
+
+    def __init__(self, bits, n_titles):
+        self.bits = bits
+        self.n_titles = n_titles
+        self.count = int(np.unpackbits(bits, bitorder="little")[:n_titles].sum()) if len(bits) else 0
+
+    @classmethod
+    def from_mask(cls, mask):
+        return cls(np.packbits(mask, bitorder="little"), len(mask))
+
+    @classmethod
+    def from_positions(cls, positions, n_titles):
+        mask = np.zeros(n_titles, dtype=bool)
+        mask[positions] = True
+        return cls.from_mask(mask)
+
+    def __len__(self):
+        return self.count
+
+    def __and__(self, other):
+        return Bitset(self.bits & other.bits, self.n_titles)
+
+    def __or__(self, other):
+        return Bitset(self.bits | other.bits, self.n_titles)
+
+    def __invert__(self):
+        bits = ~self.bits
+        if self.n_titles % 8:
+            # Keep the padding bits of the last byte clear
+            bits[-1] &= (1 << (self.n_titles % 8)) - 1
+        return Bitset(bits, self.n_titles)
+
+    def contains(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        return ((self.bits[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1).astype(bool)
+
+    def positions(self):
+        return np.flatnonzero(np.unpackbits(self.bits, bitorder="little")[:self.n_titles])
+
+
+# ---------------------------
+# Index
+# ---------------------------
+class SortedAttribute:
+    """Positions sorted by one numeric attribute; titles without a value are left out."""
+
+    def __init__(self, values):
+        known = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[known], kind="stable")
+        self.positions = known[order]
+        self.values = values[known][order]
+
+    def between(self, low=None, high=None):
+        start = 0 if low is None else np.searchsorted(self.values, low, side="left")
+        end = len(self.values) if high is None else np.searchsorted(self.values, high, side="right")
+        return self.positions[start:end]
+
+
+class AttributeIndex:
+    def __init__(self, n_titles, genres, ranges):
+        self.n_titles = n_titles
+        # Genre name -> Bitset
+        self.genres = genres
+        # Range name -> SortedAttribute
+        self.ranges = ranges
+
+    @property
+    def nbytes(self):
+        return (sum(bitset.bits.nbytes for bitset in self.genres.values()) +
+                sum(attr.positions.nbytes + attr.values.nbytes for attr in self.ranges.values()))
+
+    def without_genres(self, genres):
+        """Bitset of the titles having none of the genres."""
+        excluded = Bitset(np.zeros((self.n_titles + 7) // 8, dtype=np.uint8), self.n_titles)
+        for genre in genres:
+            if genre in self.genres:
+                excluded = excluded | self.genres[genre]
+        return ~excluded
+
+    def select(self, spec):
+        """
+        Bitset of the titles matching a parse_filters() spec: any of the
+        genres, and every range. None when the spec is empty.
+        """
+        selected = None
+        if spec.get("genres"):
+            empty = Bitset(np.zeros((self.n_titles + 7) // 8, dtype=np.uint8), self.n_titles)
+            selected = empty
+            for genre in spec["genres"]:
+                selected = selected | self.genres.get(genre, empty)
+        for name, (low, high) in spec.get("ranges", {}).items():
+            matching = Bitset.from_positions(self.ranges[name].between(low, high), self.n_titles)
+            selected = matching if selected is None else selected & matching
+        return selected
+
+
+def build_attribute_index(movies_df):
+    n_titles = len(movies_df)
+
+    genres = {}
+    if "genre_names" in movies_df.columns:
+        positions = {}
+        for pos, names in enumerate(movies_df["genre_names"]):
+            if isinstance(names, (list, tuple, np.ndarray)):
+                for name in names:
+                    positions.setdefault(name, []).append(pos)
+        genres = {name: Bitset.from_positions(np.array(pos), n_titles) for name, pos in positions.items()}
+
+    def numeric(column):
+        if column not in movies_df.columns:
+            return np.full(n_titles, np.nan)
+        return pd.to_numeric(movies_df[column], errors="coerce").to_numpy(np.float64, copy=True)
+
+    release = pd.to_datetime(movies_df["release_date"], errors="coerce") if "release_date" in movies_df.columns \
+        else pd.Series(pd.NaT, index=movies_df.index)
+    runtime = numeric("runtime")
+    # The catalog stores unknown runtimes as 0
+    runtime[runtime <= 0] = np.nan
+    ranges = {
+        "year": SortedAttribute(release.dt.year.to_numpy(np.float64)),
+        "runtime": SortedAttribute(runtime),
+        "rating": SortedAttribute(numeric("vote_average")),
+    }
+    return AttributeIndex(n_titles, genres, ranges)
+
+
+# ---------------------------
+# Request parameters
+# ---------------------------
+def parse_filters(data):
+    """
+    Filter spec from request fields:
+
+        genres=Animation,Family (or a JSON list): any of these genres
+        year_min / year_max, runtime_min / runtime_max, rating_min / rating_max:
+        inclusive bounds
+
+    Returns {} when no filter is given; raises ValueError for bad values.
+    """
+    spec = {}
+    genres = data.get("genres")
+    if genres:
+        if isinstance(genres, str):
+            genres = genres.split(",")
+        if not isinstance(genres, list) or not all(isinstance(genre, str) for genre in genres):
+            raise ValueError("genres must be a list of genre names")
+        genres = sorted({genre.strip() for genre in genres if genre.strip()})
+        if genres:
+            spec["genres"] = genres
+
+    ranges = {}
+    for name in RANGE_FILTERS:
+        low, high = data.get(f"{name}_min"), data.get(f"{name}_max")
+        if low in (None, "") and high in (None, ""):
+            continue
+        try:
+            low = None if low in (None, "") else float(low)
+            high = None if high in (None, "") else float(high)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name}_min and {name}_max must be numbers")
+        if not all(bound is None or np.isfinite(bound) for bound in (low, high)):
+            raise ValueError(f"{name}_min and {name}_max must be finite")
+        if low is not None and high is not None and low > high:
+            raise ValueError(f"{name}_min is above {name}_max")
+        ranges[name] = (low, high)
+    if ranges:
+        spec["ranges"] = ranges
+    return spec
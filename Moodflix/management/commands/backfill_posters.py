@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Moodflix.models import Movie
+from Moodflix.posters import get_poster_resolver
+
+
+class RateLimiter:
+    """Token bucket shared by the fetch threads."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Command(BaseCommand):
+    help = "Resolve TMDB poster paths for the catalog and store them on Movie.poster_path"
+
+    def add_arguments(self, parser):
+        default_checkpoint = os.path.join(settings.BASE_DIR, "Data", "poster_backfill.json")
+        parser.add_argument("--rate", type=float, default=40.0, help="Max TMDB requests per second (0 = unlimited)")
+        parser.add_argument("--concurrency", type=int, default=8, help="Parallel TMDB requests")
+        parser.add_argument("--batch-size", type=int, default=500, help="Movies per bulk_update and checkpoint")
+        parser.add_argument("--retries", type=int, default=3, help="Retries per movie on errors and 429s")
+        parser.add_argument("--backoff", type=float, default=0.5, help="Initial retry delay in seconds, doubled per try")
+        parser.add_argument("--checkpoint", default=default_checkpoint, help="File recording the progress of an unfinished run")
+        parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+        parser.add_argument("--force", action="store_true", help="Re-resolve movies that already have a poster_path")
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many movies")
+
+    def handle(self, *args, **options):
+        self.resolver = get_poster_resolver()
+        self.limiter = RateLimiter(options["rate"])
+        self.retries = options["retries"]
+        self.backoff = options["backoff"]
+
+        checkpoint_file = options["checkpoint"]
+        checkpoint = {} if options["restart"] else self.read_checkpoint(checkpoint_file)
+        last_id = checkpoint.get("last_tmdb_id")
+        # Failed in the interrupted run: retried first
+        retry_ids = list(checkpoint.get("failed_tmdb_ids", []))
+
+        queryset = Movie.objects.order_by("tmdb_id").only("id", "tmdb_id", "poster_path")
+        if not options["force"]:
+            queryset = queryset.filter(poster_path__isnull=True)
+        if last_id is not None:
+            self.stdout.write(f"Resuming after tmdb_id {last_id}, retrying {len(retry_ids)} failed movies")
+
+        retry_total = queryset.filter(tmdb_id__in=retry_ids).count()
+        remaining = retry_total + self.pending(queryset, last_id).count()
+        total = remaining if options["limit"] is None else min(remaining, options["limit"])
+        self.stdout.write(f"Resolving posters for {total} movies...")
+
+        done = found = 0
+        failed_ids = []
+        exhausted = False
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            while done < total:
+                size = min(options["batch_size"], total - done)
+                retrying = bool(retry_ids)
+                if retrying:
+                    chunk, retry_ids = retry_ids[:size], retry_ids[size:]
+                    batch = list(queryset.filter(tmdb_id__in=chunk))
+                    if not batch:
+                        continue
+                else:
+                    batch = list(self.pending(queryset, last_id)[:size])
+                    if not batch:
+                        exhausted = True
+                        break
+
+                results = executor.map(self.fetch_with_retry, [movie.tmdb_id for movie in batch])
+                to_update = []
+                for movie, poster_path in zip(batch, results):
+                    if poster_path is None:
+                        failed_ids.append(movie.tmdb_id)
+                        continue
+                    movie.poster_path = poster_path
+                    found += bool(poster_path)
+                    to_update.append(movie)
+
+                Movie.objects.bulk_update(to_update, ["poster_path"], batch_size=options["batch_size"])
+
+                done += len(batch)
+                if not retrying:
+                    last_id = batch[-1].tmdb_id
+                self.write_checkpoint(checkpoint_file, last_id, retry_ids + failed_ids)
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"  {done}/{total} movies, {done / elapsed:.1f} titles/s")
+
+        if exhausted or done >= remaining:
+            # Finished: the next run starts over, which also retries the
+            # failed movies (their poster_path is still empty)
+            self.clear_checkpoint(checkpoint_file)
+
+        failed = len(failed_ids)
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {done} movies in {elapsed:.1f}s ({rate:.1f} titles/s): "
+            f"{found} posters, {done - found - failed} without poster, {failed} failed"
+        ))
+
+    @staticmethod
+    def pending(queryset, last_id):
+        if last_id is None:
+            return queryset
+        return queryset.filter(tmdb_id__gt=last_id)
+
+    def fetch_with_retry(self, tmdb_id):
+        """Poster path, "" when TMDB has none, or None after all retries fail."""
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                return self.resolver.fetch(tmdb_id)
+            except requests.HTTPError as e:
+                retry_after = e.response.headers.get("Retry-After") if e.response is not None else None
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+            except requests.RequestException:
+                pass
+            if attempt < self.retries:
+                time.sleep(delay)
+                delay *= 2
+        return None
+
+    @staticmethod
+    def read_checkpoint(path):
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def write_checkpoint(path, last_id, failed_ids):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"last_tmdb_id": last_id, "failed_tmdb_ids": failed_ids}, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def clear_checkpoint(path):
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,74 @@
+import json
+import os
+import pickle
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Moodflix.bundle import export_bundle
+from Moodflix.model_build import StageTimer, block_size_for, combined_features, fit_content_matrix
+from Moodflix.similarity import DEFAULT_TOP_K, build_neighbor_graph
+
+
+class Command(BaseCommand):
+    help = "Build ml_model.pkl (TF-IDF matrix and top-k neighbor graph) from processed_movies.pkl"
+
+    def add_arguments(self, parser):
+        data_dir = os.path.join(settings.BASE_DIR, "Data")
+        parser.add_argument("--movies", default=os.path.join(data_dir, "processed_movies.pkl"))
+        parser.add_argument("--output", default=os.path.join(data_dir, "ml_model.pkl"))
+        parser.add_argument("--k", type=int, default=DEFAULT_TOP_K, help="Neighbors kept per movie")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Similarity worker processes")
+        parser.add_argument("--max-block-mb", type=float, default=256,
+                            help="Memory budget of one dense similarity block per worker")
+        parser.add_argument("--bundle", default=None, help="Also export a model bundle to this directory")
+        parser.add_argument("--stats", default=None, help="Write per-stage timings and peak memory as JSON")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["movies"]):
+            raise CommandError(f"{options['movies']} not found")
+
+        timer = StageTimer(log=self.stdout.write)
+        with timer("load catalog"):
+            with open(options["movies"], "rb") as f:
+                movies_df = pickle.load(f)
+
+        with timer("tf-idf"):
+            content_matrix = fit_content_matrix(combined_features(movies_df))
+
+        n_rows = content_matrix.shape[0]
+        block_size = block_size_for(n_rows, options["max_block_mb"])
+        step = max(1, n_rows // 20)
+        self.stdout.write(f"Similarity over {n_rows} movies: blocks of {block_size} rows, "
+                          f"{options['workers']} worker(s)")
+
+        def progress(done, total):
+            if done % step < block_size or done == total:
+                self.stdout.write(f"  {done}/{total} rows")
+
+        with timer("neighbor graph"):
+            graph = build_neighbor_graph(content_matrix, k=options["k"], block_size=block_size,
+                                         progress=progress, workers=options["workers"])
+
+        with timer("write model"):
+            # Only what load_ml_model reads: no vectorizer, no dense matrix
+            model_data = {"content_matrix": content_matrix}
+            model_data.update(graph.to_dict())
+            os.makedirs(os.path.dirname(options["output"]) or ".", exist_ok=True)
+            with open(options["output"], "wb") as f:
+                pickle.dump(model_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        if options["bundle"]:
+            with timer("write bundle"):
+                export_bundle(options["bundle"], movies_df, content_matrix, graph)
+
+        total = sum(stage["seconds"] for stage in timer.stages)
+        if options["stats"]:
+            with open(options["stats"], "w") as f:
+                json.dump({"movies": n_rows, "block_size": block_size, "workers": options["workers"],
+                           "total_seconds": round(total, 3), "stages": timer.stages}, f, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['output']}: {n_rows} movies, {content_matrix.shape[1]} features, "
+            f"k={graph.k}, {graph.nbytes / 1e6:.1f} MB neighbor graph in {total:.1f}s"
+        ))
@@ -0,0 +1,53 @@
+import os
+import pickle
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Moodflix.similarity import DEFAULT_BLOCK_SIZE, DEFAULT_TOP_K, build_neighbor_graph
+
+
+class Command(BaseCommand):
+    help = "Rewrite ml_model.pkl with a top-k neighbor graph instead of the dense cosine_sim_matrix"
+
+    def add_arguments(self, parser):
+        default_model = os.path.join(settings.BASE_DIR, "Data", "ml_model.pkl")
+        parser.add_argument("--input", default=default_model, help="Model pickle to read")
+        parser.add_argument("--output", default=None, help="Where to write the new pickle (defaults to --input)")
+        parser.add_argument("--k", type=int, default=DEFAULT_TOP_K, help="Neighbors kept per movie")
+        parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="Rows per similarity block")
+
+    def handle(self, *args, **options):
+        model_file = options["input"]
+        output_file = options["output"] or model_file
+
+        if not os.path.exists(model_file):
+            raise CommandError(f"{model_file} not found")
+
+        with open(model_file, "rb") as f:
+            model_data = pickle.load(f)
+
+        content_matrix = model_data.get("content_matrix")
+        if content_matrix is None:
+            raise CommandError("Model has no content_matrix to build the neighbor graph from")
+
+        def progress(done, total):
+            self.stdout.write(f"  {done}/{total} rows")
+
+        start = time.perf_counter()
+        graph = build_neighbor_graph(
+            content_matrix, k=options["k"], block_size=options["block_size"], progress=progress
+        )
+        elapsed = time.perf_counter() - start
+
+        model_data.pop("cosine_sim_matrix", None)
+        model_data.update(graph.to_dict())
+
+        with open(output_file, "wb") as f:
+            pickle.dump(model_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {output_file}: {len(graph)} movies, k={graph.k}, "
+            f"{graph.nbytes / 1e6:.1f} MB neighbor graph in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,28 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Moodflix.bundle import bundle_nbytes, export_bundle
+from Moodflix.views import load_model_pickles
+
+
+class Command(BaseCommand):
+    help = "Export processed_movies.pkl and ml_model.pkl as a memory-mappable model bundle"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movies", default=os.path.join(settings.BASE_DIR, "Data", "processed_movies.pkl"))
+        parser.add_argument("--model", default=os.path.join(settings.BASE_DIR, "Data", "ml_model.pkl"))
+        parser.add_argument("--output", default=str(settings.MODEL_BUNDLE_DIR), help="Bundle directory to write")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        movies_df, content_matrix, neighbor_graph = load_model_pickles(options["movies"], options["model"])
+        manifest = export_bundle(options["output"], movies_df, content_matrix, neighbor_graph)
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote bundle {manifest['version']} to {options['output']}: {manifest['movies']} movies, "
+            f"{bundle_nbytes(options['output']) / 1e6:.1f} MB in {elapsed:.1f}s"
+        ))
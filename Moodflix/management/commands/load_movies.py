@@ -0,0 +1,155 @@
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from Moodflix.models import Movie
+from Moodflix.moods import MOODS, mood_column
+
+
+MOOD_FIELDS = [f"mood_{mood}" for mood in MOODS]
+# Fields the catalog owns; poster_path is filled by backfill_posters and left alone
+CATALOG_FIELDS = [
+    "title", "overview", "release_date", "runtime", "vote_average", "vote_count",
+    "popularity", "genres", "cast", "director",
+] + MOOD_FIELDS
+
+
+def catalog_columns(movies_df):
+    """
+    Movie field values for every row of processed_movies.pkl, one list per
+    field, converted column-wise instead of row by row.
+    """
+    def numeric(name, default=0.0):
+        if name not in movies_df:
+            return np.full(len(movies_df), default, dtype=np.float64)
+        return pd.to_numeric(movies_df[name], errors="coerce").fillna(default).to_numpy(np.float64)
+
+    def text(name):
+        if name not in movies_df:
+            return [""] * len(movies_df)
+        return movies_df[name].fillna("").astype(str).tolist()
+
+    def lists(name):
+        if name not in movies_df:
+            return [[] for _ in range(len(movies_df))]
+        return [list(value) if isinstance(value, (list, tuple, np.ndarray)) else [] for value in movies_df[name]]
+
+    release_dates = (pd.to_datetime(movies_df["release_date"], format="%Y-%m-%d", errors="coerce")
+                     if "release_date" in movies_df else None)
+    runtimes = numeric("runtime")
+
+    columns = {
+        "tmdb_id": movies_df["id"].astype(np.int64).tolist(),
+        "title": text("title"),
+        "overview": text("overview"),
+        "release_date": [None if pd.isna(d) else d.date() for d in release_dates]
+        if release_dates is not None else [None] * len(movies_df),
+        "runtime": [int(r) if r else None for r in runtimes.tolist()],
+        "vote_average": numeric("vote_average").tolist(),
+        "vote_count": numeric("vote_count").astype(np.int64).tolist(),
+        "popularity": numeric("popularity").tolist(),
+        "genres": lists("genre_names"),
+        "cast": lists("cast_names"),
+        "director": text("director"),
+    }
+    moods = movies_df.reindex(columns=[mood_column(mood) for mood in MOODS], fill_value=0.0)
+    moods = moods.apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy(np.float64)
+    for field, values in zip(MOOD_FIELDS, moods.T):
+        columns[field] = values.tolist()
+    return columns
+
+
+def changed_fields(existing, row):
+    return [field for field, value in zip(CATALOG_FIELDS, existing) if row[field] != value]
+
+
+class Command(BaseCommand):
+    help = "Upsert processed_movies.pkl into the Movie table by tmdb_id, writing only new or changed rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pickle", default=os.path.join(settings.BASE_DIR, "Data", "processed_movies.pkl"))
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows compared and written per batch")
+        parser.add_argument("--prune", action="store_true", help="Delete movies that are no longer in the catalog")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+        parser.add_argument("--show", type=int, default=10, help="Changed movies to list in a dry run")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["pickle"], "rb") as f:
+                movies_df = pickle.load(f)
+        except FileNotFoundError:
+            raise CommandError(f"{options['pickle']} not found")
+
+        start = time.perf_counter()
+        duplicated = movies_df["id"].duplicated(keep="last")
+        if duplicated.any():
+            self.stderr.write(f"Skipping {int(duplicated.sum())} duplicate tmdb_ids (keeping the last row)")
+            movies_df = movies_df[~duplicated]
+        columns = catalog_columns(movies_df)
+        total = len(movies_df)
+        self.stdout.write(f"Converted {total} movies in {time.perf_counter() - start:.2f}s")
+
+        created = updated = unchanged = 0
+        shown = 0
+        batch_size = options["batch_size"]
+
+        fields = list(columns)
+        with transaction.atomic():
+            for offset in range(0, total, batch_size):
+                end = min(offset + batch_size, total)
+                rows = [dict(zip(fields, values)) for values in zip(*(columns[f][offset:end] for f in fields))]
+                existing = {
+                    values[0]: values[1:]
+                    for values in Movie.objects.filter(tmdb_id__in=[row["tmdb_id"] for row in rows])
+                    .values_list("tmdb_id", *CATALOG_FIELDS)
+                }
+
+                to_write = []
+                for row in rows:
+                    current = existing.get(row["tmdb_id"])
+                    if current is None:
+                        created += 1
+                    else:
+                        changed = changed_fields(current, row)
+                        if not changed:
+                            unchanged += 1
+                            continue
+                        updated += 1
+                        if options["dry_run"] and shown < options["show"]:
+                            shown += 1
+                            self.stdout.write(f"  ~ {row['tmdb_id']} {row['title']}: {', '.join(changed)}")
+                    to_write.append(Movie(**row))
+
+                if to_write and not options["dry_run"]:
+                    Movie.objects.bulk_create(
+                        to_write,
+                        update_conflicts=True,
+                        unique_fields=["tmdb_id"],
+                        update_fields=CATALOG_FIELDS + ["updated_at"],
+                    )
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"  {end}/{total} movies, {end / elapsed:.0f} rows/s")
+
+            removed = 0
+            if options["prune"]:
+                stale = sorted(set(Movie.objects.values_list("tmdb_id", flat=True)) - set(columns["tmdb_id"]))
+                removed = len(stale)
+                if not options["dry_run"]:
+                    for offset in range(0, removed, batch_size):
+                        Movie.objects.filter(tmdb_id__in=stale[offset:offset + batch_size]).delete()
+
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed else 0.0
+        verb = "Would write" if options["dry_run"] else "Wrote"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {created} new and {updated} changed movies, {unchanged} unchanged, "
+            f"{removed} {'to remove' if options['dry_run'] else 'removed'} "
+            f"({total} rows in {elapsed:.1f}s, {rate:.0f} rows/s)"
+        ))
@@ -0,0 +1,57 @@
+import os
+import pickle
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from Moodflix.db_backend import pack_matrix_rows
+from Moodflix.models import Movie
+
+
+class Command(BaseCommand):
+    help = "Store each movie's packed TF-IDF row on the Movie table for the database recommendation backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movies", default=os.path.join(settings.BASE_DIR, "Data", "processed_movies.pkl"))
+        parser.add_argument("--model", default=os.path.join(settings.BASE_DIR, "Data", "ml_model.pkl"))
+        parser.add_argument("--batch-size", type=int, default=1000, help="Movies written per batch")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["movies"], "rb") as f:
+                movies_df = pickle.load(f)
+            with open(options["model"], "rb") as f:
+                content_matrix = pickle.load(f).get("content_matrix")
+        except FileNotFoundError as e:
+            raise CommandError(f"{e.filename} not found")
+        if content_matrix is None:
+            raise CommandError("Model has no content_matrix to store")
+        if content_matrix.shape[0] != len(movies_df):
+            raise CommandError(f"content_matrix has {content_matrix.shape[0]} rows for {len(movies_df)} movies")
+
+        start = time.perf_counter()
+        try:
+            vectors = dict(zip(movies_df["id"].astype(int).tolist(), pack_matrix_rows(content_matrix)))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        stored = total_bytes = 0
+        batch_size = options["batch_size"]
+        ids = list(Movie.objects.filter(tmdb_id__in=list(vectors)).values_list("id", "tmdb_id"))
+        with transaction.atomic():
+            for offset in range(0, len(ids), batch_size):
+                batch = [Movie(id=pk, tmdb_id=tmdb_id, content_vector=vectors[tmdb_id])
+                         for pk, tmdb_id in ids[offset:offset + batch_size]]
+                Movie.objects.bulk_update(batch, ["content_vector"])
+                stored += len(batch)
+                total_bytes += sum(len(movie.content_vector) for movie in batch)
+
+        missing = len(vectors) - stored
+        if missing:
+            self.stderr.write(f"{missing} catalog movies are not in the Movie table (run load_movies first)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {stored} content vectors, {total_bytes / 1e6:.1f} MB "
+            f"({total_bytes / max(stored, 1):.0f} bytes/movie) in {time.perf_counter() - start:.1f}s"
+        ))
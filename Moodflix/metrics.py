@@ -0,0 +1,204 @@
+"""
+In-process request metrics.
+
+span("candidates") times one stage of a request. The duration goes to
+a per-stage histogram. It is also listed in the response's
+Server-Timing header when ServerTimingMiddleware is handling the
+request. Counters (TMDB calls, errors) and the histograms are rendered
+in the Prometheus text format by the /metrics view. Everything is per
+process: Prometheus scrapes each worker and sums.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from django.conf import settings
+
+
+# Histogram bucket upper bounds in seconds (+Inf is implied)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+# Recent durations kept per histogram for the quantiles
+RECENT_SAMPLES = 2048
+
+COUNTERS = {
+    "tmdb_requests_total": "TMDB poster lookups sent",
+    "tmdb_errors_total": "TMDB poster lookups that failed (HTTP error, timeout, bad JSON)",
+    "tmdb_deadline_misses_total": "TMDB poster lookups still running at the response deadline",
+}
+
+
+# ---------------------------
+# Histograms and counters
+# ---------------------------
+class Histogram:
+    """Cumulative bucket counts plus a window of recent values for quantiles."""
+
+    def __init__(self, buckets=BUCKETS, recent=RECENT_SAMPLES):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+            self.recent.append(seconds)
+
+    def quantiles(self, qs=QUANTILES):
+        with self._lock:
+            recent = np.fromiter(self.recent, dtype=np.float64, count=len(self.recent))
+        if not len(recent):
+            return {q: None for q in qs}
+        return dict(zip(qs, np.quantile(recent, qs).tolist()))
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+_histograms = {}
+_counters = dict.fromkeys(COUNTERS, 0)
+_registry_lock = threading.Lock()
+
+
+def histogram(family, label):
+    key = (family, label)
+    hist = _histograms.get(key)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(key, Histogram())
+    return hist
+
+
+def increment(name, amount=1):
+    with _registry_lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def counter(name):
+    return _counters.get(name, 0)
+
+
+def reset():
+    with _registry_lock:
+        _histograms.clear()
+        for name in _counters:
+            _counters[name] = 0
+
+
+# ---------------------------
+# Spans
+# ---------------------------
+# (stage, seconds) pairs of the request being handled, for Server-Timing
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+def record(stage, seconds):
+    histogram("stage", stage).observe(seconds)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+class span:
+    """Context manager timing one stage (a class: about half the cost of @contextmanager)."""
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def server_timing(spans, total):
+    """Server-Timing header value; repeated stages are summed, in first-seen order."""
+    durations = {}
+    for stage, seconds in spans:
+        durations[stage] = durations.get(stage, 0.0) + seconds
+    durations["total"] = total
+    return ", ".join(f"{stage};dur={seconds * 1e3:.2f}" for stage, seconds in durations.items())
+
+
+class ServerTimingMiddleware:
+    """Collects a request's spans, times the whole request per view and sets Server-Timing."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        spans = []
+        token = _request_spans.set(spans)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_spans.reset(token)
+        total = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        histogram("request", match.url_name if match and match.url_name else "other").observe(total)
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = server_timing(spans, total)
+        return response
+
+
+# ---------------------------
+# Prometheus text format
+# ---------------------------
+def _number(value):
+    return "NaN" if value is None else repr(float(value))
+
+
+def _histogram_lines(name, family, label, help_text):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    quantile_lines = []
+    with _registry_lock:
+        histograms = sorted(_histograms.items(), key=lambda item: item[0])
+    for (hist_family, value), hist in histograms:
+        if hist_family != family:
+            continue
+        counts, total, count = hist.snapshot()
+        cumulative = 0
+        for bound, bucket_count in zip(list(hist.buckets) + ["+Inf"], counts):
+            cumulative += bucket_count
+            le = bound if bound == "+Inf" else repr(float(bound))
+            lines.append(f'{name}_bucket{{{label}="{value}",le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{label}="{value}"}} {_number(total)}')
+        lines.append(f'{name}_count{{{label}="{value}"}} {count}')
+        for q, seconds in hist.quantiles().items():
+            quantile_lines.append(f'{name}_recent{{{label}="{value}",quantile="{q}"}} {_number(seconds)}')
+    lines += [f"# HELP {name}_recent {help_text}, quantiles over the last {RECENT_SAMPLES} values",
+              f"# TYPE {name}_recent gauge"] + quantile_lines
+    return lines
+
+
+def render(extra_counters=(), gauges=()):
+    """
+    Prometheus exposition text. extra_counters and gauges are
+    (name, help, value) triples owned by other modules.
+    """
+    lines = _histogram_lines("moodflix_stage_seconds", "stage", "stage", "Time spent in each request stage")
+    lines += _histogram_lines("moodflix_request_seconds", "request", "view", "Request handling time per view")
+    with _registry_lock:
+        counters = [(name, COUNTERS.get(name, name), value) for name, value in _counters.items()]
+    for kind, entries in (("counter", counters + list(extra_counters)), ("gauge", gauges)):
+        for name, help_text, value in entries:
+            lines += [f"# HELP moodflix_{name} {help_text}", f"# TYPE moodflix_{name} {kind}",
+                      f"moodflix_{name} {_number(value)}"]
+    return "\n".join(lines) + "\n"
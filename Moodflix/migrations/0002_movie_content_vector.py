@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Moodflix', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='content_vector',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:34
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_sessions(apps, schema_editor):
+    """
+    Fold rows sharing a session_key into the most recently updated one:
+    viewed titles are unioned, genres come from the newest row that has any.
+    """
+    UserPreference = apps.get_model('Moodflix', 'UserPreference')
+    duplicated = (UserPreference.objects.values('session_key')
+                  .annotate(rows=Count('id')).filter(rows__gt=1).values_list('session_key', flat=True))
+    for session_key in list(duplicated):
+        rows = list(UserPreference.objects.filter(session_key=session_key).order_by('-updated_at', '-id'))
+        keep = rows[0]
+        viewed = list(keep.viewed_movies or [])
+        for row in rows[1:]:
+            viewed += [movie for movie in row.viewed_movies or [] if movie not in viewed]
+        with_genres = next((row for row in rows if row.favorite_genres or row.excluded_genres), keep)
+        keep.favorite_genres = with_genres.favorite_genres
+        keep.excluded_genres = with_genres.excluded_genres
+        keep.viewed_movies = viewed
+        keep.save(update_fields=['favorite_genres', 'excluded_genres', 'viewed_movies'])
+        UserPreference.objects.filter(id__in=[row.id for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Moodflix', '0002_movie_content_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_sessions, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='userpreference',
+            name='session_key',
+            field=models.CharField(max_length=40, unique=True),
+        ),
+    ]
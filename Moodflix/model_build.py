@@ -0,0 +1,94 @@
+import resource
+import time
+
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .similarity import DEFAULT_BLOCK_SIZE
+
+
+# TfidfVectorizer settings from ML/recommendation_model.ipynb
+TFIDF_PARAMS = {
+    "stop_words": "english",
+    "max_features": 5000,
+    "ngram_range": (1, 2),
+    "min_df": 2,
+}
+
+
+def _joined(movies, column, limit=None):
+    if column not in movies.columns:
+        return pd.Series([""] * len(movies), index=movies.index)
+    return movies[column].apply(lambda x: " ".join(x[:limit]) if isinstance(x, list) else "").astype(str)
+
+
+def combined_features(movies):
+    """Overview, genres, keywords, director and top-3 cast as one string per movie."""
+    overview = movies["overview"].fillna("").astype(str)
+    director = movies["director"].fillna("").astype(str) if "director" in movies.columns else ""
+    return (
+        overview + " " +
+        _joined(movies, "genres") + " " +
+        _joined(movies, "keywords") + " " +
+        director + " " +
+        _joined(movies, "cast_names", limit=3)
+    )
+
+
+def fit_content_matrix(texts, **params):
+    vectorizer = TfidfVectorizer(**{**TFIDF_PARAMS, **params})
+    return vectorizer.fit_transform(texts)
+
+
+def block_size_for(n_rows, max_block_mb, default=DEFAULT_BLOCK_SIZE):
+    """Largest row block whose dense float64 similarity slab fits in max_block_mb."""
+    if n_rows == 0:
+        return default
+    return int(max(1, min(default, max_block_mb * 1e6 // (8 * n_rows))))
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its finished children."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, children
+
+
+class StageTimer:
+    """
+    Wall-clock and peak memory per build stage.
+
+    Peak RSS is cumulative (the kernel only reports a high-water mark), so
+    the stage that raised it is the one whose value first jumps.
+    """
+
+    def __init__(self, log=None):
+        self.stages = []
+        self.log = log
+
+    def __call__(self, name):
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        own, children = peak_rss_mb()
+        stage = {"stage": name, "seconds": round(seconds, 3),
+                 "peak_rss_mb": round(own, 1), "worker_peak_rss_mb": round(children, 1)}
+        self.stages.append(stage)
+        if self.log:
+            self.log(f"{name}: {seconds:.2f}s, peak RSS {own:.0f} MB (workers {children:.0f} MB)")
+        return stage
+
+
+class _Stage:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.timer.record(self.name, time.perf_counter() - self.start)
+        return False
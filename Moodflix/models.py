@@ -21,6 +21,12 @@ class Movie(models.Model):
     vote_count = models.IntegerField()
     popularity = models.FloatField()
     
+    # TMDB poster path, filled by the backfill_posters command ("" = no poster)
+    poster_path = models.CharField(max_length=200, null=True, blank=True)
+    
+    # Packed TF-IDF row for the database backend, filled by store_content_vectors
+    content_vector = models.BinaryField(null=True, blank=True, editable=False)
+    
     # Store genres and cast as JSON
     genres = JSONField(default=list)  # List of genre names
     cast = JSONField(default=list)    # List of actor names
@@ -59,7 +65,7 @@ class Movie(models.Model):
 class UserPreference(models.Model):
     """Store user preferences and history (optional, for future enhancement)"""
     
-    session_key = models.CharField(max_length=40, db_index=True)
+    session_key = models.CharField(max_length=40, unique=True)
     favorite_genres = JSONField(default=list)
     excluded_genres = JSONField(default=list)
     viewed_movies = JSONField(default=list)
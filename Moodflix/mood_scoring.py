@@ -0,0 +1,209 @@
+import json
+from ast import literal_eval
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from .moods import MOODS, mood_column
+
+
+# Mood to genre mapping (from ML/Data_preprocessing.ipynb)
+MOOD_GENRES = {
+    'happy': ['Comedy', 'Family', 'Animation', 'Music'],
+    'sad': ['Drama', 'Romance'],
+    'excited': ['Action', 'Adventure', 'Science Fiction'],
+    'scared': ['Horror', 'Thriller'],
+    'romantic': ['Romance', 'Drama'],
+    'thoughtful': ['Documentary', 'Drama', 'History'],
+    'adventurous': ['Adventure', 'Action', 'Fantasy'],
+    'relaxed': ['Comedy', 'Family', 'Animation'],
+    'mysterious': ['Mystery', 'Thriller', 'Crime'],
+    'inspired': ['Documentary', 'Biography', 'History'],
+}
+# Mood to keyword hints; a hint matches any keyword containing it
+MOOD_KEYWORD_HINTS = {
+    'happy': ['comedy', 'friendship', 'love', 'celebration', 'fun'],
+    'sad': ['loss', 'tragedy', 'melancholy', 'death', 'breakup'],
+    'excited': ['explosion', 'chase', 'hero', 'battle', 'victory'],
+    'scared': ['ghost', 'monster', 'haunted', 'murder', 'supernatural'],
+    'romantic': ['love', 'relationship', 'wedding', 'romance', 'couple'],
+    'thoughtful': ['philosophy', 'life', 'society', 'truth', 'meaning'],
+    'adventurous': ['journey', 'exploration', 'quest', 'treasure', 'travel'],
+    'relaxed': ['slice of life', 'peaceful', 'calm', 'nature', 'family'],
+    'mysterious': ['detective', 'investigation', 'conspiracy', 'secret', 'puzzle'],
+    'inspired': ['success', 'achievement', 'courage', 'overcoming', 'motivation'],
+}
+
+GENRE_WEIGHT = 3
+KEYWORD_WEIGHT = 1.5
+RATING_BOOST = 2
+POPULARITY_BOOST = 0.5
+POPULARITY_THRESHOLD = 10
+MIN_VOTE_COUNT = 50
+KEYWORD_LIMIT = 10
+CAST_LIMIT = 5
+
+
+# ---------------------------
+# Mood scores
+# ---------------------------
+def _lists(column):
+    return [value if isinstance(value, list) else [] for value in column]
+
+
+def genre_matches(genres, moods=MOODS):
+    """N x len(moods) counts of each movie's genres in every mood's genre list."""
+    binarizer = MultiLabelBinarizer(sparse_output=True)
+    movie_genres = binarizer.fit_transform([set(g) for g in genres])
+    weights = np.zeros((len(binarizer.classes_), len(moods)))
+    genre_ids = {genre: i for i, genre in enumerate(binarizer.classes_)}
+    for j, mood in enumerate(moods):
+        for genre in MOOD_GENRES.get(mood, []):
+            if genre in genre_ids:
+                weights[genre_ids[genre], j] += 1
+    return np.asarray(movie_genres @ weights)
+
+
+def keyword_matches(keywords, moods=MOODS):
+    """
+    N x len(moods) counts of each mood's hints found in a movie's keywords.
+
+    Hints are tested once against the catalog's distinct keywords, giving
+    a keyword x hint incidence matrix; movies then reach hints (and hints
+    moods) through sparse products.
+    """
+    hints = sorted({hint for mood in moods for hint in MOOD_KEYWORD_HINTS.get(mood, [])})
+    binarizer = MultiLabelBinarizer(sparse_output=True)
+    movie_keywords = binarizer.fit_transform([{k.lower() for k in kws} for kws in keywords])
+
+    vocabulary = pd.Series(binarizer.classes_, dtype=object)
+    keyword_hints = np.column_stack(
+        [vocabulary.str.contains(hint, regex=False).to_numpy(bool) for hint in hints]
+    ) if len(vocabulary) and hints else np.zeros((len(vocabulary), len(hints)), dtype=bool)
+
+    hint_moods = np.zeros((len(hints), len(moods)))
+    hint_ids = {hint: i for i, hint in enumerate(hints)}
+    for j, mood in enumerate(moods):
+        for hint in MOOD_KEYWORD_HINTS.get(mood, []):
+            hint_moods[hint_ids[hint], j] += 1
+
+    has_hint = np.asarray(movie_keywords @ keyword_hints.astype(np.float64)) > 0
+    return has_hint.astype(np.float64) @ hint_moods
+
+
+def mood_scores(movies, moods=MOODS, genres_column="genres", keywords_column="keyword"):
+    """
+    Every mood_<mood>_score column at once, matching the notebook's
+    per-row loop: 3 per matching genre, 1.5 per matching keyword hint,
+    vote_average / 10 * 2, and 0.5 for popularity above 10.
+    """
+    genres = _lists(movies[genres_column])
+    keywords = _lists(movies[keywords_column]) if keywords_column in movies else [[] for _ in genres]
+
+    scores = genre_matches(genres, moods) * GENRE_WEIGHT
+    scores += keyword_matches(keywords, moods) * KEYWORD_WEIGHT
+    scores += (movies["vote_average"].to_numpy(np.float64) / 10 * RATING_BOOST)[:, None]
+    scores += np.where(movies["popularity"].to_numpy(np.float64) > POPULARITY_THRESHOLD, POPULARITY_BOOST, 0.0)[:, None]
+    return pd.DataFrame(scores, index=movies.index, columns=[mood_column(mood) for mood in moods])
+
+
+def mood_scores_reference(movies, moods=MOODS):
+    """The notebook's iterrows loop, kept to check mood_scores against."""
+    columns = {}
+    for mood in moods:
+        scores = []
+        preferred_genres = MOOD_GENRES[mood]
+        keyword_hints = MOOD_KEYWORD_HINTS.get(mood, [])
+
+        for _, row in movies.iterrows():
+            score = 0
+            genre_matches = len(set(row['genres']) & set(preferred_genres))
+            score += genre_matches * 3
+            movie_keywords = [k.lower() for k in row['keyword']]
+            keyword_matches = sum(
+                1 for hint in keyword_hints
+                if any(hint in kw for kw in movie_keywords)
+            )
+            score += keyword_matches * 1.5
+            score += (row['vote_average'] / 10) * 2
+            if row['popularity'] > 10:
+                score += 0.5
+            scores.append(score)
+
+        columns[mood_column(mood)] = scores
+    return pd.DataFrame(columns, index=movies.index)
+
+
+# ---------------------------
+# TMDB CSVs -> processed_movies.pkl
+# ---------------------------
+def parse_json_column(column):
+    """Parse JSON-like string columns ([] for missing or malformed values)."""
+    def safe_parse(value):
+        if not isinstance(value, str):
+            return []
+        try:
+            return json.loads(value)
+        except ValueError:
+            try:
+                return literal_eval(value)
+            except (ValueError, SyntaxError):
+                return []
+    return column.map(safe_parse)
+
+
+def extract_names(items, key='name', limit=None):
+    if not isinstance(items, list):
+        return []
+    names = [item[key] for item in items if key in item]
+    return names[:limit] if limit else names
+
+
+def get_director(crew):
+    if not isinstance(crew, list):
+        return None
+    return next((member['name'] for member in crew if member.get('job') == 'Director'), None)
+
+
+def prepare_tmdb(movies, credits):
+    """Merge, parse and filter the TMDB 5000 movies/credits frames like the notebook."""
+    credits = credits.rename(columns={'movie_id': 'id'})
+    movies = movies.merge(credits, on='id', how='left')
+    if 'title_x' in movies.columns:
+        movies = movies.rename(columns={'title_x': 'title'})
+    if 'title_y' in movies.columns:
+        movies = movies.drop(columns=['title_y'])
+
+    for name in ('genres', 'keywords', 'cast', 'crew'):
+        movies[name] = parse_json_column(movies[name]) if name in movies else [[] for _ in range(len(movies))]
+
+    movies['genres'] = movies['genres'].map(extract_names)
+    movies['keyword'] = movies['keywords'].map(lambda x: extract_names(x, limit=KEYWORD_LIMIT))
+    movies['cast'] = movies['cast'].map(lambda x: extract_names(x, limit=CAST_LIMIT))
+    movies['director'] = movies['crew'].map(get_director)
+
+    movies = movies[movies['genres'].map(len) > 0]
+    movies = movies.dropna(subset=['overview', 'vote_average'])
+    return movies[movies['vote_count'] >= MIN_VOTE_COUNT].copy()
+
+
+def build_processed_movies(movies, credits):
+    """
+    The processed_movies.pkl frame: notebook columns plus mood scores.
+
+    genre_names, cast_names and keywords are added under the names the
+    views and the TF-IDF notebook read.
+    """
+    movies = prepare_tmdb(movies, credits)
+    movies = movies.join(mood_scores(movies))
+    movies['genre_names'] = movies['genres']
+    movies['cast_names'] = movies['cast']
+    movies['keywords'] = movies['keyword']
+
+    columns = [
+        'id', 'title', 'overview', 'genres', 'genre_names', 'keywords',
+        'vote_average', 'vote_count', 'popularity', 'release_date', 'runtime',
+        'cast_names', 'director',
+    ] + [mood_column(mood) for mood in MOODS]
+    return movies[[column for column in columns if column in movies.columns]].copy()
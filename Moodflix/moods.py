@@ -0,0 +1,8 @@
+MOODS = [
+    "happy", "sad", "excited", "scared", "romantic",
+    "thoughtful", "adventurous", "relaxed", "mysterious", "inspired"
+]
+
+
+def mood_column(mood):
+    return f"mood_{mood}_score"
@@ -0,0 +1,81 @@
+import numpy as np
+
+
+# ---------------------------
+# Exact batched neighbor search
+# ---------------------------
+def top_k_columns(scores, k, exclude=None):
+    """
+    Best k rows of every column of a dense N x B score block.
+
+    exclude optionally gives, per column, one row to skip (the query
+    itself). Returns (indices, scores), both B x k, best first.
+    """
+    scores = np.array(scores, dtype=np.float64).T
+    if exclude is not None:
+        scores[np.arange(len(scores)), exclude] = -np.inf
+    n = scores.shape[1]
+    k = min(k, n - (1 if exclude is not None else 0))
+    if k <= 0:
+        return np.zeros((len(scores), 0), dtype=np.int64), np.zeros((len(scores), 0))
+
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < n else np.argsort(-scores, axis=1)
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def exact_neighbors(content_matrix, positions, k):
+    """
+    Top-k cosine neighbors of several catalog positions at once.
+
+    One sparse (N x F) x dense (F x B) product scores the whole catalog
+    against every query, then argpartition keeps the best k per query.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    queries = content_matrix[positions].toarray().T
+    scores = content_matrix @ queries
+    return top_k_columns(scores, k, exclude=positions)
+
+
+# ---------------------------
+# Lookup by TMDB id
+# ---------------------------
+class NeighborSearch:
+    """Similar-title search over the catalog, addressed by TMDB id."""
+
+    def __init__(self, tmdb_ids, content_matrix=None, neighbor_graph=None):
+        tmdb_ids = np.asarray(tmdb_ids, dtype=np.int64)
+        self.id_order = np.argsort(tmdb_ids, kind="stable")
+        self.sorted_ids = tmdb_ids[self.id_order]
+        self.content_matrix = content_matrix
+        self.neighbor_graph = neighbor_graph
+
+    def positions_for(self, tmdb_ids):
+        """Catalog positions for TMDB ids; -1 where the id is unknown."""
+        tmdb_ids = np.asarray(tmdb_ids, dtype=np.int64)
+        hits = np.searchsorted(self.sorted_ids, tmdb_ids)
+        hits = np.minimum(hits, len(self.sorted_ids) - 1)
+        found = self.sorted_ids[hits] == tmdb_ids if len(self.sorted_ids) else np.zeros(len(tmdb_ids), dtype=bool)
+        return np.where(found, self.id_order[hits], -1)
+
+    def search(self, positions, k):
+        """
+        Returns (indices, scores); rows are padded with -1 / -inf when
+        fewer than k neighbors exist.
+        """
+        if self.content_matrix is not None:
+            return exact_neighbors(self.content_matrix, positions, k)
+        return self._from_graph(positions, k)
+
+    def _from_graph(self, positions, k):
+        indices = np.full((len(positions), k), -1, dtype=np.int64)
+        scores = np.full((len(positions), k), -np.inf)
+        if self.neighbor_graph is None:
+            return indices, scores
+        for i, pos in enumerate(positions):
+            row_indices, row_scores = self.neighbor_graph.neighbors(pos)
+            order = np.argsort(-row_scores, kind="stable")[:k]
+            indices[i, :len(order)] = row_indices[order]
+            scores[i, :len(order)] = row_scores[order]
+        return indices, scores
@@ -0,0 +1,167 @@
+"""
+Genre personalization for /recommendations/.
+
+A session's UserPreference (favorite_genres, excluded_genres) becomes a
+GenreProfile: two vectors over the catalog's genres, cached per session
+and model version. Re-ranking a candidate pool slices the pool's rows of
+the genre incidence matrix built at model load and takes one product
+with each vector, so it costs the same whatever the catalog size.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError
+from scipy import sparse
+
+from .models import UserPreference
+
+
+# Added to the 0-1 composite score of a title whose genres are all favorites
+PREFERENCE_WEIGHT = 0.2
+
+
+# ---------------------------
+# Genre incidence matrix
+# ---------------------------
+class GenreMatrix:
+    """
+    N x G CSR matrix, row i holding 1 / (number of genres) for each genre
+    of catalog position i, so row @ favorites is the share of a title's
+    genres that are favorites.
+    """
+
+    def __init__(self, matrix, genres):
+        self.matrix = matrix
+        # Genre name -> column
+        self.genres = genres
+
+    def vector(self, names):
+        vector = np.zeros(len(self.genres))
+        for name in names:
+            column = self.genres.get(name)
+            if column is not None:
+                vector[column] = 1.0
+        return vector
+
+
+def build_genre_matrix(movies_df):
+    genres, rows, cols, values = {}, [], [], []
+    if "genre_names" in movies_df.columns:
+        for pos, names in enumerate(movies_df["genre_names"]):
+            if not isinstance(names, (list, tuple, np.ndarray)) or not len(names):
+                continue
+            names = set(names)
+            for name in names:
+                rows.append(pos)
+                cols.append(genres.setdefault(name, len(genres)))
+                values.append(1.0 / len(names))
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(movies_df), len(genres)))
+    return GenreMatrix(matrix, genres)
+
+
+# ---------------------------
+# Per-session profile
+# ---------------------------
+class GenreProfile:
+    def __init__(self, favorites, excluded, allowed=None):
+        # 1 per favorite genre column, and 1 per excluded genre column
+        self.favorites = favorites
+        self.excluded = excluded
+        # filters.Bitset of the titles without an excluded genre (None: no
+        # exclusions), passed to MoodRanking.candidates so the pool is
+        # filled from eligible titles
+        self.allowed = allowed
+
+    @classmethod
+    def from_preference(cls, genre_matrix, favorite_genres, excluded_genres, attribute_index=None):
+        """None when the preference has no genre the catalog knows."""
+        favorites = genre_matrix.vector(favorite_genres)
+        excluded = genre_matrix.vector(excluded_genres)
+        if not favorites.any() and not excluded.any():
+            return None
+        allowed = None
+        if excluded.any() and attribute_index is not None:
+            allowed = attribute_index.without_genres(excluded_genres)
+        return cls(favorites, excluded, allowed)
+
+    def rerank(self, genre_matrix, positions, composite):
+        """
+        Drop candidates with an excluded genre and re-sort the rest by
+        composite + PREFERENCE_WEIGHT * favorite share, best first.
+        """
+        rows = genre_matrix.matrix[positions]
+        keep = rows @ self.excluded == 0
+        adjusted = (composite + PREFERENCE_WEIGHT * (rows @ self.favorites))[keep]
+        positions = positions[keep]
+        order = np.argsort(-adjusted, kind="stable")
+        return positions[order], adjusted[order]
+
+
+class ProfileStore:
+    """
+    GenreProfile per session key, in an in-process LRU. A profile is
+    rebuilt when the model version changes (genre columns may move),
+    after invalidate() (preferences edited through this process) and
+    after ttl seconds (edited through another worker).
+    """
+
+    # Cached for sessions without usable preferences
+    NO_PROFILE = object()
+
+    def __init__(self, maxsize=10000, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_key, genre_matrix, version, attribute_index=None):
+        with self._lock:
+            entry = self._profiles.get(session_key)
+            if entry is not None and entry[0] == version and time.monotonic() - entry[2] < self.ttl:
+                self._profiles.move_to_end(session_key)
+                return None if entry[1] is self.NO_PROFILE else entry[1]
+
+        favorite_genres, excluded_genres = self._stored_genres(session_key)
+        profile = GenreProfile.from_preference(genre_matrix, favorite_genres, excluded_genres, attribute_index)
+
+        with self._lock:
+            self._profiles[session_key] = (version, self.NO_PROFILE if profile is None else profile, time.monotonic())
+            self._profiles.move_to_end(session_key)
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+        return profile
+
+    def invalidate(self, session_key):
+        with self._lock:
+            self._profiles.pop(session_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+    @staticmethod
+    def _stored_genres(session_key):
+        try:
+            preference = (UserPreference.objects.filter(session_key=session_key)
+                          .only("favorite_genres", "excluded_genres").first())
+        except DatabaseError:
+            return [], []
+        if preference is None:
+            return [], []
+        return preference.favorite_genres or [], preference.excluded_genres or []
+
+
+_profile_store = None
+_profile_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    global _profile_store
+    if _profile_store is None:
+        with _profile_store_lock:
+            if _profile_store is None:
+                _profile_store = ProfileStore(maxsize=settings.PREFERENCE_CACHE_SIZE, ttl=settings.PREFERENCE_CACHE_TTL)
+    return _profile_store
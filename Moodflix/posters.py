@@ -0,0 +1,177 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+
+
+# Stored in the caches when TMDB has no poster, so the title is not re-queried
+NO_POSTER = ""
+
+
+# ---------------------------
+# In-process LRU
+# ---------------------------
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ---------------------------
+# TMDB poster resolver
+# ---------------------------
+class PosterResolver:
+    """
+    Resolve TMDB poster paths by movie id.
+
+    Lookups go through an in-process LRU, then the shared Django cache, then
+    TMDB. Misses for one response are fetched concurrently on a pooled
+    session; anything not back before the deadline falls back to the
+    stored poster_path and keeps filling the caches in the background.
+    """
+
+    def __init__(self, api_url, api_key, timeout=2.0, deadline=1.5, max_workers=8,
+                 lru_size=4096, cache_alias="default", cache_ttl=None):
+        self.api_url = api_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.deadline = deadline
+        self.lru = LRUCache(lru_size)
+        self.cache = caches[cache_alias]
+        self.cache_ttl = cache_ttl
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tmdb")
+
+    @staticmethod
+    def cache_key(tmdb_id):
+        return f"poster:{tmdb_id}"
+
+    def fetch(self, tmdb_id):
+        """Fetch one poster path from TMDB and store it in both caches."""
+        metrics.increment("tmdb_requests_total")
+        try:
+            response = self.session.get(
+                f"{self.api_url}/movie/{tmdb_id}",
+                params={"api_key": self.api_key},
+                timeout=self.timeout,
+            )
+            if response.status_code == 404:
+                poster_path = NO_POSTER
+            else:
+                response.raise_for_status()
+                poster_path = response.json().get("poster_path") or NO_POSTER
+        except Exception:
+            metrics.increment("tmdb_errors_total")
+            raise
+
+        self.lru.set(tmdb_id, poster_path)
+        self.cache.set(self.cache_key(tmdb_id), poster_path, self.cache_ttl)
+        return poster_path
+
+    def resolve_many(self, movies):
+        """
+        Poster paths for a list of (tmdb_id, stored_poster_path) pairs.
+
+        Returns a list in the same order. A non-empty stored path is used
+        as is; the others are looked up, falling back to the stored value
+        when TMDB has no poster, errors, or misses the deadline.
+        """
+        return self.resolve_batch(movies)[0]
+
+    def resolve_batch(self, movies):
+        """
+        Like resolve_many, but returns (poster_paths, complete), where
+        complete is False if any lookup errored or missed the deadline.
+        """
+        found = {}
+        missing = []
+        for tmdb_id, stored in movies:
+            if stored:
+                continue
+            poster_path = self.lru.get(tmdb_id)
+            if poster_path is None:
+                missing.append(tmdb_id)
+            else:
+                found[tmdb_id] = poster_path
+
+        if missing:
+            shared = self.cache.get_many([self.cache_key(tmdb_id) for tmdb_id in missing])
+            still_missing = []
+            for tmdb_id in missing:
+                poster_path = shared.get(self.cache_key(tmdb_id))
+                if poster_path is None:
+                    still_missing.append(tmdb_id)
+                else:
+                    self.lru.set(tmdb_id, poster_path)
+                    found[tmdb_id] = poster_path
+            missing = still_missing
+
+        complete = True
+        if missing:
+            futures = {self._executor.submit(self.fetch, tmdb_id): tmdb_id for tmdb_id in dict.fromkeys(missing)}
+            done, not_done = wait(futures, timeout=self.deadline)
+            complete = not not_done
+            if not_done:
+                metrics.increment("tmdb_deadline_misses_total", len(not_done))
+            for future in done:
+                if future.exception() is None:
+                    found[futures[future]] = future.result()
+                else:
+                    complete = False
+
+        return [found.get(tmdb_id) or stored or None for tmdb_id, stored in movies], complete
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_poster_resolver():
+    global _resolver
+
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = PosterResolver(
+                    settings.TMDB_API_URL,
+                    settings.TMDB_API_KEY,
+                    timeout=settings.TMDB_TIMEOUT,
+                    deadline=settings.TMDB_DEADLINE,
+                    max_workers=settings.TMDB_MAX_WORKERS,
+                    lru_size=settings.POSTER_LRU_SIZE,
+                    cache_alias=settings.POSTER_CACHE_ALIAS,
+                    cache_ttl=settings.POSTER_CACHE_TTL,
+                )
+    return _resolver
@@ -0,0 +1,220 @@
+import numpy as np
+
+from .moods import mood_column
+
+
+# Composite score weights (mood / rating / popularity)
+MOOD_WEIGHT = 0.5
+RATING_WEIGHT = 0.3
+POPULARITY_WEIGHT = 0.2
+
+# Filtered candidates: filters matching at most this many times the
+# titles needed are ranked directly instead of scanning the ranking
+DIRECT_RANK_FACTOR = 4
+# Headroom on the expected scan window for a filter's selectivity
+WINDOW_SLACK = 1.5
+
+
+# ---------------------------
+# Per-mood candidate rankings
+# ---------------------------
+class MoodRanking:
+    """
+    Catalog positions sorted by one mood score, best first.
+
+    The mood, rating and popularity values are stored in the same order,
+    together with their running min/max, so min-max normalizing any
+    prefix of the ranking is a slice and two lookups.
+    """
+
+    def __init__(self, order, mood_scores, ratings, popularity):
+        self.order = order
+        self.features = np.vstack([mood_scores, ratings, popularity])
+        self.running_min = np.minimum.accumulate(self.features, axis=1)
+        self.running_max = np.maximum.accumulate(self.features, axis=1)
+        self._ranks = None
+
+    def __len__(self):
+        return len(self.order)
+
+    def candidates(self, size, exclude=None, allowed=None):
+        """
+        Top `size` positions by mood, re-ordered by composite score.
+
+        exclude (a SeenTitles) drops titles already served; allowed (a
+        filters.Bitset) keeps only matching titles. Either way only the
+        kept titles are min-max normalized.
+        Returns (positions, composite_scores), both best first.
+        """
+        if allowed is not None or (exclude is not None and len(exclude)):
+            ranks = self._kept_ranks(size, exclude, allowed)
+            if len(ranks) == 0:
+                return self.order[:0], np.zeros(0)
+            features = self.features[:, ranks]
+            composite = composite_scores(features, features.min(axis=1, keepdims=True),
+                                         features.max(axis=1, keepdims=True))
+            by_composite = np.argsort(-composite, kind="stable")
+            return self.order[ranks][by_composite], composite[by_composite]
+
+        size = min(size, len(self.order))
+        if size == 0:
+            return self.order[:0], np.zeros(0)
+
+        composite = composite_scores(
+            self.features[:, :size],
+            self.running_min[:, size - 1:size],
+            self.running_max[:, size - 1:size],
+        )
+        by_composite = np.argsort(-composite, kind="stable")
+        return self.order[:size][by_composite], composite[by_composite]
+
+    def _kept_ranks(self, size, exclude, allowed):
+        """
+        Ranks of the first `size` titles in the ranking that are allowed
+        and not excluded.
+
+        Without a filter, the first size + len(exclude) titles are enough.
+        A filter matching a fraction f of the catalog needs about size / f,
+        so the scanned window starts there and widens until enough titles
+        match. Very selective filters skip the scan and rank their matches
+        directly.
+        """
+        n = len(self.order)
+        excluded = len(exclude) if exclude is not None else 0
+        window = size + excluded
+        if allowed is not None:
+            if len(allowed) <= DIRECT_RANK_FACTOR * (size + excluded):
+                ranks = np.sort(self.ranks[allowed.positions()])
+                if exclude is not None and excluded:
+                    ranks = ranks[~exclude.contains(self.order[ranks])]
+                return ranks[:size]
+            window = int(window * n / len(allowed) * WINDOW_SLACK)
+
+        while True:
+            window = min(window, n)
+            positions = self.order[:window]
+            keep = np.ones(window, dtype=bool)
+            if allowed is not None:
+                keep &= allowed.contains(positions)
+            if exclude is not None and excluded:
+                keep &= ~exclude.contains(positions)
+            ranks = np.flatnonzero(keep)[:size]
+            if len(ranks) == size or window == n:
+                return ranks
+            window *= 4
+
+    @property
+    def ranks(self):
+        """Position -> rank in this ranking, built on first use by a filter."""
+        if self._ranks is None:
+            ranks = np.empty(len(self.order), dtype=np.int64)
+            ranks[self.order] = np.arange(len(self.order))
+            self._ranks = ranks
+        return self._ranks
+
+
+def composite_scores(features, low, high):
+    """Weighted sum of the min-max normalized mood/rating/popularity rows."""
+    span = high - low
+    span[span == 0] = 1.0
+    normalized = (features - low) / span
+    return (
+        MOOD_WEIGHT * normalized[0] +
+        RATING_WEIGHT * normalized[1] +
+        POPULARITY_WEIGHT * normalized[2]
+    )
+
+
+class MoodRankings:
+    """
+    One MoodRanking per mood plus a top-rated fallback order.
+
+    Also keeps the N x len(moods) mood score matrix, so weighted blends of
+    moods are scored with one matrix product.
+    """
+
+    def __init__(self, rankings, top_rated, moods=(), mood_matrix=None, ratings=None, popularity=None):
+        self.rankings = rankings
+        self.top_rated = top_rated
+        self.moods = list(moods)
+        self.mood_matrix = mood_matrix
+        self.ratings = ratings
+        self.popularity = popularity
+
+    def for_mood(self, mood):
+        return self.rankings.get(mood)
+
+    def blend_vector(self, weights):
+        """
+        Normalized weight vector over self.moods from {"mood": weight}.
+
+        Raises ValueError for unknown moods, negative weights or an
+        all-zero blend.
+        """
+        vector = np.zeros(len(self.moods))
+        for mood, weight in weights.items():
+            if mood not in self.moods:
+                raise ValueError(f"Unknown mood '{mood}'")
+            weight = float(weight)
+            if weight < 0 or not np.isfinite(weight):
+                raise ValueError(f"Invalid weight for mood '{mood}'")
+            vector[self.moods.index(mood)] = weight
+        total = vector.sum()
+        if total <= 0:
+            raise ValueError("At least one mood needs a positive weight")
+        return vector / total
+
+    def blended_candidates(self, blend_vectors, sizes):
+        """
+        Candidate pools for several mood blends at once.
+
+        blend_vectors is B x len(moods) and sizes one pool size per blend.
+        The blended mood scores of the whole catalog are one N x B product;
+        each blend then keeps its top titles re-ordered by composite score,
+        as candidates() does for a single mood. Returns a list of
+        (positions, composite_scores).
+        """
+        blend_vectors = np.atleast_2d(blend_vectors)
+        blended = self.mood_matrix @ blend_vectors.T
+
+        pools = []
+        for scores, size in zip(blended.T, sizes):
+            size = min(size, len(scores))
+            if size == 0:
+                pools.append((np.zeros(0, dtype=np.int64), np.zeros(0)))
+                continue
+            top = np.argpartition(-scores, size - 1)[:size] if size < len(scores) else np.arange(len(scores))
+            # Best blended score first, ties in catalog order (like nlargest)
+            top = top[np.lexsort((top, -scores[top]))]
+
+            features = np.vstack([scores[top], self.ratings[top], self.popularity[top]])
+            composite = composite_scores(features, features.min(axis=1, keepdims=True),
+                                         features.max(axis=1, keepdims=True))
+            by_composite = np.argsort(-composite, kind="stable")
+            pools.append((top[by_composite], composite[by_composite]))
+        return pools
+
+
+def build_mood_rankings(movies_df, moods):
+    ratings = _column(movies_df, "vote_average")
+    popularity = _column(movies_df, "popularity")
+
+    rankings = {}
+    mood_matrix = np.zeros((len(movies_df), len(moods)))
+    for i, mood in enumerate(moods):
+        col = mood_column(mood)
+        if col not in movies_df.columns:
+            continue
+        mood_scores = _column(movies_df, col)
+        mood_matrix[:, i] = mood_scores
+        order = np.argsort(-mood_scores, kind="stable")
+        rankings[mood] = MoodRanking(order, mood_scores[order], ratings[order], popularity[order])
+
+    top_rated = np.argsort(-ratings, kind="stable")
+    return MoodRankings(rankings, top_rated, moods, mood_matrix, ratings, popularity)
+
+
+def _column(movies_df, col):
+    if col not in movies_df.columns:
+        return np.zeros(len(movies_df))
+    return np.nan_to_num(movies_df[col].to_numpy(dtype=np.float64), nan=0.0)
@@ -0,0 +1,65 @@
+"""
+Cache of serialized /recommendations/ responses.
+
+For a given model, a response is fully determined by its request
+parameters, so the JSON bytes are stored under a key built from those
+parameters and the model version. The cache alias is configurable; the
+default is local memory, and pointing it at Redis or Memcached shares
+entries between workers.
+"""
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+_stats = {"hits": 0, "misses": 0, "stores": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats():
+    with _stats_lock:
+        counters = dict(_stats)
+    lookups = counters["hits"] + counters["misses"]
+    counters["hit_ratio"] = round(counters["hits"] / lookups, 4) if lookups else None
+    return counters
+
+
+def reset_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def cache_key(model_version, params):
+    raw = json.dumps([model_version, params], sort_keys=True, separators=(",", ":"))
+    return "recs:" + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def etag_for(body):
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def get(key):
+    """Cached (etag, body) for key, or None."""
+    entry = _cache().get(key)
+    _count("hits" if entry is not None else "misses")
+    return entry
+
+
+def put(key, body):
+    etag = etag_for(body)
+    _cache().set(key, (etag, body), settings.RESPONSE_CACHE_TTL)
+    _count("stores")
+    return etag
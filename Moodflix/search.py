@@ -0,0 +1,168 @@
+import re
+import sys
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+from .rankings import POPULARITY_WEIGHT, RATING_WEIGHT
+
+
+MIN_FUZZY_SIMILARITY = 0.3
+# Prefixes matching more keys than this have their best results memoized
+PREFIX_CACHE_THRESHOLD = 2048
+PREFIX_CACHE_DEPTH = 50
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_title(text):
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def quality_scores(ratings, popularity):
+    """Rating/popularity mix used to order matches, min-max normalized."""
+    def normalized(values):
+        values = np.nan_to_num(np.asarray(values, dtype=np.float64))
+        span = values.max() - values.min() if len(values) else 0.0
+        return (values - values.min()) / span if span else np.zeros(len(values))
+
+    total = RATING_WEIGHT + POPULARITY_WEIGHT
+    return (RATING_WEIGHT * normalized(ratings) + POPULARITY_WEIGHT * normalized(popularity)) / total
+
+
+# ---------------------------
+# Title search index
+# ---------------------------
+class TitleIndex:
+    """
+    In-memory title search over catalog positions.
+
+    Prefix (typeahead) search uses a sorted array of keys, one per word
+    start of every normalized title, so "mat" finds "The Matrix"; a prefix
+    is a bisect range. Fuzzy search uses a character-trigram inverted
+    index stored as CSR postings and scores titles by trigram Jaccard
+    similarity. Both rank ties by quality_scores.
+    """
+
+    def __init__(self, titles, ratings, popularity):
+        normalized = [normalize_title(title) for title in titles]
+        self.quality = quality_scores(ratings, popularity)
+        # Quality rank per position, so "best first" is an integer argsort
+        self.by_rank = np.argsort(-self.quality, kind="stable")
+        self.rank = np.empty(len(normalized), dtype=np.int64)
+        self.rank[self.by_rank] = np.arange(len(normalized))
+
+        keys = []
+        for pos, title in enumerate(normalized):
+            starts = [0] + [m.end() for m in re.finditer(" ", title)]
+            keys.extend((title[start:], pos) for start in starts if title)
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self._prefix_cache = {}
+        self.key_positions = np.array([pos for _, pos in keys], dtype=np.int64)
+
+        vocabulary = {}
+        title_grams = [[vocabulary.setdefault(g, len(vocabulary)) for g in trigrams(t)] for t in normalized]
+        self.vocabulary = vocabulary
+        self.gram_counts = np.array([len(grams) for grams in title_grams], dtype=np.int32)
+        gram_ids = np.fromiter((g for grams in title_grams for g in grams), dtype=np.int64)
+        owners = np.repeat(np.arange(len(normalized), dtype=np.int32), self.gram_counts)
+        order = np.argsort(gram_ids, kind="stable")
+        self.postings = owners[order]
+        self.postings_indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_ids, minlength=len(vocabulary)), out=self.postings_indptr[1:])
+
+    def __len__(self):
+        return len(self.quality)
+
+    @property
+    def nbytes(self):
+        arrays = (self.quality, self.rank, self.by_rank, self.key_positions, self.gram_counts,
+                  self.postings, self.postings_indptr)
+        strings = sys.getsizeof(self.keys) + sum(sys.getsizeof(key) for key in self.keys)
+        vocabulary = sys.getsizeof(self.vocabulary) + sum(sys.getsizeof(g) for g in self.vocabulary)
+        return sum(a.nbytes for a in arrays) + strings + vocabulary
+
+    def prefix(self, query, limit=10):
+        """Positions of titles with a word starting with query, best first."""
+        query = normalize_title(query)
+        if not query or limit <= 0:
+            return np.zeros(0, dtype=np.int64)
+        cached = self._prefix_cache.get(query)
+        if cached is not None and limit <= PREFIX_CACHE_DEPTH:
+            return cached[:limit]
+
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + "\x7f", lo=start)
+        if end - start > PREFIX_CACHE_THRESHOLD and limit <= PREFIX_CACHE_DEPTH:
+            # Short, common prefixes (first keystrokes) are ranked once
+            best = self._best(self.key_positions[start:end], PREFIX_CACHE_DEPTH)
+            self._prefix_cache[query] = best
+            return best[:limit]
+        return self._best(self.key_positions[start:end], limit)
+
+    def _best(self, matches, limit):
+        """
+        The `limit` best distinct titles among matches. A title can own
+        several keys in the range, so the window of best-ranked keys
+        widens until it holds `limit` distinct titles (or all of them).
+        """
+        ranks = self.rank[matches]
+        keep = min(len(ranks), 2 * limit)
+        while True:
+            window = ranks if keep == len(ranks) else ranks[np.argpartition(ranks, keep - 1)[:keep]]
+            # Ranks are unique per title; np.unique also sorts them best first
+            best = np.unique(window)
+            if len(best) >= limit or keep == len(ranks):
+                return self.by_rank[best[:limit]]
+            keep = min(len(ranks), 4 * keep)
+
+    def fuzzy(self, query, limit=10, min_similarity=MIN_FUZZY_SIMILARITY):
+        """
+        Positions of titles whose trigrams overlap query's, best first.
+
+        Returns (positions, similarities).
+        """
+        query_grams = trigrams(normalize_title(query))
+        grams = [self.vocabulary[g] for g in query_grams if g in self.vocabulary]
+        if not grams or limit <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        counts = np.bincount(np.concatenate([self._posting(g) for g in grams]), minlength=len(self))
+        # Similarity >= min_similarity needs at least this many shared trigrams
+        needed = max(1, int(np.ceil(min_similarity * len(query_grams))))
+        candidates = np.flatnonzero(counts >= needed)
+        overlap = counts[candidates]
+        similarity = overlap / (len(query_grams) + self.gram_counts[candidates] - overlap)
+        keep = similarity >= min_similarity
+        candidates, similarity = candidates[keep], similarity[keep]
+
+        order = np.lexsort((self.rank[candidates], -similarity))[:limit]
+        return candidates[order], similarity[order]
+
+    def _posting(self, gram):
+        """Positions (sorted) of the titles containing trigram id gram."""
+        return self.postings[self.postings_indptr[gram]:self.postings_indptr[gram + 1]]
+
+    def search(self, query, limit=10):
+        """Prefix matches, or fuzzy matches when no title has the prefix."""
+        positions = self.prefix(query, limit)
+        if len(positions) == 0:
+            positions, _ = self.fuzzy(query, limit)
+        return positions
+
+
+def build_title_index(movies_df):
+    return TitleIndex(
+        movies_df["title"].fillna("").tolist(),
+        movies_df["vote_average"].to_numpy() if "vote_average" in movies_df else np.zeros(len(movies_df)),
+        movies_df["popularity"].to_numpy() if "popularity" in movies_df else np.zeros(len(movies_df)),
+    )
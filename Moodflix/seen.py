@@ -0,0 +1,231 @@
+import atexit
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import UserPreference
+
+
+# ---------------------------
+# Per-session bitset
+# ---------------------------
+class SeenTitles:
+    """
+    Titles already served to one session, as a bitset over catalog
+    positions: N / 8 bytes, and membership of a whole candidate array is
+    two vectorized array lookups.
+    """
+
+    def __init__(self, n_titles, positions=(), version=None, catalog_ids=None):
+        self.n_titles = n_titles
+        self.version = version
+        # Position -> TMDB id, to store the history independently of the model
+        self.catalog_ids = catalog_ids
+        self.bits = np.zeros((n_titles + 7) // 8, dtype=np.uint8)
+        self.count = 0
+        self.mark(positions)
+        # When the stored history was last read
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def contains(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        return ((self.bits[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1).astype(bool)
+
+    def mark(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        positions = positions[(positions >= 0) & (positions < self.n_titles)]
+        new = np.unique(positions[~self.contains(positions)])
+        np.bitwise_or.at(self.bits, new >> 3, (1 << (new & 7)).astype(np.uint8))
+        self.count += len(new)
+        return len(new)
+
+    def positions(self):
+        return np.flatnonzero(np.unpackbits(self.bits, bitorder="little")[:self.n_titles])
+
+
+# ---------------------------
+# Session store
+# ---------------------------
+class SeenStore:
+    """
+    SeenTitles per session key, in an in-process LRU.
+
+    UserPreference.viewed_movies keeps the TMDB ids (positions change
+    between model versions). Changed sessions are written back together
+    once flush_batch of them are pending or flush_interval seconds have
+    passed, when a changed session is evicted from the LRU, and (after
+    start_flusher()) every flush_interval seconds and at exit. Writes
+    add to the stored ids instead of replacing them, and a session is
+    re-read after ttl seconds, so workers sharing a session pick up each
+    other's history.
+
+    Hold session_lock(key) from get() until the served titles are marked,
+    so concurrent requests of one session in this process do not get the
+    same titles.
+    """
+
+    LOCK_STRIPES = 64
+
+    def __init__(self, maxsize=10000, flush_batch=100, flush_interval=30.0, ttl=30.0):
+        self.maxsize = maxsize
+        self.flush_batch = flush_batch
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._session_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._flusher = None
+
+    def session_lock(self, session_key):
+        return self._session_locks[hash(session_key) % self.LOCK_STRIPES]
+
+    def get(self, session_key, catalog_ids, version):
+        """The session's SeenTitles for the catalog (a positions -> TMDB id array)."""
+        with self._lock:
+            seen = self._sessions.get(session_key)
+            if seen is not None and seen.version == version and time.monotonic() - seen.loaded_at < self.ttl:
+                self._sessions.move_to_end(session_key)
+                return seen
+
+        ids = np.asarray(self._stored_ids(session_key), dtype=np.int64)
+        if seen is not None:
+            # Keep titles marked here but not written back yet
+            ids = np.union1d(ids, seen.catalog_ids[seen.positions()])
+        seen = SeenTitles(len(catalog_ids), np.flatnonzero(np.isin(catalog_ids, ids)),
+                          version=version, catalog_ids=catalog_ids)
+
+        with self._lock:
+            self._sessions[session_key] = seen
+            self._sessions.move_to_end(session_key)
+            evicted = []
+            while len(self._sessions) > self.maxsize:
+                key, old = self._sessions.popitem(last=False)
+                if self._dirty.pop(key, None) is not None:
+                    evicted.append((key, old))
+        if evicted:
+            self._write(evicted)
+        return seen
+
+    def record(self, session_key, seen):
+        """Mark the session as changed; flush pending sessions when due."""
+        with self._lock:
+            self._dirty[session_key] = seen
+            due = (len(self._dirty) >= self.flush_batch or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending = list(self._dirty.items())
+            self._dirty.clear()
+            self._last_flush = time.monotonic()
+        if pending and not self._write(pending):
+            with self._lock:
+                for key, seen in pending:
+                    self._dirty.setdefault(key, seen)
+
+    def start_flusher(self):
+        """Flush on a daemon thread every flush_interval seconds, and when the process exits."""
+        self._flusher = threading.Thread(target=self._run_flusher, name="seen-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+        return self
+
+    def stop_flusher(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+
+    def _run_flusher(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # Pending sessions stay dirty; try again next interval
+                print("Seen history flush failed:", e)
+            finally:
+                close_old_connections()
+
+    @property
+    def pending(self):
+        return len(self._dirty)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._dirty.clear()
+
+    @staticmethod
+    def _stored_ids(session_key):
+        try:
+            preference = UserPreference.objects.filter(session_key=session_key).only("viewed_movies").first()
+        except DatabaseError:
+            return []
+        return preference.viewed_movies if preference is not None else []
+
+    @classmethod
+    def _write(cls, entries):
+        viewed = {key: [int(i) for i in seen.catalog_ids[seen.positions()]] for key, seen in entries}
+        # A session's row created concurrently (session_key is unique) rolls
+        # the batch back; the second attempt finds it and updates it
+        for _ in range(2):
+            try:
+                cls._write_viewed(viewed)
+                return True
+            except IntegrityError:
+                continue
+            except DatabaseError:
+                return False
+        return False
+
+    @staticmethod
+    def _write_viewed(viewed):
+        with transaction.atomic():
+            existing = list(UserPreference.objects.select_for_update().filter(session_key__in=list(viewed)))
+            now = timezone.now()
+            for preference in existing:
+                # Another worker may have written titles this one never saw
+                stored = preference.viewed_movies or []
+                known = set(stored)
+                preference.viewed_movies = stored + [i for i in viewed[preference.session_key] if i not in known]
+                preference.updated_at = now
+            UserPreference.objects.bulk_update(existing, ["viewed_movies", "updated_at"])
+            stored = {preference.session_key for preference in existing}
+            UserPreference.objects.bulk_create([
+                UserPreference(session_key=key, viewed_movies=ids) for key, ids in viewed.items()
+                if key not in stored
+            ])
+
+
+_seen_store = None
+_seen_store_lock = threading.Lock()
+
+
+def get_seen_store():
+    global _seen_store
+    if _seen_store is None:
+        with _seen_store_lock:
+            if _seen_store is None:
+                _seen_store = SeenStore(
+                    maxsize=settings.SEEN_CACHE_SIZE,
+                    flush_batch=settings.SEEN_FLUSH_BATCH,
+                    flush_interval=settings.SEEN_FLUSH_INTERVAL,
+                    ttl=settings.SEEN_CACHE_TTL,
+                )
+    return _seen_store
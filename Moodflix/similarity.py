@@ -0,0 +1,276 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+
+DEFAULT_TOP_K = 50
+DEFAULT_BLOCK_SIZE = 1024
+
+
+# ---------------------------
+# Sparse top-k neighbor graph
+# ---------------------------
+class NeighborGraph:
+    """
+    Top-k cosine neighbors per movie, stored as CSR arrays.
+
+    Rows and columns are catalog positions (0..N-1 in movies_df order),
+    not DataFrame labels. Scores are float32. Pairs that are not in either
+    movie's top-k list are computed on the fly from the TF-IDF
+    content_matrix when it is available.
+    """
+
+    def __init__(self, indptr, indices, scores, content_matrix=None):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float32)
+        if content_matrix is not None:
+            content_matrix = sparse.csr_matrix(content_matrix)
+            content_matrix.sum_duplicates()
+        self.content_matrix = content_matrix
+        self._csr = None
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def k(self):
+        if len(self) == 0:
+            return 0
+        return int(np.diff(self.indptr).max())
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.scores.nbytes
+
+    def to_dict(self):
+        return {
+            "neighbor_indptr": self.indptr,
+            "neighbor_indices": self.indices,
+            "neighbor_scores": self.scores,
+        }
+
+    @classmethod
+    def from_dict(cls, data, content_matrix=None):
+        return cls(
+            data["neighbor_indptr"],
+            data["neighbor_indices"],
+            data["neighbor_scores"],
+            content_matrix=content_matrix,
+        )
+
+    def neighbors(self, pos):
+        start, end = self.indptr[pos], self.indptr[pos + 1]
+        return self.indices[start:end], self.scores[start:end]
+
+    def _lookup(self, a, b):
+        start, end = self.indptr[a], self.indptr[a + 1]
+        row = self.indices[start:end]
+        hit = np.searchsorted(row, b)
+        if hit < len(row) and row[hit] == b:
+            return float(self.scores[start + hit])
+        return None
+
+    def similarity(self, a, b):
+        """Cosine similarity between catalog positions a and b."""
+        if a == b:
+            return 1.0
+        score = self._lookup(a, b)
+        if score is None:
+            score = self._lookup(b, a)
+        if score is None:
+            score = self._dot(a, b)
+        return score
+
+    def _dot(self, a, b):
+        matrix = self.content_matrix
+        if matrix is None:
+            return 0.0
+        a_start, a_end = matrix.indptr[a], matrix.indptr[a + 1]
+        b_start, b_end = matrix.indptr[b], matrix.indptr[b + 1]
+        _, a_hits, b_hits = np.intersect1d(
+            matrix.indices[a_start:a_end], matrix.indices[b_start:b_end],
+            assume_unique=True, return_indices=True,
+        )
+        return float(np.dot(matrix.data[a_start + a_hits], matrix.data[b_start + b_hits]))
+
+    def to_csr(self):
+        if self._csr is None:
+            self._csr = sparse.csr_matrix(
+                (self.scores, self.indices, self.indptr), shape=(len(self), len(self))
+            )
+        return self._csr
+
+    def pairwise(self, positions):
+        """
+        Dense len(positions) x len(positions) similarity block.
+
+        Stored neighbor scores are read from the graph; every pair missing
+        from it is filled with one sparse product over the requested rows.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        m = len(positions)
+        if m == 0:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        block = self.to_csr()[positions][:, positions].toarray()
+        stored = block > 0
+        stored |= stored.T
+        block = np.maximum(block, block.T)
+        np.fill_diagonal(stored, True)
+        np.fill_diagonal(block, 1.0)
+
+        if self.content_matrix is not None and not stored.all():
+            rows = self.content_matrix[positions]
+            exact = (rows @ rows.T).toarray().astype(np.float32)
+            block = np.where(stored, block, exact)
+
+        return block
+
+
+def build_neighbor_graph(content_matrix, k=DEFAULT_TOP_K, block_size=DEFAULT_BLOCK_SIZE,
+                         progress=None, workers=1):
+    """
+    Build a NeighborGraph from an L2-normalized TF-IDF matrix.
+
+    Similarity is computed one row block at a time, so peak memory is
+    block_size x N instead of N x N. With workers > 1 the blocks are
+    spread over a process pool; each worker holds one block at a time.
+    """
+    content_matrix = sparse.csr_matrix(content_matrix)
+    n_rows = content_matrix.shape[0]
+    k = max(0, min(k, n_rows - 1))
+    starts = range(0, n_rows, block_size)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_block_worker,
+                                 initargs=(content_matrix, k, block_size)) as executor:
+            blocks = executor.map(_top_k_block, starts)
+            return _assemble_graph(n_rows, blocks, content_matrix=content_matrix, progress=progress)
+
+    _init_block_worker(content_matrix, k, block_size)
+    try:
+        return _assemble_graph(n_rows, map(_top_k_block, starts), content_matrix=content_matrix,
+                               progress=progress)
+    finally:
+        _block_worker_state.clear()
+
+
+def dense_to_neighbor_graph(cosine_sim_matrix, k=DEFAULT_TOP_K, content_matrix=None,
+                            block_size=DEFAULT_BLOCK_SIZE):
+    """Convert a legacy dense N x N similarity matrix into a NeighborGraph."""
+    matrix = np.asarray(cosine_sim_matrix)
+    n_rows = matrix.shape[0]
+    k = max(0, min(k, n_rows - 1))
+
+    def blocks():
+        for start in range(0, n_rows, block_size):
+            end = min(start + block_size, n_rows)
+            sims = np.array(matrix[start:end], dtype=np.float64)
+            yield (start, end) + top_k_rows(sims, k, offset=start)
+
+    return _assemble_graph(n_rows, blocks(), content_matrix=content_matrix)
+
+
+# Per-process state for build_neighbor_graph blocks (set by the pool initializer)
+_block_worker_state = {}
+
+
+def _init_block_worker(content_matrix, k, block_size):
+    # Scores are stored as float32, so the products can run in float32 too
+    _block_worker_state.update(
+        content_matrix=content_matrix.astype(np.float32),
+        k=k,
+        block_size=block_size,
+    )
+
+
+def _top_k_block(start):
+    state = _block_worker_state
+    matrix = state["content_matrix"]
+    end = min(start + state["block_size"], matrix.shape[0])
+    # Sparse x dense is much cheaper than building a dense-ish sparse product
+    sims = np.ascontiguousarray((matrix @ matrix[start:end].toarray().T).T)
+    return (start, end) + top_k_rows(sims, state["k"], offset=start)
+
+
+def _assemble_graph(n_rows, blocks, content_matrix=None, progress=None):
+    """Concatenate (start, end, indices, scores, counts) blocks, in row order."""
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    index_blocks = [np.zeros(0, dtype=np.int32)]
+    score_blocks = [np.zeros(0, dtype=np.float32)]
+
+    for start, end, index_block, score_block, counts in blocks:
+        index_blocks.append(index_block)
+        score_blocks.append(score_block)
+        indptr[start + 1:end + 1] = counts
+        if progress:
+            progress(end, n_rows)
+
+    np.cumsum(indptr, out=indptr)
+    return NeighborGraph(indptr, np.concatenate(index_blocks), np.concatenate(score_blocks),
+                         content_matrix=content_matrix)
+
+
+def top_k_rows(sims, k, offset=0):
+    """
+    Keep the k best non-self, positive scores of every row in sims.
+
+    Returns flat column indices (sorted within each row), their float32
+    scores and the per-row counts.
+    """
+    n_block, n_cols = sims.shape
+    rows = np.arange(n_block)
+    self_cols = rows + offset
+    in_range = self_cols < n_cols
+    sims[rows[in_range], self_cols[in_range]] = 0.0
+
+    if k == 0 or n_cols == 0:
+        return (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32),
+                np.zeros(n_block, dtype=np.int64))
+
+    if k < n_cols:
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(n_cols), (n_block, n_cols))
+    top = np.sort(top, axis=1)
+    top_scores = np.take_along_axis(sims, top, axis=1)
+
+    keep = top_scores > 0
+    counts = keep.sum(axis=1).astype(np.int64)
+    return top[keep].astype(np.int32), top_scores[keep].astype(np.float32), counts
+
+
+class PoolSimilarity:
+    """
+    Similarity columns over a fixed pool of catalog positions.
+
+    Used by resumable selections: column(i) is the similarity of every
+    pool member to pool member i, and sums(selected) rebuilds the running
+    similarity sums of a previous selection with one sparse product.
+    """
+
+    def __init__(self, graph, positions):
+        self.positions = np.asarray(positions, dtype=np.int64)
+        self.rows = None
+        self.block = None
+        if graph is not None and graph.content_matrix is not None:
+            self.rows = graph.content_matrix[self.positions]
+        elif graph is not None:
+            self.block = graph.pairwise(self.positions)
+
+    def column(self, idx):
+        if self.block is not None:
+            return self.block[:, idx]
+        if self.rows is None:
+            return np.zeros(len(self.positions))
+        return (self.rows @ self.rows[idx].T).toarray().ravel()
+
+    def sums(self, selected):
+        selected = np.asarray(selected, dtype=np.int64)
+        if self.block is not None:
+            return self.block[:, selected].sum(axis=1, dtype=np.float64)
+        if self.rows is None or len(selected) == 0:
+            return np.zeros(len(self.positions))
+        return np.asarray(self.rows @ self.rows[selected].sum(axis=0).T).ravel()
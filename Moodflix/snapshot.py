@@ -0,0 +1,69 @@
+"""
+Immutable model snapshots.
+
+Everything derived from one model version (catalog, similarity, indexes,
+card store) is built into a ModelSnapshot before it is published. A
+reload builds a new snapshot off the request path and replaces the
+module-level reference in one assignment. A request takes the reference
+once and keeps using that snapshot, so it never mixes two versions.
+The old snapshot is freed when its last request finishes; until then
+both versions are in memory.
+"""
+import threading
+
+
+class ModelSnapshot:
+    """One loaded model version. Attributes are set once, in __init__."""
+
+    def __init__(self, movies_df, content_matrix, neighbor_graph, mood_rankings, neighbor_search=None,
+                 title_index=None, surprise_sampler=None, card_store=None, attribute_index=None,
+                 genre_matrix=None, version=None, source=None, artifact_bytes=None, load_seconds=None):
+        self.movies_df = movies_df
+        self.content_matrix = content_matrix
+        self.neighbor_graph = neighbor_graph
+        self.mood_rankings = mood_rankings
+        self.neighbor_search = neighbor_search
+        self.title_index = title_index
+        self.surprise_sampler = surprise_sampler
+        self.card_store = card_store
+        self.attribute_index = attribute_index
+        self.genre_matrix = genre_matrix
+        self.version = version
+        self.source = source
+        self.artifact_bytes = artifact_bytes
+        self.load_seconds = load_seconds
+
+    def __len__(self):
+        return len(self.movies_df)
+
+
+class ModelWatcher:
+    """
+    Calls reload() every `interval` seconds on a daemon thread.
+    reload() itself decides whether the artifacts changed.
+    """
+
+    def __init__(self, reload, interval, log=print):
+        self.reload = reload
+        self.interval = interval
+        self.log = log
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reload()
+            except Exception as e:
+                # The current snapshot keeps serving; try again next interval
+                self.log("ML model reload failed:", e)
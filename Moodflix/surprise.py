@@ -0,0 +1,140 @@
+import numpy as np
+
+from .moods import mood_column
+
+
+# Titles below this (vote-count adjusted) rating are never drawn
+SURPRISE_MIN_RATING = 5.0
+# Extra draw rounds before falling back to sampling without replacement
+MAX_DRAW_ROUNDS = 8
+
+
+# ---------------------------
+# Alias sampling
+# ---------------------------
+class AliasTable:
+    """
+    Walker/Vose alias table: O(N) to build, O(1) per weighted draw.
+
+    Position i is drawn with probability weights[i] / sum(weights).
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        self.weights = weights
+        self.support = int(np.count_nonzero(weights > 0))
+        self.prob = np.ones(n)
+        self.alias = np.arange(n, dtype=np.int64)
+        total = weights.sum()
+        if n == 0 or total <= 0:
+            return
+
+        scaled = weights * (n / total)
+        small = list(np.flatnonzero(scaled < 1.0))
+        large = list(np.flatnonzero(scaled >= 1.0))
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Leftovers are 1 up to rounding
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.prob)
+
+    def draw(self, rng, size):
+        """size independent weighted draws (with replacement)."""
+        columns = rng.integers(0, len(self.prob), size=size)
+        keep = rng.random(size) < self.prob[columns]
+        return np.where(keep, columns, self.alias[columns])
+
+    def sample(self, k, rng):
+        """
+        k distinct positions, each drawn in proportion to its weight among
+        the positions not drawn yet.
+
+        Duplicates are rejected, so the expected cost is O(k) while k is
+        small next to the number of positive weights.
+        """
+        k = min(k, self.support)
+        selected = {}
+        for _ in range(MAX_DRAW_ROUNDS):
+            missing = k - len(selected)
+            if missing <= 0:
+                break
+            for pos in self.draw(rng, 2 * missing).tolist():
+                selected.setdefault(pos, None)
+                if len(selected) == k:
+                    break
+        picked = list(selected)
+        if len(picked) < k:
+            # Weight mass concentrated on few titles: finish without replacement
+            weights = self.weights.copy()
+            weights[picked] = 0.0
+            rest = rng.choice(len(weights), size=k - len(picked), replace=False, p=weights / weights.sum())
+            picked.extend(rest.tolist())
+        return np.asarray(picked, dtype=np.int64)
+
+
+# ---------------------------
+# Surprise sampler
+# ---------------------------
+def weighted_ratings(ratings, vote_counts):
+    """IMDb-style Bayesian average: ratings with few votes shrink to the mean."""
+    prior_votes = np.median(vote_counts) if len(vote_counts) else 0.0
+    mean = ratings.mean() if len(ratings) else 0.0
+    total = vote_counts + prior_votes
+    total[total == 0] = 1.0
+    return (vote_counts * ratings + prior_votes * mean) / total
+
+
+def surprise_weights(ratings, vote_counts, popularity):
+    """
+    Sampling weight per title: high, well-supported ratings count more and
+    very popular titles count less, so draws lean towards hidden gems.
+    """
+    quality = np.clip(weighted_ratings(ratings, vote_counts) - SURPRISE_MIN_RATING, 0.0, None) ** 2
+    novelty = 1.0 / np.log(np.e + np.clip(popularity, 0.0, None))
+    return quality * novelty
+
+
+class SurpriseSampler:
+    """One alias table over the whole catalog plus one per mood."""
+
+    def __init__(self, global_table, mood_tables):
+        self.global_table = global_table
+        self.mood_tables = mood_tables
+
+    def table(self, mood=None):
+        if mood is None:
+            return self.global_table
+        return self.mood_tables.get(mood)
+
+    def sample(self, k, mood=None, seed=None):
+        """k distinct catalog positions; the same seed gives the same titles."""
+        table = self.table(mood)
+        if table is None:
+            raise ValueError(f"Unknown mood '{mood}'")
+        return table.sample(k, np.random.default_rng(seed))
+
+
+def build_surprise_sampler(movies_df, moods):
+    def column(name):
+        if name not in movies_df.columns:
+            return np.zeros(len(movies_df))
+        return np.nan_to_num(movies_df[name].to_numpy(dtype=np.float64), nan=0.0)
+
+    weights = surprise_weights(column("vote_average"), column("vote_count"), column("popularity"))
+
+    mood_tables = {}
+    for mood in moods:
+        scores = np.clip(column(mood_column(mood)), 0.0, None)
+        if mood_column(mood) not in movies_df.columns or scores.max() <= 0:
+            continue
+        # Weight by how strongly the title fits the mood
+        mood_tables[mood] = AliasTable(weights * (scores / scores.max()) ** 2)
+    return SurpriseSampler(AliasTable(weights), mood_tables)
@@ -1,3 +1,1727 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import MinMaxScaler
+
+from .diversity import select_diverse, select_diverse_reference
+from benchmarks.lsh import RandomProjectionIndex
+from benchmarks.tmdb_stub import StubTMDBServer
+
+from .bundle import export_bundle, load_bundle
+from .cards import build_card_store, payload
+from .db_backend import pack_vector, unpack_vectors
+from .cursors import InvalidCursor, decode_cursor, recommend_page
+from .diversity import DiverseSelection
+from .filters import Bitset, build_attribute_index, parse_filters
+from . import metrics, response_cache
+from .models import Movie, UserPreference
+from .mood_scoring import mood_scores, mood_scores_reference
+from .moods import MOODS
+from .posters import PosterResolver
+from .rankings import build_mood_rankings
+from .surprise import AliasTable, build_surprise_sampler
+from .seen import SeenStore, SeenTitles, get_seen_store
+from .search import TitleIndex, build_title_index, normalize_title
+from .similarity import NeighborGraph, PoolSimilarity, build_neighbor_graph, dense_to_neighbor_graph
+from .snapshot import ModelSnapshot, ModelWatcher
+from . import views
+from .neighbors import exact_neighbors
+from .personalization import GenreProfile, ProfileStore, build_genre_matrix, get_profile_store
+from .views import get_mood_based_recommendations_proc
+
+
+def make_content_matrix(n_rows=60, n_features=40, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = sparse.random(n_rows, n_features, density=0.15, random_state=rng, format="csr")
+    norms = np.sqrt(matrix.multiply(matrix).sum(axis=1)).A1
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix)
+
+
+def make_movies_df(n_rows=60, seed=0):
+    rng = np.random.default_rng(seed)
+    movies_df = pd.DataFrame({
+        "id": np.arange(n_rows) + 1000,
+        "title": [f"Movie {i}" for i in range(n_rows)],
+        "vote_average": np.round(rng.uniform(4, 9, n_rows), 1),
+        "vote_count": rng.integers(50, 5000, n_rows),
+        "popularity": rng.gamma(2.0, 10.0, n_rows),
+    })
+    for mood in MOODS:
+        movies_df[f"mood_{mood}_score"] = np.round(rng.uniform(0, 10, n_rows), 1)
+    # Preprocessing filters rows, so labels are not positions
+    movies_df.index = np.arange(n_rows) * 3 + 7
+    return movies_df
+
+
+def make_movie(tmdb_id, **fields):
+    values = {
+        "title": f"Movie {tmdb_id}", "overview": "", "vote_average": 7.0,
+        "vote_count": 100, "popularity": 10.0,
+    }
+    values.update(fields)
+    return Movie(tmdb_id=tmdb_id, **values)
+
+
+def reset_model():
+    views._snapshot = None
+    views._model_status.update(status="not_loaded", source=None, version=None, load_seconds=None,
+                               artifact_bytes=None, error=None, reloads=0)
+    caches["responses"].clear()
+    response_cache.reset_stats()
+
+
+def install_model(movies_df=None, content_matrix=None, version="test"):
+    """Publish a synthetic model as the served snapshot."""
+    movies_df = make_movies_df() if movies_df is None else movies_df
+    content_matrix = make_content_matrix(n_rows=len(movies_df)) if content_matrix is None else content_matrix
+    graph = build_neighbor_graph(content_matrix, k=5)
+    views._publish(ModelSnapshot(
+        movies_df,
+        content_matrix,
+        graph,
+        build_mood_rankings(movies_df, MOODS),
+        neighbor_search=views.build_neighbor_search(movies_df, content_matrix, graph),
+        title_index=build_title_index(movies_df),
+        surprise_sampler=build_surprise_sampler(movies_df, MOODS),
+        card_store=build_card_store(movies_df, views.format_movie_row),
+        attribute_index=build_attribute_index(movies_df),
+        genre_matrix=build_genre_matrix(movies_df),
+        version=version,
+        source="test",
+    ))
+    return movies_df
+
+
+class NeighborGraphTests(SimpleTestCase):
+    def setUp(self):
+        self.content_matrix = make_content_matrix()
+        self.dense = cosine_similarity(self.content_matrix)
+
+    def test_keeps_top_k_per_row(self):
+        graph = build_neighbor_graph(self.content_matrix, k=5, block_size=7)
+        for pos in range(len(graph)):
+            indices, scores = graph.neighbors(pos)
+            self.assertLessEqual(len(indices), 5)
+            self.assertNotIn(pos, indices)
+            row = self.dense[pos].copy()
+            row[pos] = 0
+            expected = np.sort(row)[::-1][:len(scores)]
+            np.testing.assert_allclose(np.sort(scores)[::-1], expected, rtol=1e-5)
+
+    def test_process_pool_build_matches_serial(self):
+        serial = build_neighbor_graph(self.content_matrix, k=5, block_size=7)
+        parallel = build_neighbor_graph(self.content_matrix, k=5, block_size=7, workers=2)
+        np.testing.assert_array_equal(parallel.indptr, serial.indptr)
+        np.testing.assert_array_equal(parallel.indices, serial.indices)
+        np.testing.assert_array_equal(parallel.scores, serial.scores)
+
+    def test_similarity_matches_dense_with_fallback(self):
+        graph = build_neighbor_graph(self.content_matrix, k=3)
+        for a in range(0, 60, 7):
+            for b in range(0, 60, 5):
+                if a != b:
+                    self.assertAlmostEqual(graph.similarity(a, b), self.dense[a, b], places=5)
+
+    def test_pairwise_block_matches_dense(self):
+        graph = build_neighbor_graph(self.content_matrix, k=4)
+        positions = [3, 17, 42, 8, 55]
+        block = graph.pairwise(positions)
+        expected = self.dense[np.ix_(positions, positions)]
+        np.fill_diagonal(expected, 1.0)
+        np.testing.assert_allclose(block, expected, atol=1e-6)
+
+    def test_dense_conversion_matches_build(self):
+        built = build_neighbor_graph(self.content_matrix, k=6)
+        converted = dense_to_neighbor_graph(self.dense, k=6)
+        np.testing.assert_array_equal(built.indptr, converted.indptr)
+        np.testing.assert_array_equal(built.indices, converted.indices)
+        np.testing.assert_allclose(built.scores, converted.scores, rtol=1e-5)
+
+
+class DiversitySelectionTests(SimpleTestCase):
+    def test_matches_reference_loop(self):
+        for seed, (n, factor) in enumerate([(1, 0.3), (5, 0.3), (10, 0.0), (12, 0.6), (20, 1.0)]):
+            content_matrix = make_content_matrix(n_rows=n * 5, seed=seed)
+            sim_block = cosine_similarity(content_matrix)
+            self.assertEqual(
+                select_diverse(sim_block, n, factor),
+                select_diverse_reference(sim_block, n, factor),
+            )
+
+    def test_fewer_candidates_than_requested(self):
+        sim_block = np.eye(3)
+        self.assertEqual(select_diverse(sim_block, 10), [0, 1, 2])
+        self.assertEqual(select_diverse(np.zeros((0, 0)), 10), [])
+
+    def test_zero_diversity_keeps_ranking_order(self):
+        sim_block = cosine_similarity(make_content_matrix(n_rows=25))
+        self.assertEqual(select_diverse(sim_block, 5, 0.0), [0, 1, 2, 3, 4])
+
+
+class MoodRankingTests(SimpleTestCase):
+    def reference_candidates(self, movies_df, mood, size):
+        col = f"mood_{mood}_score"
+        candidates_df = movies_df.nlargest(size, col).copy()
+        scaler = MinMaxScaler()
+        candidates_df["composite_score"] = (
+            0.5 * scaler.fit_transform(candidates_df[[col]]).ravel() +
+            0.3 * scaler.fit_transform(candidates_df[["vote_average"]]).ravel() +
+            0.2 * scaler.fit_transform(candidates_df[["popularity"]]).ravel()
+        )
+        return candidates_df.sort_values("composite_score", ascending=False, kind="stable")
+
+    def test_candidates_match_pandas_scoring(self):
+        movies_df = make_movies_df()
+        rankings = build_mood_rankings(movies_df, MOODS)
+        for mood in ("happy", "scared"):
+            for size in (1, 10, 25, 60, 100):
+                positions, composite = rankings.for_mood(mood).candidates(size)
+                expected = self.reference_candidates(movies_df, mood, size)
+                self.assertEqual(list(movies_df.index[positions]), list(expected.index))
+                np.testing.assert_allclose(composite, expected["composite_score"], atol=1e-12)
+
+    def test_does_not_mutate_catalog(self):
+        movies_df = make_movies_df()
+        movies_df.loc[movies_df.index[0], "mood_sad_score"] = np.nan
+        build_mood_rankings(movies_df, MOODS).for_mood("sad").candidates(10)
+        self.assertTrue(np.isnan(movies_df["mood_sad_score"].iloc[0]))
+
+    def test_missing_mood_column_is_skipped(self):
+        movies_df = make_movies_df().drop(columns=["mood_happy_score"])
+        rankings = build_mood_rankings(movies_df, MOODS)
+        self.assertIsNone(rankings.for_mood("happy"))
+        self.assertEqual(rankings.top_rated[0], movies_df["vote_average"].to_numpy().argmax())
+
+
+class PosterResolverTests(SimpleTestCase):
+    def setUp(self):
+        self.server = StubTMDBServer(latency=0.05, slow_ids={13}, missing_ids={14}).start()
+        self.resolver = PosterResolver(self.server.api_url, "test-key", timeout=2.0, deadline=0.5,
+                                       max_workers=8, cache_alias="default")
+        self.resolver.cache.clear()
+
+    def tearDown(self):
+        self.server.stop()
+        self.resolver.cache.clear()
+
+    def test_batch_is_fetched_concurrently(self):
+        movies = [(tmdb_id, "") for tmdb_id in range(1, 9)]
+        start = time.perf_counter()
+        posters = self.resolver.resolve_many(movies)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(posters, [StubTMDBServer.poster_for(tmdb_id) for tmdb_id, _ in movies])
+        self.assertEqual(self.server.requests, 8)
+        # Serial calls would take 8 x 50 ms
+        self.assertLess(elapsed, 0.3)
+
+    def test_cached_ids_skip_http(self):
+        self.resolver.resolve_many([(1, ""), (2, "")])
+        self.resolver.lru.clear()
+        self.resolver.resolve_many([(1, ""), (2, "")])
+        self.resolver.resolve_many([(1, ""), (2, "")])
+        self.assertEqual(self.server.requests, 2)
+
+    def test_stored_paths_skip_http(self):
+        posters = self.resolver.resolve_many([(1, "/a.jpg"), (2, None)])
+        self.assertEqual(posters, ["/a.jpg", StubTMDBServer.poster_for(2)])
+        self.assertEqual(self.server.requests, 1)
+
+    def test_slow_and_missing_are_returned_empty(self):
+        start = time.perf_counter()
+        posters = self.resolver.resolve_many([(13, ""), (14, ""), (15, "")])
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(posters, [None, None, StubTMDBServer.poster_for(15)])
+
+    def test_errors_are_not_cached(self):
+        self.server.error_rate = 1.0
+        self.assertEqual(self.resolver.resolve_many([(3, "")]), [None])
+        self.server.error_rate = 0.0
+        self.assertEqual(self.resolver.resolve_many([(3, "")]), [StubTMDBServer.poster_for(3)])
+
+
+class BackfillPostersTests(TestCase):
+    def setUp(self):
+        self.server = StubTMDBServer(missing_ids={5}).start()
+        resolver = PosterResolver(self.server.api_url, "test-key", cache_alias="default")
+        resolver.cache.clear()
+        self.patcher = mock.patch(
+            "Moodflix.management.commands.backfill_posters.get_poster_resolver", return_value=resolver
+        )
+        self.patcher.start()
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+        Movie.objects.bulk_create([make_movie(tmdb_id) for tmdb_id in range(1, 11)])
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.server.stop()
+
+    def backfill(self, *args):
+        out = StringIO()
+        call_command("backfill_posters", "--rate", "0", "--batch-size", "3",
+                     "--checkpoint", self.checkpoint, *args, stdout=out)
+        return out.getvalue()
+
+    def test_fills_poster_paths_in_batches(self):
+        output = self.backfill()
+        self.assertIn("titles/s", output)
+        posters = dict(Movie.objects.values_list("tmdb_id", "poster_path"))
+        self.assertEqual(posters[1], StubTMDBServer.poster_for(1))
+        self.assertEqual(posters[5], "")
+        self.assertEqual(self.server.requests, 10)
+
+    def test_resumes_from_checkpoint(self):
+        self.backfill("--limit", "4")
+        self.assertEqual(Movie.objects.filter(poster_path__isnull=True).count(), 6)
+        self.backfill()
+        self.assertEqual(Movie.objects.filter(poster_path__isnull=True).count(), 0)
+        self.assertEqual(self.server.requests, 10)
+
+    def test_finished_run_clears_checkpoint(self):
+        self.backfill()
+        self.assertFalse(os.path.exists(self.checkpoint))
+        # A title loaded later with a lower id is picked up by the next run
+        Movie.objects.filter(tmdb_id=1).delete()
+        Movie.objects.bulk_create([make_movie(1)])
+        self.backfill()
+        self.assertEqual(Movie.objects.get(tmdb_id=1).poster_path, StubTMDBServer.poster_for(1))
+
+    def test_failed_movies_are_retried_by_the_next_run(self):
+        self.server.error_rate = 1.0
+        self.backfill("--retries", "0", "--limit", "3")
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f), {"last_tmdb_id": 3, "failed_tmdb_ids": [1, 2, 3]})
+
+        self.server.error_rate = 0.0
+        self.backfill()
+        self.assertEqual(Movie.objects.filter(poster_path__isnull=True).count(), 0)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_failures_are_retried_then_left_empty(self):
+        self.server.error_rate = 1.0
+        self.backfill("--retries", "1", "--backoff", "0", "--limit", "2")
+        self.assertEqual(self.server.requests, 4)
+        self.assertEqual(Movie.objects.filter(poster_path__isnull=True).count(), 10)
+
+
+class ModelBundleTests(SimpleTestCase):
+    def test_round_trip_is_memory_mapped(self):
+        movies_df = make_movies_df()
+        content_matrix = make_content_matrix()
+        graph = build_neighbor_graph(content_matrix, k=5)
+
+        with tempfile.TemporaryDirectory() as path:
+            manifest = export_bundle(path, movies_df, content_matrix, graph)
+            loaded_df, loaded_matrix, loaded_graph, loaded_manifest = load_bundle(path)
+
+            self.assertEqual(loaded_manifest["version"], manifest["version"])
+            self.assertFalse(loaded_graph.scores.flags.writeable)
+            self.assertFalse(loaded_matrix.indices.flags.writeable)
+            np.testing.assert_array_equal(loaded_graph.indices, graph.indices)
+            self.assertEqual((loaded_matrix != content_matrix).nnz, 0)
+
+            rankings = build_mood_rankings(movies_df, MOODS)
+            expected = get_mood_based_recommendations_proc(movies_df, graph, rankings, "happy", n=8)
+            loaded_rankings = build_mood_rankings(loaded_df, MOODS)
+            actual = get_mood_based_recommendations_proc(loaded_df, loaded_graph, loaded_rankings, "happy", n=8)
+            self.assertEqual(actual, expected)
+
+    def test_version_changes_with_content(self):
+        movies_df = make_movies_df()
+        content_matrix = make_content_matrix()
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            a = export_bundle(first, movies_df, content_matrix, build_neighbor_graph(content_matrix, k=5))
+            b = export_bundle(second, movies_df, content_matrix, build_neighbor_graph(content_matrix, k=6))
+        self.assertNotEqual(a["version"], b["version"])
+
+    def test_reexport_leaves_mapped_files_alone(self):
+        movies_df = make_movies_df()
+        content_matrix = make_content_matrix()
+        with tempfile.TemporaryDirectory() as path:
+            export_bundle(path, movies_df, content_matrix, build_neighbor_graph(content_matrix, k=5))
+            _, _, old_graph, old_manifest = load_bundle(path)
+            old_scores = np.array(old_graph.scores)
+
+            # A new version, then the same version again over the mapped files
+            export_bundle(path, movies_df, content_matrix, build_neighbor_graph(content_matrix, k=6))
+            export_bundle(path, movies_df, content_matrix, build_neighbor_graph(content_matrix, k=7))
+            # Only the current and the previous version stay on disk
+            versions = {name.split(".")[1] for name in os.listdir(path) if name != "manifest.json"}
+            self.assertEqual(len(versions), 2)
+            self.assertNotIn(old_manifest["version"], versions)
+
+            _, _, graph, manifest = load_bundle(path)
+            scores = np.array(graph.scores)
+            again = export_bundle(path, movies_df, content_matrix, build_neighbor_graph(content_matrix, k=7))
+            self.assertEqual(again["version"], manifest["version"])
+            np.testing.assert_array_equal(graph.scores, scores)
+            np.testing.assert_array_equal(old_graph.scores, old_scores)
+
+
+@override_settings(MODEL_BUNDLE_DIR="/nonexistent/model_bundle")
+class ModelWarmUpTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        self.load_calls = 0
+
+    def slow_load(self, *args):
+        self.load_calls += 1
+        time.sleep(0.2)
+        content_matrix = make_content_matrix()
+        return make_movies_df(), content_matrix, build_neighbor_graph(content_matrix, k=5)
+
+    def test_concurrent_callers_load_once(self):
+        results = []
+        with mock.patch.object(views, "load_model_pickles", self.slow_load), \
+                mock.patch.object(views, "model_pickle_paths", return_value=()):
+            threads = [threading.Thread(target=lambda: results.append(views.load_ml_model())) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(self.load_calls, 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result[0] is results[0][0] for result in results))
+
+    def test_readiness_endpoint(self):
+        response = self.client.get("/health/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["status"], "not_loaded")
+
+        with mock.patch.object(views, "load_model_pickles", self.slow_load), \
+                mock.patch.object(views, "model_pickle_paths", return_value=()):
+            views.warm_up_in_background().join()
+
+        response = self.client.get("/health/ready")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["status"], "ready")
+        self.assertEqual(body["source"], "pickle")
+        self.assertGreaterEqual(body["load_seconds"], 0.2)
+        self.assertEqual(body["movies"], 60)
+
+    @override_settings(MOODFLIX_WARMUP=True, MODEL_WATCH_INTERVAL=0)
+    def test_only_server_processes_warm_up(self):
+        with mock.patch.object(views, "warm_up_in_background") as warm_up, \
+                mock.patch.object(views, "get_seen_store"):
+            apps.get_app_config("Moodflix").ready()
+            self.assertFalse(warm_up.called)
+            views.start_server_tasks()
+            self.assertEqual(warm_up.call_count, 1)
+            with self.settings(RECOMMENDATION_BACKEND="database"):
+                views.start_server_tasks()
+            self.assertEqual(warm_up.call_count, 1)
+
+    def test_failed_load_is_reported(self):
+        with mock.patch.object(views, "load_model_pickles", side_effect=FileNotFoundError("no model")):
+            with self.assertRaises(FileNotFoundError):
+                views.load_ml_model()
+        response = self.client.get("/health/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["error"], "no model")
+
+
+@override_settings(CURSOR_MAX_PAGES=4)
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        self.movies_df = install_model(make_movies_df(n_rows=200), make_content_matrix(n_rows=200))
+        patcher = mock.patch.object(views, "attach_posters", lambda movies: True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pages(self, count, diversity=0.3, mood="happy"):
+        positions, cursor, _ = recommend_page(views._snapshot.neighbor_graph, views._snapshot.mood_rankings, mood, count,
+                                           diversity, "test")
+        pages = [list(positions)]
+        while cursor:
+            positions, cursor, _ = recommend_page(views._snapshot.neighbor_graph, views._snapshot.mood_rankings, None, count,
+                                               None, "test", cursor=cursor)
+            pages.append(list(positions))
+        return pages
+
+    def test_pages_continue_one_selection(self):
+        pages = self.pages(count=5)
+        served = [pos for page in pages for pos in page]
+
+        pool, _ = views._snapshot.mood_rankings.for_mood("happy").candidates(5 * 5 * 4)
+        pool_sims = PoolSimilarity(views._snapshot.neighbor_graph, pool)
+        expected = DiverseSelection(len(pool), pool_sims.column, 0.3).extend(len(served))
+
+        self.assertEqual(served, list(pool[expected]))
+        self.assertEqual(len(set(served)), len(served))
+        self.assertEqual(len(pages[-1]), 5)
+        self.assertEqual(len(served), 100)
+
+    def test_rejects_tampered_and_stale_cursors(self):
+        _, cursor, _ = recommend_page(views._snapshot.neighbor_graph, views._snapshot.mood_rankings, "sad", 5, 0.3, "test")
+        with self.assertRaises(InvalidCursor):
+            recommend_page(views._snapshot.neighbor_graph, views._snapshot.mood_rankings, None, 5, None, "test", cursor=cursor[:-2] + "xx")
+        with self.assertRaises(InvalidCursor):
+            recommend_page(views._snapshot.neighbor_graph, views._snapshot.mood_rankings, None, 5, None, "other", cursor=cursor)
+
+    def test_view_returns_next_cursor(self):
+        response = self.client.post("/recommendations/", {"mood": "happy", "count": 4, "paginate": "cursor"},
+                                    content_type="application/json")
+        first = response.json()
+        self.assertEqual(first["count"], 4)
+        self.assertTrue(first["next_cursor"])
+
+        response = self.client.post("/recommendations/", {"cursor": first["next_cursor"], "count": 4},
+                                    content_type="application/json")
+        second = response.json()
+        self.assertEqual(second["mood"], "happy")
+        first_ids = {movie["id"] for movie in first["recommendations"]}
+        self.assertFalse(first_ids & {movie["id"] for movie in second["recommendations"]})
+
+        response = self.client.post("/recommendations/", {"cursor": "bogus", "count": 4},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        for cursor in (5, ["a"], {"s": []}):
+            response = self.client.post("/recommendations/", {"cursor": cursor, "count": 4},
+                                        content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["error"], "Invalid or expired cursor")
+
+    def test_cursor_page_size_is_clamped(self):
+        with self.settings(CURSOR_MAX_COUNT=3):
+            response = self.client.post("/recommendations/", {"mood": "happy", "count": 1000, "paginate": "cursor"},
+                                        content_type="application/json")
+        body = response.json()
+        self.assertEqual(body["count"], 3)
+        self.assertEqual(decode_cursor(body["next_cursor"])["p"], 3 * 5 * 4)
+
+    def test_offset_paging_is_unchanged(self):
+        response = self.client.post("/recommendations/", {"mood": "happy", "count": 5, "offset": 5},
+                                    content_type="application/json")
+        body = response.json()
+        self.assertNotIn("next_cursor", body)
+        expected = get_mood_based_recommendations_proc(
+            self.movies_df, views._snapshot.neighbor_graph, views._snapshot.mood_rankings, "happy", n=10
+        )[5:]
+        self.assertEqual([movie["id"] for movie in body["recommendations"]],
+                         list(self.movies_df.loc[expected, "id"]))
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        install_model()
+        self.poster_calls = 0
+        self.posters_complete = True
+        patcher = mock.patch.object(views, "attach_posters", self.fake_posters)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_posters(self, movies):
+        self.poster_calls += 1
+        return self.posters_complete
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get("/recommendations/", {"mood": "happy", "count": 5})
+        second = self.client.post("/recommendations/", {"mood": "happy", "count": 5},
+                                  content_type="application/json")
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertIn("max-age=300", first["Cache-Control"])
+        self.assertEqual(self.poster_calls, 1)
+        self.assertEqual(self.client.get("/health/cache").json()["hits"], 1)
+
+    def test_parameters_and_model_version_are_part_of_the_key(self):
+        self.client.get("/recommendations/", {"mood": "happy", "count": 5})
+        self.assertEqual(self.client.get("/recommendations/", {"mood": "happy", "count": 6})["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/recommendations/", {"mood": "happy", "count": 5, "diversity": 0.5})["X-Cache"], "MISS")
+        install_model(version="retrained")
+        self.assertEqual(self.client.get("/recommendations/", {"mood": "happy", "count": 5})["X-Cache"], "MISS")
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get("/recommendations/", {"mood": "sad"})["ETag"]
+        response = self.client.get("/recommendations/", {"mood": "sad"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({"count": "ten"}, {"offset": "x"}, {"diversity": "much"}, {"count": 0},
+                       {"offset": -1}, {"diversity": 2}, {"count": 51}, {"count": 50, "offset": 451}):
+            response = self.client.get("/recommendations/", {"mood": "happy", **params})
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.json()["success"])
+        for body in ("{not json", "[1, 2]", '{"mood": ["happy"]}', '{"mood": {"a": 1}}'):
+            response = self.client.post("/recommendations/", body, content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+
+    def test_incomplete_posters_are_not_cached(self):
+        self.posters_complete = False
+        self.client.get("/recommendations/", {"mood": "happy"})
+        self.assertEqual(self.client.get("/recommendations/", {"mood": "happy"})["X-Cache"], "MISS")
+        self.assertEqual(response_cache.stats()["stores"], 0)
+
+
+class MixedMoodTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        self.movies_df = install_model(make_movies_df(n_rows=120), make_content_matrix(n_rows=120))
+        patcher = mock.patch.object(views, "attach_posters", lambda movies: True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, payload):
+        return self.client.post("/mixed-mood/", payload, content_type="application/json")
+
+    def ids(self, labels):
+        return list(self.movies_df.loc[labels, "id"])
+
+    def test_single_mood_blend_matches_mood_recommendations(self):
+        body = self.post({"moods": {"scared": 1}, "count": 6}).json()
+        expected = get_mood_based_recommendations_proc(
+            self.movies_df, views._snapshot.neighbor_graph, views._snapshot.mood_rankings, "scared", n=6
+        )
+        self.assertEqual([movie["id"] for movie in body["recommendations"]], self.ids(expected))
+        self.assertEqual(body["moods"], {"scared": 1.0})
+
+    def test_blend_scores_weighted_mood_columns(self):
+        rankings = views._snapshot.mood_rankings
+        vector = rankings.blend_vector({"happy": 0.7, "adventurous": 0.3})
+        [(positions, _)] = rankings.blended_candidates(vector[None, :], [10])
+
+        blended = 0.7 * self.movies_df["mood_happy_score"] + 0.3 * self.movies_df["mood_adventurous_score"]
+        top = set(self.movies_df.index.get_indexer(blended.nlargest(10).index))
+        self.assertEqual(set(positions), top)
+
+    def test_batch_returns_one_result_per_blend(self):
+        body = self.post({"count": 4, "blends": [
+            {"moods": {"happy": 0.7, "adventurous": 0.3}},
+            {"moods": {"sad": 1}, "count": 2},
+            {"moods": {"happy": 1}},
+        ]}).json()
+
+        self.assertTrue(body["success"])
+        self.assertEqual([result["count"] for result in body["results"]], [4, 2, 4])
+        single = self.post({"moods": {"happy": 1}, "count": 4}).json()
+        self.assertEqual(body["results"][2]["recommendations"], single["recommendations"])
+
+    def test_rejects_invalid_blends(self):
+        self.assertEqual(self.post({"moods": {"grumpy": 1}}).status_code, 400)
+        self.assertEqual(self.post({"moods": {"happy": -1}}).status_code, 400)
+        self.assertEqual(self.post({"moods": {}}).status_code, 400)
+        self.assertEqual(self.post({"blends": []}).status_code, 400)
+        self.assertEqual(self.post({"moods": {"happy": 1}, "count": -3}).status_code, 400)
+        self.assertEqual(self.post({"moods": {"happy": 1}, "count": "many"}).status_code, 400)
+        self.assertEqual(self.post({"blends": [{"moods": {"happy": 1}, "count": 0}]}).status_code, 400)
+        self.assertEqual(self.post({"moods": {"happy": 1}, "count": 51}).status_code, 400)
+        for payload, error in (
+            (5, "Body must be a JSON object"),
+            ([{"moods": {"happy": 1}}], "Body must be a JSON object"),
+            ({"moods": ["happy"]}, 'moods must be an object like {"happy": 0.7}'),
+            ({"moods": {"happy": [1]}}, "Mood weights must be numbers"),
+        ):
+            response = self.post(payload)
+            self.assertEqual(response.status_code, 400, payload)
+            self.assertEqual(response.json()["error"], error)
+        self.assertEqual(self.post({"moods": {"happy": 1}, "diversity": "wide"}).status_code, 400)
+
+
+class SimilarMoviesTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        self.content_matrix = make_content_matrix(n_rows=150, n_features=60)
+        self.movies_df = install_model(make_movies_df(n_rows=150), self.content_matrix)
+        patcher = mock.patch.object(views, "attach_posters", lambda movies: True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_exact_neighbors_match_dense_scan(self):
+        dense = cosine_similarity(self.content_matrix)
+        positions = [0, 17, 99]
+        indices, scores = exact_neighbors(self.content_matrix, positions, 7)
+        for row, pos in enumerate(positions):
+            expected = dense[pos].copy()
+            expected[pos] = -np.inf
+            np.testing.assert_allclose(scores[row], np.sort(expected)[::-1][:7], rtol=1e-9)
+            self.assertNotIn(pos, indices[row])
+
+    def test_approximate_index_finds_most_exact_neighbors(self):
+        index = RandomProjectionIndex(self.content_matrix, n_tables=12, n_bits=6)
+        positions = np.arange(0, 150, 10)
+        exact, _ = exact_neighbors(self.content_matrix, positions, 5)
+        approx, approx_scores = index.search(positions, 5)
+        recall = np.mean([len(set(a) & set(e)) / 5 for a, e in zip(approx, exact)])
+        self.assertGreater(recall, 0.6)
+        self.assertTrue(np.all(np.diff(approx_scores, axis=1)[np.isfinite(approx_scores[:, 1:])] <= 0))
+
+    def test_endpoint_accepts_one_or_many_ids(self):
+        first_id, second_id = self.movies_df["id"].iloc[[3, 40]]
+        response = self.client.get("/similar/", {"id": first_id, "k": 4})
+        body = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(body["results"][0]["similar"]), 4)
+        scores = [movie["similarity"] for movie in body["results"][0]["similar"]]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        response = self.client.post("/similar/", {"ids": [int(first_id), int(second_id), 1], "k": 3},
+                                    content_type="application/json")
+        body = response.json()
+        self.assertEqual([result["id"] for result in body["results"]], [first_id, second_id])
+        self.assertEqual(body["missing"], [1])
+
+    def test_approximate_requests_are_rejected(self):
+        tmdb_id = int(self.movies_df["id"].iloc[5])
+        response = self.client.get("/similar/", {"id": tmdb_id, "k": 5, "approximate": "true"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/similar/", {"id": tmdb_id, "approximate": True}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("approximate", self.client.get("/similar/", {"id": tmdb_id}).json())
+
+    def test_unknown_and_invalid_requests(self):
+        self.assertEqual(self.client.get("/similar/", {"id": 1}).status_code, 404)
+        self.assertEqual(self.client.get("/similar/").status_code, 400)
+        self.assertEqual(self.client.get("/similar/", {"id": 1003, "k": 0}).status_code, 400)
+        for body in ({"ids": "1000"}, {"ids": {"a": 1}}, [1, 2], 5):
+            response = self.client.post("/similar/", body, content_type="application/json")
+            self.assertEqual(response.status_code, 400, body)
+            self.assertFalse(response.json()["success"])
+
+
+class TitleSearchTests(TestCase):
+    TITLES = ["The Matrix", "The Matrix Reloaded", "Matilda", "Amélie", "Mad Max: Fury Road", "Heat"]
+
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        movies_df = make_movies_df(n_rows=len(self.TITLES))
+        movies_df["title"] = self.TITLES
+        movies_df["vote_average"] = [8.7, 7.2, 7.0, 8.3, 8.1, 8.3]
+        movies_df["popularity"] = [80.0, 40.0, 20.0, 30.0, 60.0, 35.0]
+        self.movies_df = install_model(movies_df)
+        self.index = views._snapshot.title_index
+
+    def titles(self, positions):
+        return [self.TITLES[pos] for pos in positions]
+
+    def test_normalize_title(self):
+        self.assertEqual(normalize_title("  Amélie: Le Fabuleux!  "), "amelie le fabuleux")
+
+    def test_prefix_matches_any_word_and_ranks_by_quality(self):
+        self.assertEqual(self.titles(self.index.prefix("mat")), ["The Matrix", "The Matrix Reloaded", "Matilda"])
+        self.assertEqual(self.titles(self.index.prefix("ROAD")), ["Mad Max: Fury Road"])
+        self.assertEqual(self.titles(self.index.prefix("ame")), ["Amélie"])
+        self.assertEqual(self.titles(self.index.prefix("m", limit=2)), ["The Matrix", "Mad Max: Fury Road"])
+
+    def test_memoized_common_prefixes_match_direct_ranking(self):
+        titles = [f"{word} {i}" for i in range(300) for word in ("Star", "Stone")]
+        index = TitleIndex(titles, np.arange(600) % 97, np.arange(600) % 13)
+        with mock.patch("Moodflix.search.PREFIX_CACHE_THRESHOLD", 100):
+            memoized = index.prefix("st", 20)
+            self.assertIn("st", index._prefix_cache)
+            np.testing.assert_array_equal(index.prefix("st", 20), memoized)
+        np.testing.assert_array_equal(memoized, index._best(np.arange(600), 20))
+
+    def test_titles_with_repeated_word_prefixes_fill_the_limit(self):
+        # Best-quality titles own several "t" keys each
+        titles = [f"Tea Time Tango Tide {i}" for i in range(25)] + [f"Other {i}" for i in range(10)]
+        quality = np.arange(35, 0, -1)
+        index = TitleIndex(titles, quality, quality)
+        expected = list(range(10))
+        self.assertEqual(index.prefix("t", 10).tolist(), expected)
+
+        with mock.patch("Moodflix.search.PREFIX_CACHE_THRESHOLD", 50):
+            self.assertEqual(index.prefix("t", 20).tolist(), list(range(20)))
+            self.assertIn("t", index._prefix_cache)
+            self.assertEqual(index.prefix("t", 25).tolist(), list(range(25)))
+
+    def test_fuzzy_tolerates_typos(self):
+        positions, similarity = self.index.fuzzy("the matrx")
+        self.assertEqual(self.titles(positions[:1]), ["The Matrix"])
+        self.assertTrue(np.all(np.diff(similarity) <= 0))
+        self.assertEqual(len(self.index.fuzzy("zzzz")[0]), 0)
+
+    def test_search_endpoint(self):
+        body = self.client.get("/search/", {"q": "matr"}).json()
+        self.assertEqual([movie["title"] for movie in body["results"]], ["The Matrix", "The Matrix Reloaded"])
+
+        body = self.client.get("/search/", {"q": "mad max fury raod"}).json()
+        self.assertEqual(body["results"][0]["title"], "Mad Max: Fury Road")
+
+        self.assertEqual(self.client.get("/search/").status_code, 400)
+        self.assertEqual(self.client.get("/search/", {"q": "x", "limit": 500}).status_code, 400)
+
+
+class LoadMoviesTests(TestCase):
+    def setUp(self):
+        self.movies_df = make_movies_df(n_rows=12)
+        self.movies_df["release_date"] = ["2001-02-03"] * 11 + ["not a date"]
+        self.movies_df["runtime"] = [120.0] * 11 + [np.nan]
+        self.movies_df["genre_names"] = [["Drama"]] * 12
+        self.pickle_path = os.path.join(tempfile.mkdtemp(), "processed_movies.pkl")
+        self.write_pickle()
+
+    def write_pickle(self):
+        self.movies_df.to_pickle(self.pickle_path)
+
+    def load(self, *args):
+        out = StringIO()
+        call_command("load_movies", "--pickle", self.pickle_path, "--batch-size", "5", *args, stdout=out)
+        return out.getvalue()
+
+    def test_converts_columns(self):
+        output = self.load()
+        self.assertIn("Wrote 12 new and 0 changed movies", output)
+        self.assertIn("rows/s", output)
+        movie = Movie.objects.get(tmdb_id=1000)
+        self.assertEqual(str(movie.release_date), "2001-02-03")
+        self.assertEqual(movie.runtime, 120)
+        self.assertEqual(movie.genres, ["Drama"])
+        self.assertEqual(movie.mood_happy, self.movies_df["mood_happy_score"].iloc[0])
+        last = Movie.objects.get(tmdb_id=1011)
+        self.assertIsNone(last.release_date)
+        self.assertIsNone(last.runtime)
+
+    def test_reload_writes_only_changed_rows_and_keeps_posters(self):
+        self.load()
+        Movie.objects.filter(tmdb_id=1000).update(poster_path="/kept.jpg")
+        self.movies_df.loc[self.movies_df.index[3], "vote_average"] = 9.9
+        self.write_pickle()
+
+        output = self.load()
+        self.assertIn("Wrote 0 new and 1 changed movies, 11 unchanged", output)
+        self.assertEqual(Movie.objects.get(tmdb_id=1003).vote_average, 9.9)
+        self.assertEqual(Movie.objects.get(tmdb_id=1000).poster_path, "/kept.jpg")
+
+    def test_dry_run_reports_diff_without_writing(self):
+        self.load()
+        self.movies_df.loc[self.movies_df.index[0], "title"] = "Renamed"
+        self.movies_df = self.movies_df.iloc[:-1]
+        self.write_pickle()
+
+        output = self.load("--dry-run", "--prune")
+        self.assertIn("1000 Renamed: title", output)
+        self.assertIn("Would write 0 new and 1 changed movies, 10 unchanged, 1 to remove", output)
+        self.assertEqual(Movie.objects.count(), 12)
+
+        self.load("--prune")
+        self.assertEqual(Movie.objects.count(), 11)
+        self.assertEqual(Movie.objects.get(tmdb_id=1000).title, "Renamed")
+
+
+class MoodScoringTests(TestCase):
+    def test_vectorized_scores_match_notebook_loop(self):
+        movies = pd.DataFrame({
+            "genres": [["Comedy", "Family"], ["Drama", "Drama", "Romance"], [], ["Horror"], ["Western"]],
+            "keyword": [["Friendship", "fun fair"], ["lost love"], ["slice of life"], [], ["haunted house", "ghost"]],
+            "vote_average": [7.1, 6.4, 8.0, 5.5, 6.0],
+            "popularity": [12.0, 3.0, 10.0, 40.0, np.nan],
+        }, index=[4, 9, 12, 20, 31])
+        vectorized = mood_scores(movies)
+        pd.testing.assert_frame_equal(vectorized, mood_scores_reference(movies))
+        # Comedy + Family (3 each), "friendship" and "fun" hints, rating, popularity
+        self.assertAlmostEqual(vectorized.loc[4, "mood_happy_score"], 6 + 3 + 1.42 + 0.5)
+        self.assertAlmostEqual(vectorized.loc[31, "mood_scared_score"], 3 + 1.2)
+
+    def test_build_catalog_from_tmdb_csvs(self):
+        directory = tempfile.mkdtemp()
+        pd.DataFrame({
+            "id": [1, 2, 3],
+            "title": ["Keep", "No Genres", "Few Votes"],
+            "overview": ["a", "b", "c"],
+            "genres": ['[{"id": 35, "name": "Comedy"}]', "[]", '[{"id": 18, "name": "Drama"}]'],
+            "keywords": ['[{"id": 1, "name": "Friendship"}]', "[]", "[]"],
+            "vote_average": [7.0, 6.0, 8.0],
+            "vote_count": [500, 500, 10],
+            "popularity": [20.0, 5.0, 1.0],
+            "release_date": ["2001-01-01"] * 3,
+            "runtime": [100, 90, 80],
+        }).to_csv(os.path.join(directory, "movies.csv"), index=False)
+        pd.DataFrame({
+            "movie_id": [1, 2, 3],
+            "title": ["Keep", "No Genres", "Few Votes"],
+            "cast": ['[{"name": "Actor A"}, {"name": "Actor B"}]', "[]", "[]"],
+            "crew": ['[{"name": "Someone", "job": "Director"}]', "[]", "[]"],
+        }).to_csv(os.path.join(directory, "credits.csv"), index=False)
+
+        out = StringIO()
+        output = os.path.join(directory, "processed_movies.pkl")
+        call_command("build_catalog", "--movies-csv", os.path.join(directory, "movies.csv"),
+                     "--credits-csv", os.path.join(directory, "credits.csv"),
+                     "--output", output, "--check", stdout=out)
+        self.assertIn("max abs diff 0.00e+00", out.getvalue())
+
+        processed = pd.read_pickle(output)
+        self.assertEqual(processed["title"].tolist(), ["Keep"])
+        row = processed.iloc[0]
+        self.assertEqual(row["genre_names"], ["Comedy"])
+        self.assertEqual(row["cast_names"], ["Actor A", "Actor B"])
+        self.assertEqual(row["director"], "Someone")
+        self.assertAlmostEqual(row["mood_happy_score"], 3 + 1.5 + 1.4 + 0.5)
+
+
+class BuildModelTests(TestCase):
+    def test_writes_model_load_ml_model_reads(self):
+        directory = tempfile.mkdtemp()
+        movies_df = make_movies_df(n_rows=40)
+        rng = np.random.default_rng(0)
+        words = ["space", "love", "war", "ghost", "heist", "island", "robot", "family", "detective", "storm"]
+        movies_df["overview"] = [" ".join(rng.choice(words, size=8)) for _ in range(len(movies_df))]
+        movies_df["genres"] = [["Drama"]] * len(movies_df)
+        movies_file = os.path.join(directory, "processed_movies.pkl")
+        model_file = os.path.join(directory, "ml_model.pkl")
+        stats_file = os.path.join(directory, "stats.json")
+        movies_df.to_pickle(movies_file)
+
+        out = StringIO()
+        call_command("build_model", "--movies", movies_file, "--output", model_file, "--k", "5",
+                     "--workers", "1", "--max-block-mb", "0.001", "--stats", stats_file, stdout=out)
+        self.assertIn("neighbor graph:", out.getvalue())
+        with open(stats_file) as f:
+            stats = json.load(f)
+        self.assertEqual([stage["stage"] for stage in stats["stages"]],
+                         ["load catalog", "tf-idf", "neighbor graph", "write model"])
+        self.assertEqual(stats["block_size"], 3)
+
+        _, content_matrix, graph = views.load_model_pickles(movies_file, model_file)
+        self.assertEqual(content_matrix.shape[0], 40)
+        self.assertEqual(graph.k, 5)
+        dense = cosine_similarity(content_matrix)
+        indices, scores = graph.neighbors(0)
+        np.testing.assert_allclose(scores, dense[0, indices], rtol=1e-5)
+
+
+class SurpriseTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        self.movies_df = install_model(make_movies_df(n_rows=80))
+        patcher = mock.patch.object(views, "attach_posters", lambda movies: True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_alias_table_draws_follow_weights(self):
+        weights = np.array([1.0, 0.0, 3.0, 6.0])
+        table = AliasTable(weights)
+        draws = table.draw(np.random.default_rng(0), 200000)
+        frequencies = np.bincount(draws, minlength=4) / len(draws)
+        np.testing.assert_allclose(frequencies, weights / weights.sum(), atol=0.005)
+
+    def test_sample_is_distinct_and_skips_zero_weights(self):
+        table = AliasTable([5.0, 0.0, 1.0, 0.0, 100.0])
+        picked = table.sample(10, np.random.default_rng(1))
+        self.assertEqual(sorted(picked.tolist()), [0, 2, 4])
+
+        table = AliasTable(np.random.default_rng(2).random(500))
+        picked = table.sample(40, np.random.default_rng(3))
+        self.assertEqual(len(set(picked.tolist())), 40)
+
+    def test_endpoint_is_reproducible_with_seed(self):
+        def surprise(**payload):
+            response = self.client.post("/surprise/", payload, content_type="application/json")
+            return response.status_code, response.json()
+
+        status, first = surprise(count=6, seed=7)
+        self.assertEqual(status, 200)
+        self.assertEqual(first["count"], 6)
+        _, again = surprise(count=6, seed=7)
+        self.assertEqual([m["id"] for m in again["recommendations"]], [m["id"] for m in first["recommendations"]])
+
+        status, happy = surprise(count=4, mood="happy", seed=7)
+        self.assertEqual(status, 200)
+        self.assertEqual(len({m["id"] for m in happy["recommendations"]}), 4)
+
+        self.assertEqual(surprise(count=3, mood="grumpy")[0], 400)
+        self.assertEqual(surprise(count=0)[0], 400)
+        for body in ([1], 5, {"mood": ["happy"]}, "{not json"):
+            data = body if isinstance(body, str) else json.dumps(body)
+            response = self.client.post("/surprise/", data, content_type="application/json")
+            self.assertEqual(response.status_code, 400, body)
+            self.assertFalse(response.json()["success"])
+
+
+class SeenTitlesTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        self.movies_df = install_model(make_movies_df(n_rows=120))
+        get_seen_store().clear()
+        self.addCleanup(get_seen_store().clear)
+        patcher = mock.patch.object(views, "attach_posters", lambda movies: True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_bitset_membership(self):
+        seen = SeenTitles(20, [0, 7, 8, 19, 7])
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(seen.contains([0, 1, 7, 8, 9, 19]).tolist(), [True, False, True, True, False, True])
+        self.assertEqual(seen.mark([1, 8, 25, -1]), 1)
+        self.assertEqual(seen.positions().tolist(), [0, 1, 7, 8, 19])
+        self.assertEqual(seen.nbytes, 3)
+
+    def test_candidates_skip_seen_titles(self):
+        ranking = views._snapshot.mood_rankings.for_mood("happy")
+        top, _ = ranking.candidates(10)
+        seen = SeenTitles(len(self.movies_df), top[:4])
+        candidates, _ = ranking.candidates(10, exclude=seen)
+        self.assertEqual(len(candidates), 10)
+        self.assertFalse(seen.contains(candidates).any())
+        self.assertEqual(set(candidates), set(ranking.order[:14]) - set(top[:4]))
+
+    def test_session_never_gets_a_title_twice(self):
+        served = []
+        for _ in range(5):
+            response = self.client.post("/recommendations/", {"mood": "sad", "count": 8, "exclude_seen": True},
+                                        content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("no-store", response["Cache-Control"])
+            served.extend(movie["id"] for movie in response.json()["recommendations"])
+        self.assertEqual(len(served), 40)
+        self.assertEqual(len(set(served)), 40)
+
+        # A new session starts from the top again
+        other = self.client_class()
+        response = other.post("/recommendations/", {"mood": "sad", "count": 8, "exclude_seen": True},
+                              content_type="application/json")
+        self.assertEqual([m["id"] for m in response.json()["recommendations"]], served[:8])
+
+    def test_cursor_paging_is_rejected(self):
+        response = self.client.post("/recommendations/", {"mood": "sad", "exclude_seen": True, "paginate": "cursor"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_history_is_written_back_in_batches_and_reloaded(self):
+        store = SeenStore(maxsize=10, flush_batch=3, flush_interval=3600)
+        catalog_ids = self.movies_df["id"].to_numpy()
+        for i in range(2):
+            seen = store.get(f"session-{i}", catalog_ids, "v1")
+            seen.mark([i, 10 + i])
+            store.record(f"session-{i}", seen)
+        self.assertEqual(UserPreference.objects.count(), 0)
+        self.assertEqual(store.pending, 2)
+
+        seen = store.get("session-2", catalog_ids, "v1")
+        seen.mark([5])
+        store.record("session-2", seen)
+        self.assertEqual(store.pending, 0)
+        stored = dict(UserPreference.objects.values_list("session_key", "viewed_movies"))
+        self.assertEqual(stored["session-1"], [int(catalog_ids[1]), int(catalog_ids[11])])
+
+        # Another process (or a new model version) rebuilds the bitset from the ids
+        fresh = SeenStore().get("session-1", catalog_ids[::-1].copy(), "v2")
+        self.assertEqual(sorted(fresh.catalog_ids[fresh.positions()].tolist()),
+                         [int(catalog_ids[1]), int(catalog_ids[11])])
+
+    def test_workers_merge_history_instead_of_overwriting(self):
+        catalog_ids = self.movies_df["id"].to_numpy()
+        ids = lambda positions: [int(i) for i in catalog_ids[positions]]
+        # Two workers serving the same session, each with its own cache
+        first, second = SeenStore(flush_batch=1, ttl=3600), SeenStore(flush_batch=1, ttl=0)
+        seen_first = first.get("shared", catalog_ids, "v1")
+        seen_second = second.get("shared", catalog_ids, "v1")
+        seen_first.mark([1, 2])
+        first.record("shared", seen_first)
+        seen_second.mark([3])
+        second.record("shared", seen_second)
+        stored = UserPreference.objects.get(session_key="shared").viewed_movies
+        self.assertEqual(sorted(stored), sorted(ids([1, 2, 3])))
+
+        # The worker with an expired entry re-reads the other's titles and keeps its own
+        seen_first.mark([4])
+        first.record("shared", seen_first)
+        refreshed = second.get("shared", catalog_ids, "v1")
+        self.assertEqual(refreshed.positions().tolist(), [1, 2, 3, 4])
+
+    def test_concurrent_requests_of_a_session_get_distinct_titles(self):
+        store = SeenStore(flush_batch=1000)
+        catalog_ids = self.movies_df["id"].to_numpy()
+        ranking = views._snapshot.mood_rankings.for_mood("happy")
+        served = []
+
+        def serve():
+            with store.session_lock("s"):
+                seen = store.get("s", catalog_ids, "v1")
+                candidates, _ = ranking.candidates(5, exclude=seen)
+                time.sleep(0.01)
+                seen.mark(candidates)
+            served.extend(candidates.tolist())
+
+        threads = [threading.Thread(target=serve) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(served), 30)
+        self.assertEqual(len(set(served)), 30)
+
+    def test_flusher_writes_back_idle_sessions(self):
+        store = SeenStore(flush_batch=100, flush_interval=3600)
+        seen = store.get("idle", self.movies_df["id"].to_numpy(), "v1")
+        seen.mark([1, 2])
+        with mock.patch.object(store, "_write", return_value=True) as write, \
+                mock.patch("atexit.register") as register:
+            store.record("idle", seen)
+            self.assertEqual(store.pending, 1)
+            store.flush_interval = 0.05
+            store.start_flusher()
+            deadline = time.monotonic() + 5
+            while store.pending and time.monotonic() < deadline:
+                time.sleep(0.01)
+            store.stop_flusher()
+        self.assertEqual(store.pending, 0)
+        self.assertEqual(write.call_args[0][0], [("idle", seen)])
+        register.assert_called_once_with(store.flush)
+
+    def test_posters_are_resolved_outside_the_session_lock(self):
+        locked = []
+
+        def posters(movies):
+            locked.append(any(lock.locked() for lock in get_seen_store()._session_locks))
+            return True
+
+        with mock.patch.object(views, "attach_posters", posters):
+            response = self.client.post("/recommendations/", {"mood": "sad", "count": 4, "exclude_seen": True},
+                                        content_type="application/json")
+        self.assertEqual(response.json()["count"], 4)
+        self.assertEqual(locked, [False])
+
+    def test_latency_stays_flat_as_history_grows(self):
+        movies_df = make_movies_df(n_rows=20000)
+        # No stored neighbors: pairwise() computes every pair from the matrix
+        graph = NeighborGraph(np.zeros(20001, dtype=np.int64), [], [], make_content_matrix(n_rows=20000))
+        rankings = build_mood_rankings(movies_df, MOODS)
+
+        def median_ms(history):
+            seen = SeenTitles(len(movies_df), rankings.for_mood("happy").order[:history])
+            timings = []
+            for _ in range(15):
+                start = time.perf_counter()
+                get_mood_based_recommendations_proc(movies_df, graph, rankings, "happy", n=10, exclude=seen)
+                timings.append(time.perf_counter() - start)
+            return np.median(timings) * 1e3
+
+        small, large = median_ms(10), median_ms(5000)
+        self.assertLess(large, 2 * small + 2.0, f"{small:.2f} ms with 10 seen, {large:.2f} ms with 5000")
+
+
+@override_settings(RECOMMENDATION_BACKEND="database")
+class DatabaseBackendTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        self.movies_df = make_movies_df(n_rows=80)
+        self.movies_df["overview"] = [f"Overview {i}" for i in range(80)]
+        self.movies_df["genre_names"] = [["Drama"]] * 80
+        self.content_matrix = make_content_matrix(n_rows=80)
+        directory = tempfile.mkdtemp()
+        movies_file = os.path.join(directory, "processed_movies.pkl")
+        model_file = os.path.join(directory, "ml_model.pkl")
+        self.movies_df.to_pickle(movies_file)
+        pd.to_pickle({"content_matrix": self.content_matrix}, model_file)
+        call_command("load_movies", "--pickle", movies_file, stdout=StringIO())
+        self.output = StringIO()
+        call_command("store_content_vectors", "--movies", movies_file, "--model", model_file, stdout=self.output)
+        patcher = mock.patch.object(views, "attach_posters", lambda movies: True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pack_round_trip(self):
+        row = self.content_matrix[3]
+        blob = pack_vector(row.indices, row.data)
+        self.assertEqual(len(blob), 4 * row.nnz)
+        unpacked = unpack_vectors([blob, None], n_features=row.shape[1])
+        self.assertEqual(unpacked.shape, (2, row.shape[1]))
+        self.assertEqual(unpacked[1].nnz, 0)
+        np.testing.assert_allclose(unpacked[0].toarray()[0], row.toarray()[0], atol=1e-3)
+
+    def test_stores_vectors(self):
+        self.assertIn("Stored 80 content vectors", self.output.getvalue())
+        self.assertFalse(Movie.objects.filter(content_vector__isnull=True).exists())
+
+    def test_matches_in_memory_recommendations(self):
+        install_model(self.movies_df, self.content_matrix)
+        for mood in ("happy", "scared"):
+            expected = get_mood_based_recommendations_proc(
+                self.movies_df, views._snapshot.neighbor_graph, views._snapshot.mood_rankings, mood, n=8
+            )
+            expected_ids = self.movies_df.loc[expected, "id"].tolist()
+            response = self.client.get("/recommendations/", {"mood": mood, "count": 8})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([movie["id"] for movie in response.json()["recommendations"]], expected_ids)
+
+    def test_does_not_load_the_model(self):
+        with mock.patch.object(views, "load_ml_model", side_effect=AssertionError("model loaded")):
+            response = self.client.post("/recommendations/", {"mood": "sad", "count": 5},
+                                        content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+            movie = response.json()["recommendations"][0]
+            self.assertEqual(set(movie), {"id", "title", "overview", "genres", "rating", "vote_count",
+                                          "release_date", "runtime", "cast", "director", "poster_path"})
+            self.assertEqual(self.client.get("/health/ready").status_code, 200)
+
+    def test_unknown_mood_falls_back_to_top_rated(self):
+        response = self.client.get("/recommendations/", {"mood": "bored", "count": 3})
+        ratings = [movie["rating"] for movie in response.json()["recommendations"]]
+        self.assertEqual(ratings, sorted(self.movies_df["vote_average"], reverse=True)[:3])
+
+    def test_model_endpoints_are_not_available(self):
+        with mock.patch.object(views, "load_ml_model", side_effect=AssertionError("model loaded")):
+            responses = [
+                self.client.post("/mixed-mood/", {"moods": {"happy": 1}}, content_type="application/json"),
+                self.client.get("/similar/", {"id": 1000}),
+                self.client.get("/search/", {"q": "movie"}),
+                self.client.post("/surprise/", {}, content_type="application/json"),
+            ]
+        self.assertEqual([response.status_code for response in responses], [501] * 4)
+        self.assertIsNone(views._snapshot)
+
+    def test_ignores_exclude_seen_and_rejects_cursor_paging(self):
+        plain = self.client.get("/recommendations/", {"mood": "sad", "offset": 5})
+        response = self.client.get("/recommendations/", {"mood": "sad", "offset": 5, "exclude_seen": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["recommendations"], plain.json()["recommendations"])
+        response = self.client.get("/recommendations/", {"mood": "sad", "paginate": "cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        install_model()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        patcher = mock.patch.object(views, "attach_posters", lambda movies: True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stages(self, response):
+        return [entry.split(";")[0] for entry in response["Server-Timing"].split(", ")]
+
+    def test_server_timing_lists_request_stages(self):
+        response = self.client.get("/recommendations/", {"mood": "happy", "count": 5})
+        self.assertEqual(self.stages(response),
+                         ["model", "cache", "candidates", "similarity", "diversity", "posters", "serialize",
+                          "total"])
+        self.assertRegex(response["Server-Timing"], r"total;dur=\d+\.\d\d$")
+
+        # A cache hit skips the recommendation stages
+        response = self.client.get("/recommendations/", {"mood": "happy", "count": 5})
+        self.assertEqual(self.stages(response), ["model", "cache", "total"])
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_header_can_be_turned_off(self):
+        response = self.client.get("/recommendations/", {"mood": "happy", "count": 5})
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(metrics.histogram("stage", "candidates").count, 1)
+
+    def test_metrics_endpoint(self):
+        for mood in ("happy", "sad", "happy"):
+            self.client.get("/recommendations/", {"mood": mood, "count": 5})
+        metrics.increment("tmdb_errors_total", 2)
+
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        self.assertIn('moodflix_stage_seconds_count{stage="candidates"} 2', text)
+        self.assertIn('moodflix_stage_seconds_bucket{stage="candidates",le="+Inf"} 2', text)
+        self.assertIn('moodflix_request_seconds_count{view="get_recommendations"} 3', text)
+        self.assertRegex(text, r'moodflix_stage_seconds_recent\{stage="diversity",quantile="0.99"\} [0-9.e-]+')
+        self.assertIn("moodflix_tmdb_errors_total 2", text)
+        self.assertIn("moodflix_response_cache_hits_total 1", text)
+        self.assertIn("moodflix_model_loaded 1", text)
+
+    def test_histogram_buckets_and_quantiles(self):
+        hist = metrics.Histogram(buckets=(0.01, 0.1), recent=100)
+        for seconds in [0.005] * 50 + [0.05] * 45 + [1.0] * 5:
+            hist.observe(seconds)
+        counts, total, count = hist.snapshot()
+        self.assertEqual(counts, [50, 45, 5])
+        self.assertEqual(count, 100)
+        self.assertAlmostEqual(total, 0.25 + 2.25 + 5.0)
+        quantiles = hist.quantiles()
+        self.assertAlmostEqual(quantiles[0.5], 0.0275)
+        self.assertEqual(quantiles[0.99], 1.0)
+
+    def test_tmdb_calls_and_errors_are_counted(self):
+        server = StubTMDBServer(error_rate=1.0, seed=0).start()
+        self.addCleanup(server.stop)
+        resolver = PosterResolver(server.api_url, "test-key", timeout=2.0, deadline=2.0, cache_alias="default")
+        resolver.cache.clear()
+        self.addCleanup(resolver.cache.clear)
+        _, complete = resolver.resolve_batch([(1, None), (2, None)])
+        self.assertFalse(complete)
+        self.assertEqual(metrics.counter("tmdb_requests_total"), 2)
+        self.assertEqual(metrics.counter("tmdb_errors_total"), 2)
+
+
+class CardStoreTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        movies_df = make_movies_df(n_rows=40)
+        movies_df["overview"] = [f"Überblick \"{i}\"\n" for i in range(40)]
+        movies_df["genre_names"] = [["Drama", "Comedy"]] * 40
+        movies_df["cast_names"] = [[f"Actor {j}" for j in range(7)]] * 40
+        movies_df["release_date"] = "2001-02-03"
+        movies_df["runtime"] = [0.0] + [95.0] * 39
+        movies_df["director"] = "Someone"
+        movies_df["poster_path"] = ["/stored.jpg"] + [""] * 39
+        self.movies_df = install_model(movies_df)
+
+    def test_cards_match_format_movie_row(self):
+        store = views._snapshot.card_store
+        self.assertEqual(len(store), 40)
+        positions = np.array([5, 0, 39])
+        posters = ["/p5.jpg", None, "/p39.jpg"]
+        expected = []
+        for pos, poster in zip(positions, posters):
+            movie = views.format_movie_row(self.movies_df.iloc[pos])
+            movie["poster_path"] = poster
+            expected.append(movie)
+
+        body = payload({"success": True, "count": 3}, "recommendations", store.cards(positions, posters),
+                       {"ml_powered": True})
+        self.assertEqual(body, json.dumps({"success": True, "count": 3, "recommendations": expected,
+                                           "ml_powered": True}).encode())
+
+    def test_missing_runtime_and_release_date(self):
+        movies_df = self.movies_df.copy()
+        movies_df["runtime"] = [np.nan, None] + [95.0] * 38
+        movies_df["release_date"] = [np.nan, None] + ["2001-02-03"] * 38
+        store = build_card_store(movies_df, views.format_movie_row)
+        cards = [json.loads(card) for card in store.cards([0, 1, 2], [None] * 3)]
+        self.assertEqual([card["runtime"] for card in cards], [None, None, 95])
+        self.assertEqual([card["release_date"] for card in cards], ["", "", "2001-02-03"])
+
+    def test_response_body_unchanged(self):
+        def fill(movies):
+            for movie in movies:
+                movie["poster_path"] = movie["poster_path"] or f"/tmdb/{movie['id']}.jpg"
+            return True
+
+        with mock.patch.object(views, "attach_posters", fill):
+            response = self.client.get("/recommendations/", {"mood": "happy", "count": 6, "offset": 2})
+            labels = get_mood_based_recommendations_proc(
+                self.movies_df, views._snapshot.neighbor_graph, views._snapshot.mood_rankings, "happy", n=8)[2:]
+            expected = [views.format_movie_row(self.movies_df.loc[label]) for label in labels]
+            fill(expected)
+        self.assertEqual(response.content, json.dumps({
+            "success": True, "mood": "happy", "count": 6, "recommendations": expected, "ml_powered": True,
+        }).encode())
+
+
+class ModelReloadTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        directory = tempfile.mkdtemp()
+        self.paths = (os.path.join(directory, "processed_movies.pkl"), os.path.join(directory, "ml_model.pkl"))
+        self.mtime = time.time_ns()
+        self.write_model("v1")
+        for patcher in (mock.patch.object(views, "model_pickle_paths", return_value=self.paths),
+                        mock.patch.object(views, "attach_posters", lambda movies: True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        no_bundle = override_settings(MODEL_BUNDLE_DIR=os.path.join(directory, "no_bundle"))
+        no_bundle.enable()
+        self.addCleanup(no_bundle.disable)
+
+    def write_model(self, tag):
+        movies_df = make_movies_df(n_rows=60)
+        movies_df["title"] = [f"{tag} Movie {i}" for i in range(60)]
+        movies_df.to_pickle(self.paths[0])
+        pd.to_pickle({"content_matrix": make_content_matrix(n_rows=60)}, self.paths[1])
+        # Distinct mtimes, so each write is a new pickle_version
+        self.mtime += 10 ** 9
+        for path in self.paths:
+            os.utime(path, ns=(self.mtime, self.mtime))
+        return views.pickle_version(self.paths)
+
+    def get(self, client=None, **params):
+        return (client or self.client).get("/recommendations/", {"mood": "happy", "count": 5, **params})
+
+    def tags(self, response):
+        return {movie["title"].split()[0] for movie in response.json()["recommendations"]}
+
+    def test_reload_swaps_in_new_artifacts(self):
+        v1 = views.pickle_version(self.paths)
+        response = self.get()
+        self.assertEqual(response["X-Model-Version"], v1)
+        self.assertEqual(self.tags(response), {"v1"})
+        self.assertFalse(views.reload_model())
+
+        v2 = self.write_model("v2")
+        self.assertTrue(views.reload_model())
+        response = self.get()
+        self.assertEqual(response["X-Model-Version"], v2)
+        self.assertEqual(self.tags(response), {"v2"})
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/health/ready").json()["reloads"], 1)
+
+    def test_request_finishes_on_its_snapshot(self):
+        v1 = views.pickle_version(self.paths)
+        self.get()
+        self.write_model("v2")
+
+        def reload_mid_request(movies):
+            views.reload_model()
+            return True
+
+        with mock.patch.object(views, "attach_posters", reload_mid_request):
+            response = self.get(count=7)
+        self.assertEqual(response["X-Model-Version"], v1)
+        self.assertEqual(self.tags(response), {"v1"})
+        self.assertEqual(self.tags(self.get(count=7)), {"v2"})
+
+    def test_failed_reload_keeps_serving(self):
+        v1 = views.pickle_version(self.paths)
+        self.get()
+        with open(self.paths[1], "wb") as f:
+            f.write(b"not a pickle")
+        with self.assertRaises(Exception):
+            views.reload_model()
+        status = self.client.get("/health/ready").json()
+        self.assertEqual(status["status"], "ready")
+        self.assertTrue(status["error"])
+        self.assertEqual(self.get()["X-Model-Version"], v1)
+
+    def test_reload_under_concurrent_load(self):
+        versions = {views.pickle_version(self.paths): "v1"}
+        self.get()
+        results, errors = [], []
+        stop = threading.Event()
+
+        def hammer(worker):
+            client = self.client_class()
+            i = 0
+            while not stop.is_set():
+                i += 1
+                start = time.perf_counter()
+                try:
+                    response = self.get(client, count=3 + (worker * 7 + i) % 9)
+                    results.append((time.perf_counter() - start, response.status_code,
+                                    response.get("X-Model-Version"), self.tags(response)))
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=hammer, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        try:
+            for tag in ("v2", "v3", "v4"):
+                time.sleep(0.3)
+                versions[self.write_model(tag)] = tag
+                self.assertTrue(views.reload_model())
+            time.sleep(0.3)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertGreater(len(results), 20)
+        self.assertTrue(all(status == 200 for _, status, _, _ in results))
+        # Every response is entirely from the version it reports
+        self.assertTrue(all(tags == {versions[version]} for _, _, version, tags in results))
+        self.assertGreaterEqual(len({version for _, _, version, _ in results}), 3)
+        latencies = sorted(seconds for seconds, _, _, _ in results)
+        self.assertLess(latencies[int(len(latencies) * 0.99) - 1], 0.5)
+
+    def test_watcher_picks_up_new_artifacts(self):
+        self.get()
+        v2 = self.write_model("v2")
+        watcher = ModelWatcher(views.reload_model, 0.05).start()
+        self.addCleanup(watcher.stop)
+        deadline = time.monotonic() + 5
+        while views.model_version() != v2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(views.model_version(), v2)
+
+    def test_reload_endpoint_requires_token(self):
+        self.get()
+        self.assertEqual(self.client.post("/model/reload").status_code, 403)
+        with override_settings(MODEL_RELOAD_TOKEN="secret"):
+            self.assertEqual(self.client.post("/model/reload", HTTP_X_RELOAD_TOKEN="wrong").status_code, 403)
+            v2 = self.write_model("v2")
+            response = self.client.post("/model/reload", HTTP_X_RELOAD_TOKEN="secret")
+        self.assertEqual(response.json(), {"success": True, "reloaded": True, "version": v2})
+
+
+class FilterTests(TestCase):
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        movies_df = make_movies_df(n_rows=300)
+        rng = np.random.default_rng(3)
+        genres = ["Animation", "Comedy", "Drama", "Horror", "Family"]
+        movies_df["genre_names"] = [list(rng.choice(genres, rng.integers(1, 3), replace=False))
+                                    for _ in range(len(movies_df))]
+        movies_df["release_date"] = pd.to_datetime(
+            [f"{year}-06-01" for year in rng.integers(1980, 2024, len(movies_df))])
+        movies_df["runtime"] = rng.integers(0, 180, len(movies_df))
+        self.movies_df = install_model(movies_df)
+        patcher = mock.patch.object(views, "attach_posters", lambda movies: True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def expected_mask(self, genres=None, year=(None, None), runtime=(None, None), rating=(None, None)):
+        df = self.movies_df
+        mask = np.ones(len(df), dtype=bool)
+        if genres:
+            mask &= df["genre_names"].apply(lambda names: bool(set(names) & set(genres))).to_numpy()
+        for values, (low, high) in ((df["release_date"].dt.year, year),
+                                    (df["runtime"].where(df["runtime"] > 0), runtime),
+                                    (df["vote_average"], rating)):
+            if low is not None or high is not None:
+                values = values.to_numpy(np.float64)
+                mask &= ~np.isnan(values)
+                mask &= values >= (-np.inf if low is None else low)
+                mask &= values <= (np.inf if high is None else high)
+        return mask
+
+    def test_bitset_operations(self):
+        a = Bitset.from_positions([0, 3, 9, 10], 12)
+        b = Bitset.from_positions([3, 4, 10], 12)
+        self.assertEqual((a & b).positions().tolist(), [3, 10])
+        self.assertEqual((a | b).positions().tolist(), [0, 3, 4, 9, 10])
+        self.assertEqual(len(a | b), 5)
+        self.assertEqual(a.contains([0, 1, 9, 11]).tolist(), [True, False, True, False])
+
+    def test_index_matches_pandas_masks(self):
+        index = views._snapshot.attribute_index
+        cases = [
+            {"genres": ["Animation"]},
+            {"genres": ["Animation", "Horror"], "year": (2001, None)},
+            {"runtime": (None, 110)},
+            {"genres": ["Family"], "year": (1990, 2005), "runtime": (80, 120), "rating": (6.5, None)},
+            {"genres": ["Western"]},
+        ]
+        for case in cases:
+            spec = parse_filters({
+                "genres": case.get("genres"),
+                **{f"{name}_{side}": bound for name in ("year", "runtime", "rating")
+                   for side, bound in zip(("min", "max"), case.get(name, (None, None)))},
+            })
+            expected = np.flatnonzero(self.expected_mask(**case))
+            self.assertEqual(index.select(spec).positions().tolist(), expected.tolist(), case)
+        self.assertIsNone(index.select({}))
+
+    def test_parse_filters(self):
+        self.assertEqual(parse_filters({}), {})
+        self.assertEqual(parse_filters({"genres": "Drama, Animation,", "year_min": "2001"}),
+                         {"genres": ["Animation", "Drama"], "ranges": {"year": (2001.0, None)}})
+        for bad in ({"year_min": "recent"}, {"runtime_min": 120, "runtime_max": 90},
+                    {"rating_max": "nan"}, {"genres": 3}):
+            with self.assertRaises(ValueError):
+                parse_filters(bad)
+
+    def test_filtered_candidates_keep_mood_order(self):
+        ranking = views._snapshot.mood_rankings.for_mood("happy")
+        allowed = views._snapshot.attribute_index.select(parse_filters({"genres": "Animation"}))
+        expected = ranking.order[allowed.contains(ranking.order)].tolist()
+
+        # Broad enough for the growing window, then narrow enough for the direct path
+        for size in (5, len(expected)):
+            candidates, composite = ranking.candidates(size, allowed=allowed)
+            self.assertEqual(set(candidates.tolist()), set(expected[:size]))
+            self.assertTrue((np.diff(composite) <= 0).all())
+
+        seen = SeenTitles(len(self.movies_df), expected[:3])
+        candidates, _ = ranking.candidates(5, exclude=seen, allowed=allowed)
+        self.assertEqual(set(candidates.tolist()), set(expected[3:8]))
+
+    def test_endpoint_applies_filters(self):
+        response = self.client.post("/recommendations/", {
+            "mood": "happy", "count": 10, "genres": ["Animation"], "year_min": 2001, "runtime_max": 110,
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        ids = [movie["id"] for movie in response.json()["recommendations"]]
+        allowed = set(self.movies_df["id"][self.expected_mask(["Animation"], (2001, None), (None, 110))])
+        self.assertTrue(ids)
+        self.assertLessEqual(set(ids), allowed)
+
+        # Nothing matches: an empty page, not an error
+        response = self.client.post("/recommendations/", {"mood": "happy", "genres": "Western"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["recommendations"], [])
+
+    def test_filters_are_part_of_the_cache_key(self):
+        unfiltered = self.client.post("/recommendations/", {"mood": "sad", "count": 10},
+                                      content_type="application/json")
+        filtered = self.client.post("/recommendations/", {"mood": "sad", "count": 10, "genres": "Horror"},
+                                    content_type="application/json")
+        self.assertNotEqual(unfiltered.json()["recommendations"], filtered.json()["recommendations"])
+
+    def test_bad_filters_are_rejected(self):
+        for data in ({"mood": "happy", "year_min": "recent"},
+                     {"mood": "happy", "genres": "Drama", "paginate": "cursor"}):
+            response = self.client.post("/recommendations/", data, content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()["success"])
+
+
+class PersonalizationTests(TestCase):
+    GENRES = ["Animation", "Comedy", "Drama", "Horror", "Family"]
+
+    def setUp(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        get_profile_store().clear()
+        self.addCleanup(get_profile_store().clear)
+        movies_df = make_movies_df(n_rows=200)
+        rng = np.random.default_rng(5)
+        movies_df["genre_names"] = [list(rng.choice(self.GENRES, rng.integers(1, 3), replace=False))
+                                    for _ in range(len(movies_df))]
+        self.movies_df = install_model(movies_df)
+        patcher = mock.patch.object(views, "attach_posters", lambda movies: True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def genres_of(self, ids):
+        by_id = dict(zip(self.movies_df["id"], self.movies_df["genre_names"]))
+        return [set(by_id[i]) for i in ids]
+
+    def test_genre_matrix_rows_are_shares(self):
+        genre_matrix = build_genre_matrix(self.movies_df)
+        rows = genre_matrix.matrix.toarray()
+        np.testing.assert_allclose(rows.sum(axis=1), 1.0)
+        for pos in (0, 17, 150):
+            names = {name for name, column in genre_matrix.genres.items() if rows[pos, column] > 0}
+            self.assertEqual(names, set(self.movies_df["genre_names"].iloc[pos]))
+        self.assertEqual(genre_matrix.vector(["Drama", "Western"]).sum(), 1.0)
+
+    def test_rerank_drops_excluded_and_boosts_favorites(self):
+        genre_matrix = views._snapshot.genre_matrix
+        self.assertIsNone(GenreProfile.from_preference(genre_matrix, ["Western"], []))
+        profile = GenreProfile.from_preference(genre_matrix, ["Animation"], ["Horror"])
+
+        positions, composite = views._snapshot.mood_rankings.for_mood("happy").candidates(50)
+        reranked, adjusted = profile.rerank(genre_matrix, positions, composite)
+        genres = [set(self.movies_df["genre_names"].iloc[pos]) for pos in reranked]
+        self.assertTrue(all("Horror" not in names for names in genres))
+        self.assertEqual(set(reranked.tolist()),
+                         {pos for pos in positions.tolist()
+                          if "Horror" not in self.movies_df["genre_names"].iloc[pos]})
+        self.assertTrue((np.diff(adjusted) <= 0).all())
+        share = np.array([("Animation" in names) / len(names) for names in genres])
+        boosted = dict(zip(positions.tolist(), composite))
+        np.testing.assert_allclose(adjusted, [boosted[pos] for pos in reranked.tolist()] + 0.2 * share)
+
+    def test_personalized_endpoint(self):
+        response = self.client.post("/preferences/", {"favorite_genres": ["Animation"], "excluded_genres": ["Horror"]},
+                                    content_type="application/json")
+        self.assertEqual(response.json(), {"success": True, "favorite_genres": ["Animation"],
+                                           "excluded_genres": ["Horror"]})
+
+        data = {"mood": "happy", "count": 10, "personalize": True}
+        plain = self.client.post("/recommendations/", {"mood": "happy", "count": 10},
+                                 content_type="application/json").json()["recommendations"]
+        response = self.client.post("/recommendations/", data, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-store", response["Cache-Control"])
+        genres = self.genres_of([movie["id"] for movie in response.json()["recommendations"]])
+        self.assertEqual(len(genres), 10)
+        self.assertFalse(any("Horror" in names for names in genres))
+        self.assertGreater(sum("Animation" in names for names in genres),
+                           sum("Animation" in names for names in self.genres_of([m["id"] for m in plain])))
+
+        # Edits take effect on the next request
+        self.client.post("/preferences/", {"excluded_genres": ["Drama"]}, content_type="application/json")
+        self.assertEqual(self.client.get("/preferences/").json()["favorite_genres"], ["Animation"])
+        response = self.client.post("/recommendations/", data, content_type="application/json")
+        genres = self.genres_of([movie["id"] for movie in response.json()["recommendations"]])
+        self.assertFalse(any("Drama" in names for names in genres))
+
+    def test_narrow_exclusions_still_fill_the_page(self):
+        excluded = ["Comedy", "Drama", "Horror", "Family"]
+        eligible = self.movies_df["genre_names"].apply(lambda names: not set(names) & set(excluded)).sum()
+        self.assertGreater(eligible, 10)
+        self.client.post("/preferences/", {"excluded_genres": excluded}, content_type="application/json")
+        response = self.client.post("/recommendations/", {"mood": "happy", "count": 10, "personalize": True},
+                                    content_type="application/json")
+        genres = self.genres_of([movie["id"] for movie in response.json()["recommendations"]])
+        self.assertEqual(len(genres), 10)
+        self.assertTrue(all(names == {"Animation"} for names in genres))
+
+    def test_bitset_complement(self):
+        bitset = Bitset.from_positions([0, 4, 9], 11)
+        self.assertEqual((~bitset).positions().tolist(), [1, 2, 3, 5, 6, 7, 8, 10])
+        self.assertEqual(len(~bitset), 8)
+
+    def test_profiles_are_cached_per_session_and_version(self):
+        genre_matrix = views._snapshot.genre_matrix
+        UserPreference.objects.create(session_key="s1", favorite_genres=["Comedy"])
+        store = ProfileStore()
+        profile = store.get("s1", genre_matrix, "v1")
+        with self.assertNumQueries(0):
+            self.assertIs(store.get("s1", genre_matrix, "v1"), profile)
+        with self.assertNumQueries(1):
+            self.assertIsNone(store.get("nobody", genre_matrix, "v1"))
+        with self.assertNumQueries(0):
+            store.get("nobody", genre_matrix, "v1")
+        with self.assertNumQueries(1):
+            self.assertIsNot(store.get("s1", genre_matrix, "v2"), profile)
+
+    def test_one_row_per_session(self):
+        UserPreference.objects.create(session_key="s1", favorite_genres=["Comedy"])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserPreference.objects.create(session_key="s1")
+
+        # The seen-history writer retries a batch that raced with a create
+        store = SeenStore()
+        seen = store.get("s1", np.array([10, 20, 30]), "v1")
+        seen.mark([1])
+        with mock.patch.object(SeenStore, "_write_viewed", side_effect=[IntegrityError, None]) as write:
+            self.assertTrue(store._write([("s1", seen)]))
+        self.assertEqual(write.call_count, 2)
+
+    def test_bad_preferences_are_rejected(self):
+        for data in ({"favorite_genres": "Drama"}, {"excluded_genres": [1, 2]}, 5, ["Drama"]):
+            response = self.client.post("/preferences/", data, content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post("/recommendations/", {"mood": "happy", "personalize": True, "paginate": "cursor"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_rerank_cost_is_flat_in_catalog_size(self):
+        rng = np.random.default_rng(0)
+
+        def median_us(n_rows):
+            movies_df = pd.DataFrame({"genre_names": [list(rng.choice(self.GENRES, 2, replace=False))
+                                                      for _ in range(n_rows)]})
+            genre_matrix = build_genre_matrix(movies_df)
+            profile = GenreProfile.from_preference(genre_matrix, ["Comedy"], ["Horror"])
+            positions = rng.choice(n_rows, 50, replace=False)
+            composite = rng.random(50)
+            timings = []
+            for _ in range(50):
+                start = time.perf_counter()
+                profile.rerank(genre_matrix, positions, composite)
+                timings.append(time.perf_counter() - start)
+            return np.median(timings) * 1e6
+
+        small, large = median_us(1000), median_us(100000)
+        self.assertLess(large, 2 * small + 50, f"{small:.0f} us at 1k titles, {large:.0f} us at 100k")
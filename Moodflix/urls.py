@@ -8,7 +8,12 @@ urlpatterns = [
     path('moods/', views.get_moods, name='get_moods'),
     path('recommendations/', views.get_recommendations, name='get_recommendations'),
     path('surprise/', views.get_surprise_recommendations, name='get_surprise'),
-    #path('similar/', views.get_similar_movies, name='get_similar'),
-    #path('mixed-mood/', views.get_mixed_mood_recommendations, name='get_mixed_mood'),
-    #path('search/', views.search_movies, name='search_movies'),
+    path('health/ready', views.health_ready, name='health_ready'),
+    path('health/cache', views.response_cache_stats, name='response_cache_stats'),
+    path('metrics', views.metrics_view, name='metrics'),
+    path('model/reload', views.reload_model_view, name='reload_model'),
+    path('similar/', views.get_similar_movies, name='get_similar'),
+    path('mixed-mood/', views.get_mixed_mood_recommendations, name='get_mixed_mood'),
+    path('search/', views.search_movies, name='search_movies'),
+    path('preferences/', views.user_preferences, name='user_preferences'),
 ]
\ No newline at end of file
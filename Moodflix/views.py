@@ -1,63 +1,353 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
+from django.db import DatabaseError
+import contextvars
+import functools
+import hashlib
+import hmac
 import json
 import os
 import pickle
+import threading
+import time
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-import requests
+import pandas as pd
 
 
-from .models import Movie
+from .models import Movie, UserPreference
+from .bundle import bundle_exists, bundle_nbytes, load_bundle, read_manifest
+from .cards import build_card_store, payload
+from .cursors import InvalidCursor, recommend_page
+from .diversity import select_diverse
+from .filters import build_attribute_index, parse_filters
+from .moods import MOODS
+from .neighbors import NeighborSearch
+from .personalization import build_genre_matrix, get_profile_store
+from . import db_backend, metrics, response_cache
+from .posters import get_poster_resolver
+from .rankings import build_mood_rankings
+from .search import build_title_index
+from .seen import get_seen_store
+from .surprise import build_surprise_sampler
+from .similarity import NeighborGraph, build_neighbor_graph, dense_to_neighbor_graph
+from .snapshot import ModelSnapshot, ModelWatcher
 
 
+# Global data: the ModelSnapshot being served, replaced whole by reload_model
+_snapshot = None
+# Snapshot pinned by the request being handled (see serves_model)
+_request_snapshot = contextvars.ContextVar("request_snapshot", default=None)
 
-TMDB_API_KEY = "f1c2574ff595316f099a277d206ba900"
-TMDB_SEARCH_URL = "https://api.themoviedb.org/3/search/movie"
-
-# Global data
-_movies_df = None
-_content_matrix = None
-_cosine_sim_matrix = None
-_scaler = MinMaxScaler()
+# Serializes model builds (first load and reloads); once a snapshot is
+# published, requests never wait on it
+_model_lock = threading.Lock()
+_model_status = {
+    "status": "not_loaded",
+    "source": None,
+    "version": None,
+    "load_seconds": None,
+    "artifact_bytes": None,
+    "error": None,
+    "reloads": 0,
+}
 
 # ---------------------------
 # Load ML model & movie data
 # ---------------------------
+def current_snapshot():
+    """
+    The ModelSnapshot to serve from, loading the first one if needed.
+    Inside a serves_model view, every call returns the same snapshot.
+    """
+    pinned = _request_snapshot.get()
+    if pinned:
+        return pinned[0]
+
+    snapshot = _snapshot
+    if snapshot is None:
+        with _model_lock:
+            # Another thread may have finished loading while we waited
+            if _snapshot is None:
+                _publish(build_snapshot())
+            snapshot = _snapshot
+
+    if pinned is not None:
+        pinned.append(snapshot)
+    return snapshot
+
+
 def load_ml_model():
-    global _movies_df, _content_matrix, _cosine_sim_matrix, _scaler
-
-    if _movies_df is None:
-        print("Loading ML model...")
-
-        movies_file = os.path.join(settings.BASE_DIR, "Data", "processed_movies.pkl")
-        model_file = os.path.join(settings.BASE_DIR, "Data", "ml_model.pkl")
-
-        # Load movie data
-        with open(movies_file, "rb") as f:
-            _movies_df = pickle.load(f)
-
-        # Load model data
-        if os.path.exists(model_file):
-            with open(model_file, "rb") as f:
-                model_data = pickle.load(f)
-            _content_matrix = model_data.get("content_matrix")
-            _cosine_sim_matrix = model_data.get("cosine_sim_matrix")
-            _scaler = model_data.get("scaler", MinMaxScaler())
-            print("ML model loaded successfully")
+    snapshot = current_snapshot()
+    return snapshot.movies_df, snapshot.content_matrix, snapshot.neighbor_graph, snapshot.mood_rankings
+
+
+def build_snapshot():
+    """Load the model artifacts and build everything served from them."""
+    print("Loading ML model...")
+    _model_status.update(status="loading" if _snapshot is None else "reloading", error=None)
+    start = time.perf_counter()
+
+    try:
+        bundle_dir = settings.MODEL_BUNDLE_DIR
+        if bundle_exists(bundle_dir):
+            # Memory-mapped arrays, shared with the other workers on this host
+            movies_df, content_matrix, neighbor_graph, manifest = load_bundle(bundle_dir)
+            source, artifact_bytes, version = "bundle", bundle_nbytes(bundle_dir), manifest["version"]
         else:
-            raise FileNotFoundError("ML model not found. Train the model first.")
+            movies_df, content_matrix, neighbor_graph = load_model_pickles()
+            paths = model_pickle_paths()
+            source, artifact_bytes, version = "pickle", sum(os.path.getsize(p) for p in paths), pickle_version(paths)
+
+        load_stored_posters(movies_df)
+
+        # Rankings only depend on the catalog, so build them once here
+        snapshot = ModelSnapshot(
+            movies_df,
+            content_matrix,
+            neighbor_graph,
+            build_mood_rankings(movies_df, MOODS),
+            neighbor_search=build_neighbor_search(movies_df, content_matrix, neighbor_graph),
+            title_index=build_title_index(movies_df),
+            surprise_sampler=build_surprise_sampler(movies_df, MOODS),
+            card_store=build_card_store(movies_df, format_movie_row),
+            attribute_index=build_attribute_index(movies_df),
+            genre_matrix=build_genre_matrix(movies_df),
+            version=version,
+            source=source,
+            artifact_bytes=artifact_bytes,
+            load_seconds=round(time.perf_counter() - start, 3),
+        )
+    except Exception as e:
+        # A failed reload leaves the current snapshot serving
+        _model_status.update(status="error" if _snapshot is None else "ready", error=str(e))
+        raise
+
+    print("ML model loaded successfully")
+    return snapshot
+
+
+def _publish(snapshot):
+    global _snapshot
+    # One reference assignment: a request sees either the old or the new snapshot
+    _snapshot = snapshot
+    _model_status.update(
+        status="ready",
+        source=snapshot.source,
+        version=snapshot.version,
+        load_seconds=snapshot.load_seconds,
+        artifact_bytes=snapshot.artifact_bytes,
+    )
+
+
+def reload_model(force=False):
+    """
+    Build a snapshot from the current artifacts and swap it in, unless
+    their version is the one already served. Requests keep using the old
+    snapshot until the swap. Returns whether a new snapshot was published.
+    """
+    with _model_lock:
+        if not force and _snapshot is not None and _snapshot.version == artifact_version():
+            return False
+        snapshot = build_snapshot()
+        _publish(snapshot)
+        _model_status["reloads"] += 1
+    return True
+
+
+def artifact_version():
+    """Version of the model artifacts on disk (what the next load would serve)."""
+    bundle_dir = settings.MODEL_BUNDLE_DIR
+    if bundle_exists(bundle_dir):
+        return read_manifest(bundle_dir)["version"]
+    return pickle_version(model_pickle_paths())
+
+
+def serves_model(view):
+    """
+    Pin one snapshot for the whole request, so a reload mid-request does
+    not mix versions, and report it in an X-Model-Version header.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        pinned = []
+        token = _request_snapshot.set(pinned)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _request_snapshot.reset(token)
+        if pinned and pinned[0].version is not None:
+            response["X-Model-Version"] = pinned[0].version
+        return response
+    return wrapper
+
+
+def memory_backend_only(view):
+    """
+    Answer 501 with the database backend instead of loading the whole
+    model into the worker, which that backend exists to avoid.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if settings.RECOMMENDATION_BACKEND == "database":
+            return JsonResponse({
+                "success": False, "error": "Not available with the database backend",
+            }, status=501)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def build_neighbor_search(movies_df, content_matrix, neighbor_graph):
+    return NeighborSearch(movies_df["id"].to_numpy(), content_matrix, neighbor_graph)
+
+
+def load_neighbor_search():
+    return current_snapshot().neighbor_search
+
+
+def load_title_index():
+    return current_snapshot().title_index
+
+
+def load_surprise_sampler():
+    return current_snapshot().surprise_sampler
+
+
+def load_card_store():
+    return current_snapshot().card_store
+
+
+def load_genre_matrix():
+    return current_snapshot().genre_matrix
+
+
+def model_pickle_paths():
+    return (
+        os.path.join(settings.BASE_DIR, "Data", "processed_movies.pkl"),
+        os.path.join(settings.BASE_DIR, "Data", "ml_model.pkl"),
+    )
+
+
+def pickle_version(paths):
+    """Version id for pickled models, from file sizes and modification times."""
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+
+def model_version():
+    snapshot = _snapshot if _request_snapshot.get() is None else current_snapshot()
+    return snapshot.version if snapshot is not None else None
+
+
+def warm_up_in_background():
+    """Load the model on a daemon thread so the first request finds it warm."""
+    def warm_up():
+        try:
+            load_ml_model()
+        except Exception as e:
+            print("ML model warm-up failed:", e)
+
+    thread = threading.Thread(target=warm_up, name="moodflix-warmup", daemon=True)
+    thread.start()
+    return thread
 
-    return _movies_df, _content_matrix, _cosine_sim_matrix, _scaler
+
+def start_model_watcher(interval):
+    """Reload the model in the background whenever its artifacts change."""
+    return ModelWatcher(reload_model, interval).start()
+
+
+def start_server_tasks():
+    """
+    Warm-up, model watcher and seen-history flusher for a serving
+    process. Called from the WSGI/ASGI entry points, so manage.py
+    commands never start them.
+    """
+    if settings.RECOMMENDATION_BACKEND == "database":
+        return
+    # Start loading the model at boot instead of on the first request
+    if settings.MOODFLIX_WARMUP:
+        warm_up_in_background()
+    # Swap in retrained artifacts without restarting the worker
+    if settings.MODEL_WATCH_INTERVAL > 0:
+        start_model_watcher(settings.MODEL_WATCH_INTERVAL)
+    # Write back exclude_seen history of sessions that stop sending requests
+    get_seen_store().start_flusher()
+
+
+def load_model_pickles(movies_file=None, model_file=None):
+    default_movies_file, default_model_file = model_pickle_paths()
+    movies_file = movies_file or default_movies_file
+    model_file = model_file or default_model_file
+
+    # Load movie data
+    with open(movies_file, "rb") as f:
+        movies_df = pickle.load(f)
+
+    # Load model data
+    if not os.path.exists(model_file):
+        raise FileNotFoundError("ML model not found. Train the model first.")
+    with open(model_file, "rb") as f:
+        model_data = pickle.load(f)
+    content_matrix = model_data.get("content_matrix")
+    neighbor_graph = load_neighbor_graph(model_data, content_matrix)
+
+    return movies_df, content_matrix, neighbor_graph
+
+
+def load_stored_posters(movies_df):
+    """
+    Copy poster paths saved by the backfill_posters command onto the
+    catalog, so known titles are served without calling TMDB.
+    """
+    try:
+        stored = dict(
+            Movie.objects.filter(poster_path__isnull=False)
+            .exclude(poster_path="")
+            .values_list("tmdb_id", "poster_path")
+        )
+    except DatabaseError:
+        return
+
+    if not stored:
+        return
+    posters = movies_df["id"].map(stored)
+    if "poster_path" in movies_df.columns:
+        posters = posters.fillna(movies_df["poster_path"])
+    movies_df["poster_path"] = posters.fillna("")
+
+
+def load_neighbor_graph(model_data, content_matrix):
+    """
+    Read the top-k neighbor graph from a model pickle.
+
+    Older pickles only carry the dense cosine_sim_matrix; those are reduced
+    to top-k once here so the dense matrix is not kept alive.
+    """
+    if "neighbor_indptr" in model_data:
+        return NeighborGraph.from_dict(model_data, content_matrix=content_matrix)
+    if model_data.get("cosine_sim_matrix") is not None:
+        graph = dense_to_neighbor_graph(model_data["cosine_sim_matrix"], content_matrix=content_matrix)
+        model_data.pop("cosine_sim_matrix")
+        return graph
+    if content_matrix is not None:
+        return build_neighbor_graph(content_matrix)
+    return None
 
 
 # ---------------------------
 # Utility: Format movie
 # ---------------------------
 def format_movie_row(movie_row):
+    release_date = movie_row.get("release_date", "")
+    runtime = movie_row.get("runtime")
     return {
         "id": int(movie_row["id"]),
         "title": movie_row["title"],
@@ -65,8 +355,9 @@ def format_movie_row(movie_row):
         "genres": movie_row.get("genre_names", []),
         "rating": float(movie_row.get("vote_average", 0)),
         "vote_count": int(movie_row.get("vote_count", 0)),
-        "release_date": str(movie_row.get("release_date", "")),
-        "runtime": int(movie_row["runtime"]) if "runtime" in movie_row and movie_row["runtime"] else None,
+        "release_date": "" if pd.isna(release_date) else str(release_date),
+        # NaN is truthy, so it is checked before the falsy 0 / None
+        "runtime": None if pd.isna(runtime) or not runtime else int(runtime),
         "cast": movie_row.get("cast_names", [])[:5],
         "director": movie_row.get("director", ""),
         "poster_path": movie_row.get("poster_path", ""),
@@ -74,212 +365,675 @@ def format_movie_row(movie_row):
 
 
 # ---------------------------
-# Utility: TMDB API search (fallback)
-def fetch_movie_poster(title):
-    params = {
-        "api_key": TMDB_API_KEY,
-        "query": title
-    }
-
-    response = requests.get(TMDB_SEARCH_URL, params=params)
-
-    if response.status_code == 200:
-        data = response.json()
-        if data["results"]:
-            return data["results"][0].get("poster_path")
-    return None
+# Utility: TMDB posters
+# ---------------------------
+def attach_posters(movies):
+    """
+    Fill poster_path for a page of formatted movies with one batched lookup.
+    Returns False if some lookups errored or missed the deadline.
+    """
+    resolver = get_poster_resolver()
+    posters, complete = resolver.resolve_batch([(movie["id"], movie["poster_path"]) for movie in movies])
+    for movie, poster_path in zip(movies, posters):
+        movie["poster_path"] = poster_path
+    return complete
 
 
 # ---------------------------
 # Mood-based recommendation (robust)
 # ---------------------------
-def get_mood_based_recommendations_proc(movies_df, cosine_sim_matrix, scaler, mood, n=5, diversity_factor=0.3):
-    mood_col = f"mood_{mood}_score"
+def get_mood_based_recommendations_proc(movies_df, sim_graph, rankings, mood, n=5, diversity_factor=0.3,
+                                        exclude=None, allowed=None, profile=None):
+    ranking = rankings.for_mood(mood)
+    if profile is not None and profile.allowed is not None:
+        # Excluded genres narrow the pool like a filter, so it is still filled
+        allowed = profile.allowed if allowed is None else allowed & profile.allowed
 
-    if mood_col not in movies_df.columns:
+    if ranking is None or len(ranking) == 0:
         # Fallback: top-rated movies
-        fallback = movies_df.nlargest(n, "vote_average")
-        return [row.name for _, row in fallback.iterrows()]
+        top_rated = rankings.top_rated
+        if allowed is not None:
+            top_rated = top_rated[allowed.contains(top_rated)]
+        if exclude is not None and len(exclude):
+            top_rated = top_rated[:n + len(exclude)]
+            top_rated = top_rated[~exclude.contains(top_rated)]
+        return list(movies_df.index[top_rated[:n]])
 
-    movies_df[mood_col] = movies_df[mood_col].fillna(0)
-    candidates_df = movies_df.nlargest(n*5, mood_col).copy()
+    # Top n*5 by mood (skipping titles in exclude, keeping only titles in allowed),
+    # ordered by composite mood/rating/popularity score
+    with metrics.span("candidates"):
+        candidate_positions, composite = ranking.candidates(n * 5, exclude=exclude, allowed=allowed)
 
-    if candidates_df.empty:
-        fallback = movies_df.nlargest(n, "vote_average")
-        return [row.name for _, row in fallback.iterrows()]
+    # Session genre preferences (a GenreProfile): drop excluded genres, boost favorites
+    if profile is not None:
+        with metrics.span("personalize"):
+            candidate_positions, _ = profile.rerank(load_genre_matrix(), candidate_positions, composite)
 
-    # Normalize features
-    candidates_df["mood_score_norm"] = scaler.fit_transform(candidates_df[[mood_col]])
-    candidates_df["rating_score_norm"] = scaler.fit_transform(candidates_df[["vote_average"]])
-    candidates_df["popularity_score_norm"] = scaler.fit_transform(candidates_df[["popularity"]])
+    # Diversity selection (similarity is indexed by catalog position)
+    with metrics.span("similarity"):
+        if sim_graph is not None:
+            sim_block = sim_graph.pairwise(candidate_positions)
+        else:
+            sim_block = np.zeros((len(candidate_positions), len(candidate_positions)))
+    with metrics.span("diversity"):
+        selected_indices = select_diverse(sim_block, n, diversity_factor)
 
-    candidates_df["composite_score"] = (
-        0.5 * candidates_df["mood_score_norm"] +
-        0.3 * candidates_df["rating_score_norm"] +
-        0.2 * candidates_df["popularity_score_norm"]
-    )
+    return list(movies_df.index[candidate_positions[selected_indices]])
 
-    # Diversity selection
-    remaining_indices = list(range(len(candidates_df)))
-    selected_indices = []
-
-    if remaining_indices:
-        selected_indices.append(0)
-        remaining_indices.remove(0)
-
-    while len(selected_indices) < n and remaining_indices:
-        max_score = -1
-        best_idx = None
-
-        for idx in remaining_indices:
-            candidate_idx = candidates_df.index[idx]
-            similarities = []
-
-            for sel_idx in selected_indices:
-                sel_movie_idx = candidates_df.index[sel_idx]
-                if (_cosine_sim_matrix is not None and
-                    candidate_idx < len(_cosine_sim_matrix) and sel_movie_idx < len(_cosine_sim_matrix)):
-                    similarities.append(_cosine_sim_matrix[candidate_idx][sel_movie_idx])
-            avg_sim = np.mean(similarities) if similarities else 0
-            diversity_score = 1 - avg_sim
-            position_score = 1 - (idx / len(candidates_df))
-            combined_score = (1 - diversity_factor) * position_score + diversity_factor * diversity_score
-
-            if combined_score > max_score:
-                max_score = combined_score
-                best_idx = idx
-
-        if best_idx is not None:
-            selected_indices.append(best_idx)
-            remaining_indices.remove(best_idx)
-        else:
-            break
 
-    valid_indices = [candidates_df.index[i] for i in selected_indices if i < len(candidates_df)]
+def get_blended_recommendations_proc(movies_df, sim_graph, rankings, blend_vectors, counts, diversity_factors):
+    """
+    Recommendations for several weighted mood blends in one pass.
 
-    if not valid_indices:
-        fallback = movies_df.nlargest(n, "vote_average")
-        return [row.name for _, row in fallback.iterrows()]
+    Returns one list of movie labels per blend.
+    """
+    pools = rankings.blended_candidates(blend_vectors, [count * 5 for count in counts])
 
-    return valid_indices
+    results = []
+    for (candidate_positions, _), count, diversity_factor in zip(pools, counts, diversity_factors):
+        if sim_graph is not None:
+            sim_block = sim_graph.pairwise(candidate_positions)
+        else:
+            sim_block = np.zeros((len(candidate_positions), len(candidate_positions)))
+        selected_indices = select_diverse(sim_block, count, diversity_factor)
+        results.append(list(movies_df.index[candidate_positions[selected_indices]]))
+    return results
 
 
 # ---------------------------
 # Django Views
 # ---------------------------
 def index(request):
-    moods = [
-        "happy", "sad", "excited", "scared", "romantic",
-        "thoughtful", "adventurous", "relaxed", "mysterious", "inspired"
-    ]
-    return render(request, "Moodflix/index.html", {"moods": moods})
+    return render(request, "Moodflix/index.html", {"moods": MOODS})
 
 
 @require_http_methods(["GET"])
 def get_moods(request):
-    moods = [
-        "happy", "sad", "excited", "scared", "romantic",
-        "thoughtful", "adventurous", "relaxed", "mysterious", "inspired"
-    ]
-    return JsonResponse({"success": True, "moods": moods})
+    return JsonResponse({"success": True, "moods": MOODS})
+
+
+@require_http_methods(["GET"])
+def health_ready(request):
+    """Readiness probe: 200 once the model is loaded, 503 before that."""
+    if settings.RECOMMENDATION_BACKEND == "database":
+        # Nothing to load: every request reads the Movie table
+        return JsonResponse({"ready": True, "backend": "database"})
+    snapshot = _snapshot
+    ready = snapshot is not None
+    return JsonResponse(
+        {"ready": ready, "movies": len(snapshot) if ready else 0, **_model_status},
+        status=200 if ready else 503,
+    )
+
+
+@require_http_methods(["GET"])
+def response_cache_stats(request):
+    return JsonResponse({"success": True, **response_cache.stats()})
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Stage histograms and counters in the Prometheus text format."""
+    cache = response_cache.stats()
+    body = metrics.render(
+        extra_counters=[
+            (f"response_cache_{name}_total", f"Response cache {name}", cache[name])
+            for name in ("hits", "misses", "stores")
+        ],
+        gauges=[
+            ("model_loaded", "1 once the model is loaded", int(_snapshot is not None)),
+            ("model_load_seconds", "Duration of the last model load", _model_status.get("load_seconds")),
+            ("model_reloads", "Model snapshots swapped in since start", _model_status["reloads"]),
+        ],
+    )
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
+def reload_model_view(request):
+    """
+    Reload this worker's model now (POST with an X-Reload-Token header).
+    Only the worker that receives the request reloads; the others pick
+    the new artifacts up through MODEL_WATCH_INTERVAL.
+    """
+    token = settings.MODEL_RELOAD_TOKEN
+    if not token or not hmac.compare_digest(request.headers.get("X-Reload-Token", ""), token):
+        return JsonResponse({"success": False, "error": "Forbidden"}, status=403)
+    try:
+        reloaded = reload_model(force=request.GET.get("force", "").lower() in ("1", "true", "yes"))
+    except Exception as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=500)
+    return JsonResponse({"success": True, "reloaded": reloaded, "version": model_version()})
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+@serves_model
 def get_recommendations(request):
-    data = json.loads(request.body)
-    mood = data.get("mood")
-    count = int(data.get("count", 10))
-    offset = int(data.get("offset", 0))
+    # GET takes the same fields as a query string, so clients and CDNs can revalidate
+    try:
+        data = request.GET.dict() if request.method == "GET" else json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError
+        mood = data.get("mood")
+        if mood is not None and not isinstance(mood, str):
+            raise ValueError
+        count = int(data.get("count", 10))
+        offset = int(data.get("offset", 0))
+        diversity = float(data.get("diversity", 0.3))
+    except (TypeError, ValueError):
+        return JsonResponse({"success": False, "error": "Invalid request"}, status=400)
+    if count < 1 or offset < 0 or not 0 <= diversity <= 1:
+        return JsonResponse({
+            "success": False, "error": "count must be positive, offset not negative and diversity between 0 and 1",
+        }, status=400)
 
-    diversity = data.get("diversity", 0.3)
+    # Cursor paging: start with {"paginate": "cursor"}, then send back next_cursor
+    cursor = data.get("cursor")
+    use_cursor = bool(cursor) or data.get("paginate") == "cursor"
+    if use_cursor:
+        # The pool is count * 5 * CURSOR_MAX_PAGES titles
+        count = min(count, settings.CURSOR_MAX_COUNT)
+    elif count > settings.RECOMMENDATIONS_MAX_COUNT or offset + count > settings.RECOMMENDATIONS_MAX_DEPTH:
+        # The pool is (offset + count) * 5 titles
+        return JsonResponse({
+            "success": False,
+            "error": f"count must be at most {settings.RECOMMENDATIONS_MAX_COUNT} and offset + count "
+                     f"at most {settings.RECOMMENDATIONS_MAX_DEPTH}",
+        }, status=400)
+    # Skip titles this session was already served
+    exclude_seen = str(data.get("exclude_seen", "")).lower() in ("1", "true", "yes")
+    # Re-rank by the session's genre preferences (see /preferences/)
+    personalize = str(data.get("personalize", "")).lower() in ("1", "true", "yes")
 
-    if not mood:
+    if not mood and not cursor:
         return JsonResponse({"success": False, "error": "Mood is required"}, status=400)
 
+    # Optional attribute filters (genres, year, runtime, rating)
+    try:
+        filters = parse_filters(data)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+    # Per-session pages are offset pages (cursor pages never repeat anyway)
+    if (filters or personalize or exclude_seen) and use_cursor:
+        return JsonResponse({
+            "success": False, "error": "Filters, personalize and exclude_seen are not available with cursor paging",
+        }, status=400)
+
+    if settings.RECOMMENDATION_BACKEND == "database":
+        # No catalog positions to keep a seen bitset over: exclude_seen is
+        # ignored and clients page with offset
+        if use_cursor or filters or personalize:
+            return JsonResponse({
+                "success": False,
+                "error": "Cursor paging, filters and personalize are not available with the database backend",
+            }, status=400)
+        return get_database_recommendations(request, mood, count, offset, diversity)
+
+    try:
+        with metrics.span("model"):
+            movies_df, content_matrix, sim_graph, rankings = load_ml_model()
+
+        if exclude_seen or personalize:
+            # Per-session payloads are not shared, so they skip the response cache
+            if not request.session.session_key:
+                request.session.save()
+            session_key = request.session.session_key
+            profile = None
+            if personalize:
+                profile = get_profile_store().get(session_key, load_genre_matrix(), model_version(),
+                                                  current_snapshot().attribute_index)
+            if exclude_seen:
+                store = get_seen_store()
+                # Concurrent requests of the session wait, so they never pick the same
+                # titles; posters are resolved after the stripe is released
+                with store.session_lock(session_key):
+                    seen = store.get(session_key, movies_df["id"].to_numpy(), model_version())
+                    positions, _, _ = select_recommendations(
+                        movies_df, sim_graph, rankings, mood, count, offset, diversity, seen=seen, filters=filters,
+                        profile=profile,
+                    )
+                store.record(session_key, seen)
+                body, complete = render_recommendations(positions, mood)
+            else:
+                body, complete = build_recommendations_body(
+                    movies_df, sim_graph, rankings, mood, count, offset, diversity, filters=filters, profile=profile,
+                )
+            response = HttpResponse(body, content_type="application/json")
+            patch_cache_control(response, private=True, no_store=True)
+            return response
+
+        key = response_cache.cache_key(model_version(), {
+            "mood": mood, "count": count, "offset": offset, "diversity": diversity,
+            "cursor": cursor, "use_cursor": use_cursor, "filters": filters,
+        })
+        with metrics.span("cache"):
+            cached = response_cache.get(key)
+        if cached is not None:
+            etag, body = cached
+            cache_status = "HIT"
+        else:
+            body, complete = build_recommendations_body(
+                movies_df, sim_graph, rankings, mood, count, offset, diversity, use_cursor, cursor, filters=filters
+            )
+            # Responses with posters still pending are served but not cached
+            etag = response_cache.put(key, body) if complete else response_cache.etag_for(body)
+            cache_status = "MISS"
+    except InvalidCursor as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=500)
+
+    response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["X-Cache"] = cache_status
+    if request.method == "GET":
+        patch_cache_control(response, public=True, max_age=settings.RESPONSE_CACHE_MAX_AGE)
+        return get_conditional_response(request, etag=etag, response=response)
+    return response
+
+
+def get_database_recommendations(request, mood, count, offset, diversity):
+    """
+    /recommendations/ from the database backend. Cached like the in-memory
+    path; there is no model version, so the cache TTL bounds staleness
+    after a catalog reload.
+    """
     try:
-        movies_df, content_matrix, cosine_sim_matrix, scaler = load_ml_model()
+        key = response_cache.cache_key("database", {
+            "mood": mood, "count": count, "offset": offset, "diversity": diversity,
+        })
+        with metrics.span("cache"):
+            cached = response_cache.get(key)
+        if cached is not None:
+            etag, body = cached
+            cache_status = "HIT"
+        else:
+            body, complete = database_recommendations_body(mood, count, offset, diversity)
+            etag = response_cache.put(key, body) if complete else response_cache.etag_for(body)
+            cache_status = "MISS"
+    except Exception as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=500)
+
+    response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["X-Cache"] = cache_status
+    if request.method == "GET":
+        patch_cache_control(response, public=True, max_age=settings.RESPONSE_CACHE_MAX_AGE)
+        return get_conditional_response(request, etag=etag, response=response)
+    return response
+
+
+def database_recommendations_body(mood, count, offset, diversity):
+    recommendations = db_backend.recommend(mood, n=offset + count, diversity_factor=diversity)[offset:offset + count]
+    with metrics.span("posters"):
+        complete = attach_posters(recommendations)
+    payload = {
+        "success": True,
+        "mood": mood,
+        "count": len(recommendations),
+        "recommendations": recommendations,
+        "ml_powered": True
+    }
+    with metrics.span("serialize"):
+        return json.dumps(payload, cls=DjangoJSONEncoder).encode(), complete
 
+
+def build_recommendations_body(movies_df, sim_graph, rankings, mood, count, offset, diversity,
+                               use_cursor=False, cursor=None, seen=None, filters=None, profile=None):
+    """
+    Serialized /recommendations/ payload and whether every poster lookup
+    finished. With seen (a SeenTitles), titles in it are skipped and the
+    served ones are added to it. filters is a parse_filters() spec and
+    profile the session's GenreProfile.
+    """
+    positions, next_cursor, mood = select_recommendations(
+        movies_df, sim_graph, rankings, mood, count, offset, diversity, use_cursor, cursor, seen, filters, profile,
+    )
+    return render_recommendations(positions, mood, use_cursor, next_cursor)
+
+
+def select_recommendations(movies_df, sim_graph, rankings, mood, count, offset, diversity,
+                           use_cursor=False, cursor=None, seen=None, filters=None, profile=None):
+    """
+    Catalog positions of the page, its next_cursor when use_cursor, and
+    its mood (read from the cursor when one is given).
+    """
+    next_cursor = None
+    if use_cursor:
+        with metrics.span("page"):
+            positions, next_cursor, mood = recommend_page(
+                sim_graph, rankings, mood, count, diversity, model_version(), cursor=cursor
+            )
+    else:
+        allowed = None
+        if filters:
+            with metrics.span("filter"):
+                allowed = current_snapshot().attribute_index.select(filters)
         recommended_indices = get_mood_based_recommendations_proc(
-            movies_df, cosine_sim_matrix, scaler, mood, n=offset+count, diversity_factor=diversity
+            movies_df, sim_graph, rankings, mood, n=offset+count, diversity_factor=diversity, exclude=seen,
+            allowed=allowed, profile=profile,
         )
-        recommended_indices = recommended_indices[offset:offset + count]
+        positions = movies_df.index.get_indexer(recommended_indices[offset:offset + count])
+        if seen is not None:
+            seen.mark(positions)
+    return positions, next_cursor, mood
 
 
-        # ✅ Use .loc instead of .iloc
-        recommendations = []
+def render_recommendations(positions, mood, use_cursor=False, next_cursor=None):
+    """Serialized payload for selected positions, and whether every poster lookup finished."""
+    # Cards were encoded at model load; only posters are filled in per response
+    card_store = load_card_store()
+    with metrics.span("posters"):
+        posters = [{"id": int(card_store.ids[pos]), "poster_path": card_store.posters[pos]} for pos in positions]
+        complete = attach_posters(posters)
 
-        for idx in recommended_indices:
-            movie = format_movie_row(movies_df.loc[idx])
+    with metrics.span("serialize"):
+        cards = card_store.cards(positions, [movie["poster_path"] for movie in posters])
+        body = payload(
+            {"success": True, "mood": mood, "count": len(cards)},
+            "recommendations", cards,
+            {"ml_powered": True, **({"next_cursor": next_cursor} if use_cursor else {})},
+        )
+    return body, complete
 
-            # Fetch poster from TMDB
-            poster_path = fetch_movie_poster(movie["title"])
 
-            movie["poster_path"] = poster_path
+@csrf_exempt
+@require_http_methods(["POST"])
+@memory_backend_only
+@serves_model
+def get_mixed_mood_recommendations(request):
+    """
+    Recommendations for a weighted blend of moods.
 
-            recommendations.append(movie)
+    Body: {"moods": {"happy": 0.7, "adventurous": 0.3}, "count": 10, "diversity": 0.3}
+    or a batch: {"blends": [{"moods": {...}, "count": 10}, ...]}, answered
+    with one entry per blend under "results".
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"success": False, "error": "Invalid JSON"}, status=400)
 
+    if not isinstance(data, dict):
+        return JsonResponse({"success": False, "error": "Body must be a JSON object"}, status=400)
+    is_batch = "blends" in data
+    blends = data["blends"] if is_batch else [data]
+    if not isinstance(blends, list) or not blends or not all(isinstance(b, dict) for b in blends):
+        return JsonResponse({"success": False, "error": "blends must be a non-empty list"}, status=400)
+    if len(blends) > settings.MIXED_MOOD_MAX_BLENDS:
+        return JsonResponse(
+            {"success": False, "error": f"At most {settings.MIXED_MOOD_MAX_BLENDS} blends per request"},
+            status=400,
+        )
+    if not all(isinstance(blend.get("moods") or {}, dict) for blend in blends):
+        return JsonResponse({"success": False, "error": 'moods must be an object like {"happy": 0.7}'}, status=400)
+    try:
+        counts = [int(blend.get("count", data.get("count", 10))) for blend in blends]
+        diversities = [float(blend.get("diversity", data.get("diversity", 0.3))) for blend in blends]
+    except (TypeError, ValueError):
+        return JsonResponse({"success": False, "error": "count and diversity must be numbers"}, status=400)
+
+    try:
+        movies_df, content_matrix, sim_graph, rankings = load_ml_model()
+
+        try:
+            blend_vectors = np.array([rankings.blend_vector(blend.get("moods") or {}) for blend in blends])
+        except TypeError:
+            return JsonResponse({"success": False, "error": "Mood weights must be numbers"}, status=400)
+        except ValueError as e:
+            return JsonResponse({"success": False, "error": str(e)}, status=400)
+        if (not all(1 <= count <= settings.MIXED_MOOD_MAX_COUNT for count in counts)
+                or not all(0 <= d <= 1 for d in diversities)):
+            return JsonResponse({
+                "success": False,
+                "error": f"count must be between 1 and {settings.MIXED_MOOD_MAX_COUNT} and diversity between 0 and 1",
+            }, status=400)
+
+        indices_per_blend = get_blended_recommendations_proc(
+            movies_df, sim_graph, rankings, blend_vectors, counts, diversities
+        )
+
+        results = []
+        for vector, indices in zip(blend_vectors, indices_per_blend):
+            recommendations = [format_movie_row(movies_df.loc[idx]) for idx in indices]
+            results.append({
+                "moods": {mood: round(float(w), 4) for mood, w in zip(rankings.moods, vector) if w > 0},
+                "count": len(recommendations),
+                "recommendations": recommendations,
+            })
+
+        # One poster batch for every blend in the request
+        attach_posters([movie for result in results for movie in result["recommendations"]])
+
+        if is_batch:
+            return JsonResponse({"success": True, "results": results, "ml_powered": True})
+        return JsonResponse({"success": True, **results[0], "ml_powered": True})
+    except Exception as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+@memory_backend_only
+@serves_model
+def get_similar_movies(request):
+    """
+    Titles most similar in content to one or more movies.
+
+    GET /similar/?id=19995&id=285&k=10 or
+    POST {"ids": [19995, 285], "k": 10}
+
+    Results are exact; approximate=true is rejected with a 400.
+    """
+    try:
+        if request.method == "GET":
+            ids = request.GET.getlist("id")
+            k = request.GET.get("k", 10)
+            approximate = request.GET.get("approximate", "").lower() in ("1", "true", "yes")
+        else:
+            data = json.loads(request.body)
+            if not isinstance(data, dict):
+                raise ValueError
+            ids = data.get("ids") or ([data["id"]] if "id" in data else [])
+            k = data.get("k", 10)
+            approximate = bool(data.get("approximate", False))
+        if not isinstance(ids, list):
+            raise ValueError
+        ids = [int(tmdb_id) for tmdb_id in ids]
+        k = int(k)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return JsonResponse({"success": False, "error": "Invalid request"}, status=400)
+
+    if approximate:
+        return JsonResponse({"success": False, "error": "Approximate search is not available"}, status=400)
+    if not ids:
+        return JsonResponse({"success": False, "error": "At least one id is required"}, status=400)
+    if len(ids) > settings.SIMILAR_MAX_IDS or not 1 <= k <= settings.SIMILAR_MAX_K:
+        return JsonResponse({
+            "success": False,
+            "error": f"Up to {settings.SIMILAR_MAX_IDS} ids and k between 1 and {settings.SIMILAR_MAX_K}",
+        }, status=400)
+
+    try:
+        movies_df = load_ml_model()[0]
+        search = load_neighbor_search()
+
+        positions = search.positions_for(ids)
+        known = positions >= 0
+        if not known.any():
+            return JsonResponse({"success": False, "error": "Movie not found", "missing": ids}, status=404)
+
+        indices, scores = search.search(positions[known], k)
+
+        results = []
+        for tmdb_id, pos, row_indices, row_scores in zip(np.asarray(ids)[known], positions[known], indices, scores):
+            similar = []
+            for neighbor, score in zip(row_indices, row_scores):
+                if neighbor < 0:
+                    continue
+                movie = format_movie_row(movies_df.iloc[neighbor])
+                movie["similarity"] = round(float(score), 4)
+                similar.append(movie)
+            results.append({"id": int(tmdb_id), "title": movies_df.iloc[pos]["title"], "similar": similar})
+
+        attach_posters([movie for result in results for movie in result["similar"]])
 
         return JsonResponse({
             "success": True,
-            "mood": mood,
-            "count": len(recommendations),
-            "recommendations": recommendations,
-            "ml_powered": True
+            "k": k,
+            "results": results,
+            "missing": [tmdb_id for tmdb_id, found in zip(ids, known) if not found],
+            "ml_powered": True,
         })
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=500)
 
 
+@require_http_methods(["GET"])
+@memory_backend_only
+@serves_model
+def search_movies(request):
+    """
+    Title search for typeahead.
+
+    GET /search/?q=matr&limit=10&mode=auto. mode "prefix" matches word
+    prefixes, "fuzzy" matches by trigram similarity (typos), "auto" falls
+    back to fuzzy when nothing has the prefix.
+    """
+    query = request.GET.get("q", "").strip()
+    mode = request.GET.get("mode", "auto")
+    try:
+        limit = int(request.GET.get("limit", 10))
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid limit"}, status=400)
+
+    if not query:
+        return JsonResponse({"success": False, "error": "Query is required"}, status=400)
+    if mode not in ("auto", "prefix", "fuzzy") or not 1 <= limit <= settings.SEARCH_MAX_LIMIT:
+        return JsonResponse({
+            "success": False,
+            "error": f"mode must be auto, prefix or fuzzy and limit between 1 and {settings.SEARCH_MAX_LIMIT}",
+        }, status=400)
+
+    try:
+        movies_df = load_ml_model()[0]
+        title_index = load_title_index()
+
+        if mode == "prefix":
+            positions = title_index.prefix(query, limit)
+        elif mode == "fuzzy":
+            positions, _ = title_index.fuzzy(query, limit)
+        else:
+            positions = title_index.search(query, limit)
+
+        rows = movies_df.iloc[positions]
+        results = [
+            {
+                "id": int(row["id"]),
+                "title": row["title"],
+                "year": str(row.get("release_date", ""))[:4],
+                "rating": float(row.get("vote_average", 0)),
+                "genres": row.get("genre_names", []),
+                "poster_path": row.get("poster_path", "") or "",
+            }
+            for _, row in rows.iterrows()
+        ]
+        return JsonResponse({"success": True, "query": query, "count": len(results), "results": results})
+    except Exception as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=500)
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@memory_backend_only
+@serves_model
 def get_surprise_recommendations(request):
     """
-    Get surprise movie recommendations using the ML model.
-    Uses only the dataframe, no DB lookup needed.
+    Random well-rated titles, weighted towards less popular ones.
+
+    POST {"count": 5, "mood": "happy", "seed": 42}; mood and seed are
+    optional, and the same seed returns the same titles.
     """
     try:
-        data = json.loads(request.body)
-        count = int(data.get('count', 5))  # default 5 recommendations
-
-        # Load ML model and movies dataframe
-        ml_model, movies_df = load_ml_model()
-
-        # Get recommended indices using ML
-        recommended_indices = ml_model.get_surprise_recommendations(n=count)
-
-        # Build recommendations from dataframe
-        recommendations = []
-        for idx in recommended_indices:
-            movie_row = movies_df.loc[idx]
-            movie_data = {
-                "id": int(movie_row.get("id", 0)),
-                "title": movie_row.get("title", ""),
-                "overview": movie_row.get("overview", ""),
-                "genres": movie_row.get("genre_names", []),
-                "rating": float(movie_row.get("vote_average", 0)),
-                "vote_count": int(movie_row.get("vote_count", 0)),
-                "release_date": str(movie_row.get("release_date", "")),
-                "runtime": int(movie_row["runtime"]) if movie_row.get("runtime") else None,
-                "cast": movie_row.get("cast_names", [])[:5] if movie_row.get("cast_names") else [],
-                "director": movie_row.get("director", ""),
-                "poster_path": movie_row.get("poster_path", "")
-            }
-            recommendations.append(movie_data)
+        data = json.loads(request.body) if request.body else {}
+        if not isinstance(data, dict):
+            raise ValueError
+        count = int(data.get("count", 5))
+        mood = data.get("mood")
+        if mood is not None and not isinstance(mood, str):
+            raise ValueError
+        seed = data.get("seed")
+        seed = int(seed) if seed is not None else None
+    except (TypeError, ValueError):
+        return JsonResponse({"success": False, "error": "Invalid request"}, status=400)
 
+    if not 1 <= count <= settings.SURPRISE_MAX_COUNT or (seed is not None and seed < 0):
         return JsonResponse({
-            "success": True,
-            "type": "surprise",
-            "count": len(recommendations),
-            "recommendations": recommendations,
-            "ml_powered": True
-        })
+            "success": False,
+            "error": f"count must be between 1 and {settings.SURPRISE_MAX_COUNT} and seed non-negative",
+        }, status=400)
 
-    except json.JSONDecodeError:
-        return JsonResponse({"success": False, "error": "Invalid JSON"}, status=400)
+    try:
+        movies_df = load_ml_model()[0]
+        positions = load_surprise_sampler().sample(count, mood=mood, seed=seed)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=500)
-    except Exception as e:
-        print("ERROR:", e)
-        raise e
+
+    recommendations = [format_movie_row(movies_df.iloc[pos]) for pos in positions]
+    attach_posters(recommendations)
+
+    return JsonResponse({
+        "success": True,
+        "type": "surprise",
+        "mood": mood,
+        "seed": seed,
+        "count": len(recommendations),
+        "recommendations": recommendations,
+        "ml_powered": True
+    })
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def user_preferences(request):
+    """
+    The session's genre preferences, used by /recommendations/ with
+    personalize=true.
+
+    POST {"favorite_genres": ["Animation"], "excluded_genres": ["Horror"]};
+    a field left out keeps its stored value.
+    """
+    if not request.session.session_key:
+        request.session.save()
+    session_key = request.session.session_key
+
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({"success": False, "error": "Invalid JSON"}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({"success": False, "error": "Body must be a JSON object"}, status=400)
+        fields = {}
+        for field in ("favorite_genres", "excluded_genres"):
+            if field not in data:
+                continue
+            genres = data[field]
+            if not isinstance(genres, list) or not all(isinstance(genre, str) for genre in genres):
+                return JsonResponse({"success": False, "error": f"{field} must be a list of genre names"}, status=400)
+            fields[field] = sorted(set(genres))
+        # One row per session (session_key is unique), even under concurrent requests
+        preference, _ = UserPreference.objects.update_or_create(session_key=session_key, defaults=fields)
+        get_profile_store().invalidate(session_key)
+    else:
+        preference = UserPreference.objects.filter(session_key=session_key).first()
+
+    return JsonResponse({
+        "success": True,
+        "favorite_genres": preference.favorite_genres if preference else [],
+        "excluded_genres": preference.excluded_genres if preference else [],
+    })
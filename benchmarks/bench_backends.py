@@ -0,0 +1,124 @@
+"""
+In-memory vs database recommendation backend: worker memory and latency.
+
+    python -m benchmarks.bench_backends --sizes 5000 50000 --requests 200
+
+Loads a synthetic catalog into a temporary SQLite database (load_movies
+plus store_content_vectors), then starts one fresh worker process per
+backend. Each worker serves the same mix of /recommendations/ payloads
+(moods x counts x offsets, no response cache, posters skipped) and
+reports latency percentiles and RSS above the interpreter + Django
+baseline measured before the first request.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import write_pickles
+
+
+WORKER = r"""
+import json, os, resource, sys, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+from Main import settings as project_settings
+backend, db_file, movies_file, model_file, n_requests = sys.argv[1:6]
+project_settings.DATABASES["default"]["NAME"] = db_file
+project_settings.RECOMMENDATION_BACKEND = backend
+import django
+django.setup()
+import numpy as np
+from Moodflix import views
+from Moodflix.moods import MOODS
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+views.attach_posters = lambda movies: True
+views.model_pickle_paths = lambda: (movies_file, model_file)
+baseline = rss_mb()
+
+def serve(i):
+    mood, count, offset = MOODS[i % len(MOODS)], (10, 20)[i % 2], (0, 10)[(i // 2) % 2]
+    if backend == "database":
+        return views.database_recommendations_body(mood, count, offset, 0.3)
+    movies_df, _, sim_graph, rankings = views.load_ml_model()
+    return views.build_recommendations_body(movies_df, sim_graph, rankings, mood, count, offset, 0.3)
+
+start = time.perf_counter()
+serve(0)
+first_s = time.perf_counter() - start
+timings = []
+for i in range(int(n_requests)):
+    start = time.perf_counter()
+    serve(i)
+    timings.append(time.perf_counter() - start)
+timings = np.array(timings) * 1e3
+print(json.dumps({
+    "first_request_s": first_s,
+    "p50_ms": float(np.percentile(timings, 50)),
+    "p99_ms": float(np.percentile(timings, 99)),
+    "baseline_rss_mb": baseline,
+    "rss_mb": rss_mb(),
+    "data_rss_mb": rss_mb() - baseline,
+}))
+"""
+
+
+def run_worker(backend, db_file, movies_file, model_file, n_requests):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER, backend, db_file, movies_file, model_file, str(n_requests)],
+        cwd=root, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+    from Main import settings as project_settings
+
+    results = []
+    print(f"{'backend':>9} {'size':>8} {'first s':>8} {'p50 ms':>8} {'p99 ms':>8} {'data RSS MB':>12} {'RSS MB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = os.path.join(directory, "bench.sqlite3")
+        project_settings.DATABASES["default"]["NAME"] = db_file
+        import django
+        django.setup()
+        from django.core.management import call_command
+
+        call_command("migrate", verbosity=0)
+        for size in args.sizes:
+            movies_file, model_file = write_pickles(os.path.join(directory, str(size)), size)
+            call_command("load_movies", "--pickle", movies_file, "--prune", stdout=open(os.devnull, "w"))
+            call_command("store_content_vectors", "--movies", movies_file, "--model", model_file,
+                         stdout=open(os.devnull, "w"))
+
+            for backend in ("memory", "database"):
+                result = {"backend": backend, "size": size,
+                          **run_worker(backend, db_file, movies_file, model_file, args.requests)}
+                results.append(result)
+                print(f"{backend:>9} {size:>8} {result['first_request_s']:>8.2f} {result['p50_ms']:>8.2f} "
+                      f"{result['p99_ms']:>8.2f} {result['data_rss_mb']:>12.1f} {result['rss_mb']:>8.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Per-response serialization: pandas rows + json.dumps vs pre-serialized cards.
+
+    python -m benchmarks.bench_cards --sizes 5000 50000 --counts 10 50
+
+"rows" is the old path: movies_df.loc[label] and format_movie_row for every
+recommended title, then json.dumps of the whole payload. "cards" slices
+the card store built at model load and joins the fragments. Both produce
+the same bytes. Poster lookups are not included.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+
+def _per_call_us(fn, seconds):
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn(calls)
+        calls += 1
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time spent on each measurement")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+    import django
+    django.setup()
+    from django.core.serializers.json import DjangoJSONEncoder
+
+    from Moodflix.cards import build_card_store, payload
+    from Moodflix.views import format_movie_row
+    from benchmarks.synthetic import catalog
+
+    results = []
+    print(f"{'size':>8} {'build s':>8} {'store MB':>9} {'count':>6} {'rows us':>9} {'cards us':>9} {'speedup':>8}")
+    for size in args.sizes:
+        movies_df = catalog(size)
+        movies_df["poster_path"] = "/bench.jpg"
+        start = time.perf_counter()
+        store = build_card_store(movies_df, format_movie_row)
+        build_s = time.perf_counter() - start
+        rng = np.random.default_rng(0)
+
+        for count in args.counts:
+            pages = [rng.choice(size, count, replace=False) for _ in range(64)]
+            label_pages = [movies_df.index[positions] for positions in pages]
+
+            def rows(i):
+                recommendations = [format_movie_row(movies_df.loc[label]) for label in label_pages[i % 64]]
+                body = {"success": True, "mood": "happy", "count": count, "recommendations": recommendations,
+                        "ml_powered": True}
+                return json.dumps(body, cls=DjangoJSONEncoder).encode()
+
+            def cards(i):
+                positions = pages[i % 64]
+                posters = [store.posters[pos] for pos in positions]
+                return payload({"success": True, "mood": "happy", "count": count}, "recommendations",
+                               store.cards(positions, posters), {"ml_powered": True})
+
+            assert rows(0) == cards(0)
+            result = {
+                "size": size,
+                "count": count,
+                "build_s": build_s,
+                "store_mb": store.nbytes / 1e6,
+                "rows_us": _per_call_us(rows, args.seconds),
+                "cards_us": _per_call_us(cards, args.seconds),
+            }
+            results.append(result)
+            print(f"{size:>8} {build_s:>8.2f} {result['store_mb']:>9.1f} {count:>6} {result['rows_us']:>9.0f} "
+                  f"{result['cards_us']:>9.1f} {result['rows_us'] / result['cards_us']:>7.0f}x")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
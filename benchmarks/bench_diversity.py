@@ -0,0 +1,70 @@
+"""
+Diversity re-ranking: original Python loop vs the vectorized engine.
+
+    python -m benchmarks.bench_diversity --counts 10 20 50 100 200 500
+
+For each count n the candidate pool is 5n, as in
+get_mood_based_recommendations_proc. The reference loop is cubic, so it
+is only timed up to --reference-max.
+"""
+import argparse
+import json
+import time
+
+from sklearn.metrics.pairwise import cosine_similarity
+
+from Moodflix.diversity import select_diverse, select_diverse_reference
+from benchmarks.synthetic import tfidf_matrix
+
+
+def _best_of(fn, repeat, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def run(n, diversity_factor, reference_max, repeat):
+    sim_block = cosine_similarity(tfidf_matrix(n * 5, seed=n))
+    picks, engine_s = _best_of(select_diverse, repeat, sim_block, n, diversity_factor)
+    result = {"n": n, "candidates": n * 5, "engine_ms": engine_s * 1e3, "reference_ms": None, "parity": None}
+
+    if n <= reference_max:
+        reference_picks, reference_s = _best_of(select_diverse_reference, 1, sim_block, n, diversity_factor)
+        result["reference_ms"] = reference_s * 1e3
+        result["parity"] = picks == reference_picks
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 20, 50, 100, 200, 500])
+    parser.add_argument("--diversity", type=float, default=0.3)
+    parser.add_argument("--reference-max", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'n':>5} {'pool':>6} {'loop ms':>10} {'engine ms':>10} {'speedup':>8} {'parity':>7}")
+    for n in args.counts:
+        result = run(n, args.diversity, args.reference_max, args.repeat)
+        results.append(result)
+        if result["reference_ms"] is None:
+            loop, speedup, parity = "skipped", "", ""
+        else:
+            loop = f"{result['reference_ms']:.1f}"
+            speedup = f"{result['reference_ms'] / result['engine_ms']:.0f}x"
+            parity = "ok" if result["parity"] else "DIFF"
+        print(f"{n:>5} {n * 5:>6} {loop:>10} {result['engine_ms']:>10.2f} {speedup:>8} {parity:>7}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Filtered mood candidates: pandas masks per request vs the attribute index.
+
+    python -m benchmarks.bench_filters --sizes 5000 50000 --count 10
+
+"mask" is the straightforward path: boolean masks over movies_df for the
+genre and range filters, then the mood ranking scanned for the first
+matching titles. "index" selects the filter from the bitsets and sorted
+attributes built at model load and asks MoodRanking.candidates() for
+the matching titles. Both return the same candidates. Filters go from
+broad (one common genre) to very selective.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+FILTERS = {
+    "broad": {"genres": "Drama"},
+    "medium": {"genres": "Animation,Family", "year_min": 2000},
+    "narrow": {"genres": "Animation", "year_min": 2001, "runtime_max": 110},
+    "rare": {"genres": "Western", "year_min": 2015, "year_max": 2020, "rating_min": 8},
+}
+
+
+def _per_call_us(fn, seconds):
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        calls += 1
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def mask_filter(movies_df, spec):
+    mask = np.ones(len(movies_df), dtype=bool)
+    if spec.get("genres"):
+        wanted = set(spec["genres"])
+        mask &= movies_df["genre_names"].apply(lambda names: bool(wanted & set(names))).to_numpy()
+    columns = {
+        "year": pd.to_datetime(movies_df["release_date"], errors="coerce").dt.year,
+        "runtime": movies_df["runtime"].where(movies_df["runtime"] > 0),
+        "rating": movies_df["vote_average"],
+    }
+    for name, (low, high) in spec.get("ranges", {}).items():
+        values = columns[name]
+        if low is not None:
+            mask &= (values >= low).to_numpy()
+        if high is not None:
+            mask &= (values <= high).to_numpy()
+    return mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--count", type=int, default=10, help="Titles per page (the pool is count * 5)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent on each measurement")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+    import django
+    django.setup()
+
+    from Moodflix.filters import build_attribute_index, parse_filters
+    from Moodflix.moods import MOODS
+    from Moodflix.rankings import build_mood_rankings
+    from benchmarks.synthetic import catalog
+
+    pool = args.count * 5
+    results = []
+    print(f"{'size':>8} {'filter':>7} {'matches':>8} {'mask us':>9} {'index us':>9} {'speedup':>8}")
+    for size in args.sizes:
+        movies_df = catalog(size)
+        ranking = build_mood_rankings(movies_df, MOODS).for_mood("happy")
+        index = build_attribute_index(movies_df)
+
+        for name, data in FILTERS.items():
+            spec = parse_filters(data)
+
+            def masked():
+                mask = mask_filter(movies_df, spec)
+                ranks = np.flatnonzero(mask[ranking.order])[:pool]
+                return ranking.order[ranks]
+
+            def indexed():
+                return ranking.candidates(pool, allowed=index.select(spec))[0]
+
+            assert set(masked().tolist()) == set(indexed().tolist())
+            result = {
+                "size": size,
+                "filter": name,
+                "matches": len(index.select(spec)),
+                "mask_us": _per_call_us(masked, args.seconds),
+                "index_us": _per_call_us(indexed, args.seconds),
+            }
+            results.append(result)
+            print(f"{size:>8} {name:>7} {result['matches']:>8} {result['mask_us']:>9.0f} "
+                  f"{result['index_us']:>9.0f} {result['mask_us'] / result['index_us']:>7.0f}x")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
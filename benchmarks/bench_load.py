@@ -0,0 +1,428 @@
+"""
+End-to-end load test: the Django app behind a real server, TMDB stubbed.
+
+    python -m benchmarks.bench_load --size 20000 --concurrency 8 32 --duration 60
+    python -m benchmarks.bench_load --servers gunicorn uvicorn --workers 4 --tmdb-latency 0.08
+    python -m benchmarks.bench_load --url http://staging:8000 --concurrency 64
+
+Starts a local stub TMDB (benchmarks.tmdb_stub) with --tmdb-latency and
+--tmdb-error-rate. Then, for each server in --servers, it starts the app
+with --workers worker processes:
+
+  gunicorn   Main/wsgi.py under gunicorn (--threads threads per worker)
+  uvicorn    Main/asgi.py under uvicorn
+  wsgiref    Main/wsgi.py under the standard library's threaded WSGI
+             server, one process; for when neither is installed
+
+It waits for /health/ready on every worker (MOODFLIX_WARMUP=1), then
+keeps --concurrency requests in flight. The mix is /moods/,
+/recommendations/ (varied mood, count, offset and diversity) and
+/surprise/, weighted by --mix. The first --warmup seconds are not
+counted. Each run reports throughput, p50/p95/p99 latency and the error
+rate (network errors and non-2xx responses), overall and per endpoint,
+plus the peak RSS of the server's worker processes. RSS is read from
+/proc and is Linux only.
+
+The model is --bundle (a model bundle directory) or a synthetic bundle
+of --size titles, written to --data-dir and reused by later runs. The
+app runs with Main/settings.py as it is, DEBUG included.
+
+The load generator is threads in this process. Run it on another host
+with --url when the server's CPUs would be shared: --url skips the
+server, the stub and the RSS readings.
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from Moodflix.moods import MOODS
+from benchmarks.bench_suite import commit_id
+from benchmarks.tmdb_stub import StubTMDBServer
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COUNTS = [5, 10, 20]
+OFFSETS = [0, 0, 0, 10, 20]
+DIVERSITIES = [0.0, 0.3, 0.3, 0.5, 0.8]
+
+WSGIREF_SERVER = r"""
+import os, sys
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+from Main.wsgi import application
+
+class Server(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+class Handler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+make_server(sys.argv[1], int(sys.argv[2]), application, server_class=Server, handler_class=Handler).serve_forever()
+"""
+
+
+# ---------------------------
+# Servers
+# ---------------------------
+def available_servers():
+    servers = [name for name in ("gunicorn", "uvicorn") if importlib.util.find_spec(name) is not None]
+    return servers or ["wsgiref"]
+
+
+def server_command(server, host, port, workers, threads):
+    if server == "gunicorn":
+        return [sys.executable, "-m", "gunicorn", "Main.wsgi:application", "--bind", f"{host}:{port}",
+                "--workers", str(workers), "--threads", str(threads), "--backlog", "1024",
+                "--log-level", "warning"]
+    if server == "uvicorn":
+        return [sys.executable, "-m", "uvicorn", "Main.asgi:application", "--host", host, "--port", str(port),
+                "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    return [sys.executable, "-c", WSGIREF_SERVER, host, str(port)]
+
+
+def server_workers(server, workers):
+    return 1 if server == "wsgiref" else workers
+
+
+def start_server(server, args, bundle_dir, tmdb_url):
+    if server != "wsgiref" and importlib.util.find_spec(server) is None:
+        raise SystemExit(f"{server} is not installed (pip install {server})")
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE="Main.settings",
+        MOODFLIX_MODEL_BUNDLE=bundle_dir,
+        MOODFLIX_WARMUP="1",
+        TMDB_API_URL=tmdb_url,
+    )
+    proc = subprocess.Popen(server_command(server, args.host, args.port, args.workers, args.threads),
+                            cwd=ROOT, env=env)
+
+    # Every worker loads the model. Connections land on any worker, so
+    # wait for a run of ready answers long enough to have reached them all
+    base_url = f"http://{args.host}:{args.port}"
+    expected = server_workers(server, args.workers)
+    deadline = time.monotonic() + args.startup_timeout
+    ready = 0
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{server} exited with status {proc.returncode} during startup")
+        status, _ = _get(base_url, "/health/ready")
+        ready = ready + 1 if status == 200 else 0
+        if ready >= 4 * expected:
+            return proc, base_url
+        time.sleep(0.25)
+    stop_server(proc)
+    raise SystemExit(f"{server} was not ready after {args.startup_timeout:.0f}s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def _get(base_url, path):
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=5)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return response.status, response.read()
+    except OSError:
+        return None, b""
+    finally:
+        conn.close()
+
+
+# ---------------------------
+# Worker memory
+# ---------------------------
+def process_tree(pid):
+    """pid and all its descendants (from /proc)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; ppid follows its closing paren
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class RSSSampler:
+    """Peak RSS per process of a server's process tree, sampled on a thread."""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        while True:
+            for pid in process_tree(self.pid):
+                rss = rss_mb(pid)
+                if rss is not None:
+                    self.peak[pid] = max(rss, self.peak.get(pid, 0.0))
+            if self._stop.wait(self.interval):
+                return
+
+    def summary(self):
+        # The gunicorn/uvicorn master only supervises; report the workers
+        workers = [rss for pid, rss in self.peak.items() if pid != self.pid] or list(self.peak.values())
+        return {
+            "worker_rss_max_mb": max(workers) if workers else None,
+            "worker_rss_total_mb": sum(workers) if workers else None,
+            "workers_seen": len(workers),
+        }
+
+
+# ---------------------------
+# Load generator
+# ---------------------------
+def next_request(rng, mix):
+    """(endpoint, method, path, body) drawn from the request mix."""
+    endpoint = rng.choices(list(mix), weights=list(mix.values()))[0]
+    if endpoint == "moods":
+        return endpoint, "GET", "/moods/", None
+    if endpoint == "surprise":
+        body = {"count": rng.choice([5, 10])}
+        if rng.random() < 0.5:
+            body["mood"] = rng.choice(MOODS)
+        return endpoint, "POST", "/surprise/", body
+    body = {
+        "mood": rng.choice(MOODS),
+        "count": rng.choice(COUNTS),
+        "offset": rng.choice(OFFSETS),
+        "diversity": rng.choice(DIVERSITIES),
+    }
+    return endpoint, "POST", "/recommendations/", body
+
+
+def run_load(base_url, concurrency, warmup, duration, mix, seed=0):
+    """
+    Keep `concurrency` requests in flight for warmup + duration seconds.
+    Returns (endpoint, latency_s, ok) for requests started after warmup.
+    """
+    parts = urlsplit(base_url)
+    start = time.monotonic()
+    measure_from, stop_at = start + warmup, start + warmup + duration
+    samples = []
+    lock = threading.Lock()
+
+    def client(i):
+        rng = random.Random(seed * 1000 + i)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        local = []
+        while True:
+            sent = time.monotonic()
+            if sent >= stop_at:
+                break
+            endpoint, method, path, body = next_request(rng, mix)
+            payload = json.dumps(body).encode() if body is not None else None
+            headers = {"Content-Type": "application/json"} if payload is not None else {}
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = 200 <= response.status < 300
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+            if sent >= measure_from:
+                local.append((endpoint, time.monotonic() - sent, ok))
+        conn.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def summarize(samples, duration):
+    def stats(rows):
+        latencies = np.array([latency for _, latency, _ in rows]) * 1e3
+        errors = sum(1 for _, _, ok in rows if not ok)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist() if len(rows) else (None,) * 3
+        return {
+            "requests": len(rows),
+            "throughput_rps": len(rows) / duration,
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "p99_ms": p99,
+            "error_rate": errors / len(rows) if rows else None,
+        }
+
+    endpoints = sorted({endpoint for endpoint, _, _ in samples})
+    return stats(samples), {endpoint: stats([s for s in samples if s[0] == endpoint]) for endpoint in endpoints}
+
+
+def _ms(value):
+    return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+
+
+def print_result(result):
+    rss = result.get("worker_rss_max_mb")
+    print(f"\n{result['server']}, concurrency {result['concurrency']}: {result['throughput_rps']:.1f} req/s, "
+          f"errors {result['error_rate'] or 0:.2%}"
+          + (f", worker RSS max {rss:.0f} MB / total {result['worker_rss_total_mb']:.0f} MB" if rss else ""))
+    print(f"  {'endpoint':<16} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    rows = list(result["endpoints"].items()) + [("all", result)]
+    for endpoint, stats in rows:
+        print(f"  {endpoint:<16} {stats['requests']:>8} {stats['throughput_rps']:>8.1f} {_ms(stats['p50_ms'])} "
+              f"{_ms(stats['p95_ms'])} {_ms(stats['p99_ms'])} {stats['error_rate'] or 0:>7.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", nargs="+", choices=["gunicorn", "uvicorn", "wsgiref"],
+                        help="Default: gunicorn and uvicorn when installed, else wsgiref")
+    parser.add_argument("--workers", type=int, default=2, help="Server worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per gunicorn worker")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32], help="Requests kept in flight")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--mix", default="moods=1,recommendations=8,surprise=1",
+                        help="Endpoint weights, e.g. moods=1,recommendations=8,surprise=1")
+    parser.add_argument("--tmdb-latency", type=float, default=0.05, help="Seconds the stub TMDB takes per call")
+    parser.add_argument("--tmdb-error-rate", type=float, default=0.01, help="Fraction of stub TMDB calls failing")
+    parser.add_argument("--bundle", help="Model bundle to serve (default: synthetic, see --size)")
+    parser.add_argument("--size", type=int, default=20000, help="Titles in the synthetic catalog")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "moodflix_bench"),
+                        help="Where synthetic bundles are written and reused")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8731)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--url", help="Load an already running deployment instead of starting one")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    mix = {}
+    for part in args.mix.split(","):
+        endpoint, _, weight = part.partition("=")
+        if endpoint not in ("moods", "recommendations", "surprise"):
+            parser.error(f"unknown endpoint in --mix: {endpoint}")
+        mix[endpoint] = float(weight)
+
+    targets = [("external", args.url)] if args.url else [(server, None) for server in
+                                                        (args.servers or available_servers())]
+    bundle_dir = stub = None
+    if not args.url:
+        bundle_dir = args.bundle
+        if bundle_dir is None:
+            os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+            import django
+            django.setup()
+            from Moodflix.bundle import bundle_exists
+            from benchmarks.synthetic import write_bundle
+
+            bundle_dir = os.path.join(args.data_dir, f"bundle_{args.size}")
+            if not bundle_exists(bundle_dir):
+                print(f"Writing synthetic {args.size}-title bundle to {bundle_dir}...")
+                write_bundle(bundle_dir, args.size)
+        stub = StubTMDBServer(latency=args.tmdb_latency, error_rate=args.tmdb_error_rate, seed=0).start()
+
+    results = []
+    try:
+        for server, url in targets:
+            proc = None
+            if url is None:
+                print(f"Starting {server} ({server_workers(server, args.workers)} workers)...")
+                proc, url = start_server(server, args, bundle_dir, stub.api_url)
+            try:
+                for concurrency in args.concurrency:
+                    tmdb_before = (stub.requests, stub.errors) if stub else (0, 0)
+                    if proc is not None:
+                        with RSSSampler(proc.pid) as sampler:
+                            samples = run_load(url, concurrency, args.warmup, args.duration, mix)
+                        memory = sampler.summary()
+                    else:
+                        samples = run_load(url, concurrency, args.warmup, args.duration, mix)
+                        memory = {}
+                    overall, endpoints = summarize(samples, args.duration)
+                    results.append({
+                        "server": server,
+                        "workers": server_workers(server, args.workers) if proc is not None else None,
+                        "concurrency": concurrency,
+                        "duration_s": args.duration,
+                        **overall,
+                        **memory,
+                        "tmdb_requests": stub.requests - tmdb_before[0] if stub else None,
+                        "tmdb_errors": stub.errors - tmdb_before[1] if stub else None,
+                        "endpoints": endpoints,
+                    })
+                    print_result(results[-1])
+            finally:
+                if proc is not None:
+                    stop_server(proc)
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({
+                "commit": commit_id(),
+                "size": None if args.url or args.bundle else args.size,
+                "tmdb_latency": args.tmdb_latency,
+                "tmdb_error_rate": args.tmdb_error_rate,
+                "mix": mix,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Model build scaling: TF-IDF plus blocked top-k similarity.
+
+    python -m benchmarks.bench_model_build --sizes 10000 50000 100000 500000 --workers 1 4
+
+Runs `manage.py build_model` on synthetic catalogs in a fresh process per
+run and collects its per-stage wall-clock and peak RSS. The notebook's
+dense cosine_similarity would need 8 * N^2 bytes (shown as dense_gb).
+
+Similarity work grows with N^2, so catalogs above --full-max are only
+partly built: TF-IDF runs in full, then --sample-blocks similarity blocks
+are timed and the graph stage is extrapolated (marked "~"). Peak memory
+of those runs is measured, since it does not depend on the block count.
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import catalog
+
+
+def run(size, workers, k, max_block_mb, directory):
+    movies_file = os.path.join(directory, f"movies_{size}.pkl")
+    if not os.path.exists(movies_file):
+        with open(movies_file, "wb") as f:
+            pickle.dump(catalog(size), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    stats_file = os.path.join(directory, f"stats_{size}_{workers}.json")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run(
+        [sys.executable, os.path.join(root, "manage.py"), "build_model",
+         "--movies", movies_file, "--output", os.path.join(directory, "ml_model.pkl"),
+         "--workers", str(workers), "--k", str(k), "--max-block-mb", str(max_block_mb),
+         "--stats", stats_file],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    with open(stats_file) as f:
+        stats = json.load(f)
+    stats["dense_gb"] = 8 * size * size / 1e9
+    return stats
+
+
+def estimate(size, k, max_block_mb, sample_blocks, directory):
+    """TF-IDF plus a few similarity blocks, in a fresh process."""
+    movies_file = os.path.join(directory, f"movies_{size}.pkl")
+    with open(movies_file, "wb") as f:
+        pickle.dump(catalog(size), f, protocol=pickle.HIGHEST_PROTOCOL)
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_model_build", "--estimate-worker",
+         movies_file, str(k), str(max_block_mb), str(sample_blocks)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    stats = json.loads(output.strip().splitlines()[-1])
+    stats["dense_gb"] = 8 * size * size / 1e9
+    return stats
+
+
+def estimate_worker(movies_file, k, max_block_mb, sample_blocks):
+    import django
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+    django.setup()
+    from Moodflix import similarity
+    from Moodflix.model_build import StageTimer, block_size_for, combined_features, fit_content_matrix
+
+    timer = StageTimer()
+    with timer("load catalog"):
+        with open(movies_file, "rb") as f:
+            movies_df = pickle.load(f)
+    with timer("tf-idf"):
+        content_matrix = fit_content_matrix(combined_features(movies_df))
+
+    n_rows = content_matrix.shape[0]
+    block_size = block_size_for(n_rows, max_block_mb)
+    n_blocks = -(-n_rows // block_size)
+    similarity._init_block_worker(content_matrix.tocsr(), min(k, n_rows - 1), block_size)
+    start = time.perf_counter()
+    for i in range(sample_blocks):
+        similarity._top_k_block(i * block_size)
+    per_block = (time.perf_counter() - start) / sample_blocks
+    timer.record("neighbor graph", per_block * n_blocks)
+
+    print(json.dumps({"movies": n_rows, "block_size": block_size, "workers": 1, "estimated": True,
+                      "total_seconds": sum(stage["seconds"] for stage in timer.stages),
+                      "stages": timer.stages}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--max-block-mb", type=float, default=256)
+    parser.add_argument("--full-max", type=int, default=100000, help="Largest catalog to build completely")
+    parser.add_argument("--sample-blocks", type=int, default=3)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    parser.add_argument("--estimate-worker", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.estimate_worker:
+        movies_file, k, max_block_mb, sample_blocks = args.estimate_worker
+        estimate_worker(movies_file, int(k), float(max_block_mb), int(sample_blocks))
+        return
+
+    results = []
+    print(f"{'size':>8} {'workers':>7} {'tfidf s':>8} {'graph s':>8} {'total s':>8} "
+          f"{'peak MB':>8} {'worker MB':>9} {'dense GB':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            if size > args.full_max:
+                runs = [estimate(size, args.k, args.max_block_mb, args.sample_blocks, directory)]
+            else:
+                runs = [run(size, workers, args.k, args.max_block_mb, directory) for workers in args.workers]
+            for stats in runs:
+                results.append(stats)
+                stages = {stage["stage"]: stage for stage in stats["stages"]}
+                last = stats["stages"][-1]
+                mark = "~" if stats.get("estimated") else " "
+                print(f"{size:>8} {stats['workers']:>7} {stages['tf-idf']['seconds']:>8.1f} "
+                      f"{mark}{stages['neighbor graph']['seconds']:>7.1f} {mark}{stats['total_seconds']:>7.1f} "
+                      f"{last['peak_rss_mb']:>8.0f} {last['worker_peak_rss_mb']:>9.0f} {stats['dense_gb']:>9.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Vectorized mood scoring vs the notebook's per-row loop.
+
+    python -m benchmarks.bench_mood_scoring --sizes 5000 50000 --reference-max 50000
+
+Checks both produce the same scores and reports their runtimes.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from Moodflix.mood_scoring import MOOD_KEYWORD_HINTS, mood_scores, mood_scores_reference
+from benchmarks.synthetic import WORDS, catalog
+
+
+def scoring_frame(n_rows, seed=0):
+    """Synthetic catalog with notebook-style genres and keyword lists."""
+    rng = np.random.default_rng(seed)
+    movies = catalog(n_rows, seed=seed)
+    hints = sorted({hint for hints in MOOD_KEYWORD_HINTS.values() for hint in hints})
+    vocabulary = WORDS + hints + [f"{hint} story" for hint in hints] + [f"keyword {i}" for i in range(2000)]
+    counts = rng.integers(0, 11, n_rows)
+    movies["keyword"] = [list(rng.choice(vocabulary, size=k)) for k in counts]
+    return movies
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(size, reference_max, seed=0):
+    movies = scoring_frame(size, seed=seed)
+    vectorized, vectorized_s = _timed(mood_scores, movies)
+    result = {"size": size, "vectorized_s": vectorized_s, "reference_s": None, "max_abs_diff": None}
+    if size <= reference_max:
+        reference, reference_s = _timed(mood_scores_reference, movies)
+        result["reference_s"] = reference_s
+        result["max_abs_diff"] = float(np.abs(vectorized.to_numpy() - reference.to_numpy()).max())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--reference-max", type=int, default=50000, help="Largest catalog to run the loop on")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'size':>8} {'vectorized s':>13} {'loop s':>9} {'speedup':>8} {'max diff':>9}")
+    for size in args.sizes:
+        result = run(size, args.reference_max)
+        results.append(result)
+        if result["reference_s"] is None:
+            print(f"{size:>8} {result['vectorized_s']:>13.3f} {'skipped':>9}")
+            continue
+        print(f"{size:>8} {result['vectorized_s']:>13.3f} {result['reference_s']:>9.2f} "
+              f"{result['reference_s'] / result['vectorized_s']:>7.0f}x {result['max_abs_diff']:>9.1e}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Exact batched vs approximate (random-projection) similar-movie search.
+
+    python -m benchmarks.bench_neighbors --sizes 5000 50000 500000 --batch 32 --k 10
+
+Reports index build time and bytes, per-query latency of a batch of
+lookups on both paths, and recall@k of the approximate path against the
+exact one. /similar/ serves the exact path until the index beats it at
+recall >= 0.9.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from Moodflix.neighbors import exact_neighbors
+from benchmarks.lsh import RandomProjectionIndex
+from benchmarks.synthetic import tfidf_matrix
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def recall_at_k(approx, exact):
+    hits = [len(set(a[a >= 0]) & set(e)) / max(len(e), 1) for a, e in zip(approx, exact)]
+    return float(np.mean(hits))
+
+
+def run(size, k, batch, n_tables, n_bits, seed=0):
+    rng = np.random.default_rng(seed)
+    content_matrix = tfidf_matrix(size, seed=seed)
+    positions = rng.choice(size, size=min(batch, size), replace=False)
+
+    (exact, _), exact_s = _timed(exact_neighbors, content_matrix, positions, k)
+    index, build_s = _timed(RandomProjectionIndex, content_matrix, n_tables=n_tables, n_bits=n_bits)
+    (approx, _), approx_s = _timed(index.search, positions, k)
+
+    return {
+        "size": size,
+        "k": k,
+        "batch": len(positions),
+        "exact": {"query_ms": exact_s / len(positions) * 1e3},
+        "approximate": {
+            "build_s": build_s,
+            "bytes": index.nbytes,
+            "query_ms": approx_s / len(positions) * 1e3,
+            "recall": recall_at_k(approx, exact),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000, 500000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--tables", type=int, default=16)
+    parser.add_argument("--bits", type=int, default=10)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'size':>8} {'exact ms':>9} {'approx ms':>10} {'recall':>7} {'build s':>8} {'MB':>7}")
+    for size in args.sizes:
+        result = run(size, args.k, args.batch, args.tables, args.bits)
+        results.append(result)
+        approx = result["approximate"]
+        print(f"{size:>8} {result['exact']['query_ms']:>9.2f} {approx['query_ms']:>10.2f} "
+              f"{approx['recall']:>7.3f} {approx['build_s']:>8.2f} {approx['bytes'] / 1e6:>7.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
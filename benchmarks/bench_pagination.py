@@ -0,0 +1,71 @@
+"""
+Page-N latency: offset paging vs cursor paging on /recommendations/.
+
+    python -m benchmarks.bench_pagination --size 20000 --count 10 --pages 50
+
+Offset paging re-runs the diversity selection for offset+count picks on
+every page. Cursor paging continues the previous page's selection. Only
+the selection step is timed (no formatting or posters).
+"""
+import argparse
+import json
+import os
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--mood", default="happy")
+    parser.add_argument("--diversity", type=float, default=0.3)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+    import django
+    django.setup()
+    from django.conf import settings
+
+    from Moodflix.cursors import recommend_page
+    from Moodflix.moods import MOODS
+    from Moodflix.rankings import build_mood_rankings
+    from Moodflix.similarity import build_neighbor_graph
+    from Moodflix.views import get_mood_based_recommendations_proc
+    from benchmarks.synthetic import catalog, tfidf_matrix
+
+    settings.CURSOR_MAX_PAGES = max(settings.CURSOR_MAX_PAGES, args.pages)
+    movies_df = catalog(args.size)
+    graph = build_neighbor_graph(tfidf_matrix(args.size))
+    rankings = build_mood_rankings(movies_df, MOODS)
+
+    report_pages = sorted({1, 2, 5, 10, 20, 30, 40, args.pages} & set(range(1, args.pages + 1)))
+    results = []
+    cursor = None
+    print(f"{'page':>5} {'offset ms':>10} {'cursor ms':>10} {'cursor bytes':>13}")
+    for page in range(1, args.pages + 1):
+        start = time.perf_counter()
+        _, cursor, _ = recommend_page(graph, rankings, args.mood, args.count, args.diversity, "bench", cursor=cursor)
+        cursor_ms = (time.perf_counter() - start) * 1e3
+
+        if page not in report_pages:
+            continue
+        offset = (page - 1) * args.count
+        start = time.perf_counter()
+        get_mood_based_recommendations_proc(
+            movies_df, graph, rankings, args.mood, n=offset + args.count, diversity_factor=args.diversity
+        )[offset:offset + args.count]
+        offset_ms = (time.perf_counter() - start) * 1e3
+
+        cursor_bytes = len(cursor) if cursor else 0
+        results.append({"page": page, "offset_ms": offset_ms, "cursor_ms": cursor_ms, "cursor_bytes": cursor_bytes})
+        print(f"{page:>5} {offset_ms:>10.2f} {cursor_ms:>10.2f} {cursor_bytes:>13}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
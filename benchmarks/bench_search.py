@@ -0,0 +1,83 @@
+"""
+Title search index: build cost, memory and per-keystroke latency.
+
+    python -m benchmarks.bench_search --sizes 10000 100000
+
+Replays every prefix of randomly chosen titles (one query per keystroke)
+against the typeahead path, and misspelled titles against the trigram
+path, reporting p50/p99 latency in microseconds.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from Moodflix.search import build_title_index
+from benchmarks.synthetic import catalog
+
+
+def _latencies_us(fn, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return {"p50_us": float(np.percentile(timings, 50)), "p99_us": float(np.percentile(timings, 99))}
+
+
+def _misspell(title, rng):
+    chars = list(title)
+    i = int(rng.integers(0, len(chars)))
+    chars[i] = "x" if chars[i] != "x" else "y"
+    return "".join(chars)
+
+
+def run(size, n_titles, limit, seed=0):
+    rng = np.random.default_rng(seed)
+    movies_df = catalog(size, seed=seed)
+
+    start = time.perf_counter()
+    index = build_title_index(movies_df)
+    build_s = time.perf_counter() - start
+
+    sample = rng.choice(movies_df["title"].to_numpy(), size=n_titles, replace=False)
+    keystrokes = [title[:i] for title in sample for i in range(1, len(title) + 1)]
+    typos = [_misspell(title, rng) for title in sample]
+
+    return {
+        "size": size,
+        "build_s": build_s,
+        "bytes": index.nbytes,
+        "keystrokes": len(keystrokes),
+        "prefix": _latencies_us(lambda q: index.prefix(q, limit), keystrokes),
+        "fuzzy": _latencies_us(lambda q: index.fuzzy(q, limit), typos),
+        "search": _latencies_us(lambda q: index.search(q, limit), keystrokes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--titles", type=int, default=200, help="Titles to type out per size")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'size':>8} {'build s':>8} {'MB':>7} {'prefix p50/p99 us':>19} "
+          f"{'fuzzy p50/p99 us':>18} {'search p50/p99 us':>19}")
+    for size in args.sizes:
+        result = run(size, args.titles, args.limit)
+        results.append(result)
+        print(f"{size:>8} {result['build_s']:>8.2f} {result['bytes'] / 1e6:>7.1f} "
+              + " ".join(f"{result[path]['p50_us']:>9.0f}/{result[path]['p99_us']:<9.0f}"
+                         for path in ("prefix", "fuzzy", "search")))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
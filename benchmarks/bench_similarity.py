@@ -0,0 +1,95 @@
+"""
+Dense cosine_sim_matrix vs sparse top-k NeighborGraph.
+
+    python -m benchmarks.bench_similarity --sizes 2000 5000 20000 --dense-max 5000
+
+Reports build time, resident bytes of the similarity structure, scalar
+pair lookup latency and the latency of the candidate block read used by
+the diversity step.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from Moodflix.similarity import DEFAULT_TOP_K, build_neighbor_graph
+from benchmarks.synthetic import tfidf_matrix
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _per_call_us(fn, calls):
+    start = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - start) / len(calls) * 1e6
+
+
+def run(size, k, dense_max, pairs, block, seed=0):
+    rng = np.random.default_rng(seed)
+    content_matrix = tfidf_matrix(size, seed=seed)
+    pair_calls = [tuple(p) for p in rng.integers(0, size, size=(pairs, 2))]
+    block_positions = rng.choice(size, size=min(block, size), replace=False)
+
+    graph, graph_build = _timed(build_neighbor_graph, content_matrix, k=k)
+    result = {
+        "size": size,
+        "k": k,
+        "sparse": {
+            "build_s": graph_build,
+            "bytes": graph.nbytes,
+            "pair_us": _per_call_us(graph.similarity, pair_calls),
+            "block_ms": _per_call_us(graph.pairwise, [(block_positions,)] * 20) / 1e3,
+        },
+        "dense": None,
+    }
+
+    if size <= dense_max:
+        dense, dense_build = _timed(cosine_similarity, content_matrix)
+        result["dense"] = {
+            "build_s": dense_build,
+            "bytes": dense.nbytes,
+            "pair_us": _per_call_us(lambda a, b: dense[a][b], pair_calls),
+            "block_ms": _per_call_us(lambda p: dense[np.ix_(p, p)], [(block_positions,)] * 20) / 1e3,
+        }
+        del dense
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 5000, 20000, 100000])
+    parser.add_argument("--k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--dense-max", type=int, default=5000, help="Largest catalog to build densely")
+    parser.add_argument("--pairs", type=int, default=20000)
+    parser.add_argument("--block", type=int, default=250, help="Candidate block size (n*5)")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'size':>8} {'path':>7} {'build s':>9} {'MB':>9} {'pair us':>9} {'block ms':>9}")
+    for size in args.sizes:
+        result = run(size, args.k, args.dense_max, args.pairs, args.block)
+        results.append(result)
+        for path in ("dense", "sparse"):
+            stats = result[path]
+            if stats is None:
+                print(f"{size:>8} {path:>7} {'skipped':>9}")
+                continue
+            print(f"{size:>8} {path:>7} {stats['build_s']:>9.2f} {stats['bytes'] / 1e6:>9.1f} "
+                  f"{stats['pair_us']:>9.2f} {stats['block_ms']:>9.2f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
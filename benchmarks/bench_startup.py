@@ -0,0 +1,119 @@
+"""
+Worker cold start and memory: pickles vs memory-mapped model bundle.
+
+    python -m benchmarks.bench_startup --size 20000 --workers 1 4 8
+
+Starts W worker processes at once; each loads the model the way
+load_ml_model does, touches every array page, and reports load time,
+RSS and PSS (proportional set size, which splits shared pages between
+the processes mapping them). PSS is read from /proc and is Linux only.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import write_pickles
+
+
+WORKER = r"""
+import json, os, sys, time
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+django.setup()
+import numpy as np
+from Moodflix.bundle import load_bundle
+from Moodflix.views import load_model_pickles
+
+mode, movies_file, model_file, bundle_dir = sys.argv[1:5]
+start = time.perf_counter()
+if mode == "bundle":
+    movies_df, content_matrix, graph, _ = load_bundle(bundle_dir)
+else:
+    movies_df, content_matrix, graph = load_model_pickles(movies_file, model_file)
+load_s = time.perf_counter() - start
+
+# Touch every page, as a warm worker eventually does
+checksum = float(content_matrix.data.sum()) + float(graph.scores.sum()) + int(graph.indices.sum())
+
+memory = {}
+try:
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                memory[key.lower() + "_mb"] = int(value.split()[0]) / 1024
+except OSError:
+    pass
+print(json.dumps({"load_s": load_s, **memory}))
+sys.stdout.flush()
+sys.stdin.read()
+"""
+
+
+def run_workers(mode, workers, movies_file, model_file, bundle_dir):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER, mode, movies_file, model_file, bundle_dir],
+            cwd=root, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    # Workers stay alive until all have reported, so shared pages are counted once
+    reports = [json.loads(proc.stdout.readline()) for proc in procs]
+    for proc in procs:
+        proc.stdin.close()
+        proc.wait()
+
+    def mean(key):
+        values = [r[key] for r in reports if key in r]
+        return sum(values) / len(values) if values else None
+
+    pss = [r["pss_mb"] for r in reports if "pss_mb" in r]
+    return {
+        "mode": mode,
+        "workers": workers,
+        "load_s": mean("load_s"),
+        "rss_mb": mean("rss_mb"),
+        "pss_total_mb": sum(pss) if pss else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+    import django
+    django.setup()
+    from Moodflix.bundle import export_bundle
+    from Moodflix.views import load_model_pickles
+
+    with tempfile.TemporaryDirectory() as directory:
+        movies_file, model_file = write_pickles(directory, args.size)
+        bundle_dir = os.path.join(directory, "model_bundle")
+        export_bundle(bundle_dir, *load_model_pickles(movies_file, model_file))
+
+        results = []
+        print(f"{'mode':>8} {'workers':>8} {'load s':>8} {'RSS MB':>8} {'PSS total MB':>13}")
+        for workers in args.workers:
+            for mode in ("pickle", "bundle"):
+                result = run_workers(mode, workers, movies_file, model_file, bundle_dir)
+                results.append(result)
+                pss = f"{result['pss_total_mb']:.1f}" if result["pss_total_mb"] is not None else "n/a"
+                rss = f"{result['rss_mb']:.1f}" if result["rss_mb"] is not None else "n/a"
+                print(f"{mode:>8} {workers:>8} {result['load_s']:>8.3f} {rss:>8} {pss:>13}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Hot-path benchmark suite on synthetic catalogs, saved as JSON per commit.
+
+    python -m benchmarks.bench_suite --sizes 5000 50000 --json before.json
+    python -m benchmarks.bench_suite --sizes 5000 50000 --json after.json --compare before.json
+
+For every catalog size it times:
+
+  load_ml_model       cold load of processed_movies.pkl + ml_model.pkl
+  recommend           get_mood_based_recommendations_proc over a
+                      count x offset x diversity grid
+  format_movie_row    one catalog row to the response dict
+  view_miss/view_hit  GET /recommendations/ through Django's test client,
+                      with the response cache cleared or warm
+
+TMDB is the local stub (benchmarks.tmdb_stub) and the database is a
+throwaway test database. Synthetic pickles are written to --data-dir and
+reused by later runs (the 500k neighbor graph takes a while to build).
+
+--compare prints the change of each median against an earlier run and
+exits with status 1 when one got slower than --threshold. Medians of
+identical code can move 20-50% between runs on a busy single-core
+machine; compare runs from the same host and raise --repeat before
+reading much into a small change.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import write_pickles
+
+
+COUNTS = [10, 50]
+OFFSETS = [0, 50]
+DIVERSITIES = [0.0, 0.3, 0.7]
+
+
+def _timings(fn, repeat, setup=None):
+    # One untimed call first, so lazy imports and caches are not measured
+    if setup:
+        setup()
+    fn(0)
+    timings = []
+    for i in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn(i)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1e3
+    return {"median_ms": float(np.median(timings)), "p95_ms": float(np.percentile(timings, 95)),
+            "repeat": repeat}
+
+
+def commit_id():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return (result["name"], result["size"], json.dumps(result["params"], sort_keys=True))
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nAgainst {baseline_path}:")
+    for result in results:
+        old = baseline.get(result_key(result))
+        if old is None or not old["median_ms"]:
+            continue
+        ratio = result["median_ms"] / old["median_ms"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"  {result['name']:>17} {result['size']:>7} {json.dumps(result['params']):<45} "
+              f"{old['median_ms']:>9.3f} -> {result['median_ms']:>9.3f} ms ({ratio:.2f}x){flag}")
+    return regressions
+
+
+def run_size(size, data_dir, repeat):
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.test import Client
+
+    from Moodflix import views
+    from Moodflix.moods import MOODS
+
+    directory = os.path.join(data_dir, f"catalog_{size}")
+    movies_file = os.path.join(directory, "processed_movies.pkl")
+    model_file = os.path.join(directory, "ml_model.pkl")
+    if not (os.path.exists(movies_file) and os.path.exists(model_file)):
+        print(f"Writing synthetic {size}-row catalog to {directory}...")
+        write_pickles(directory, size)
+    views.model_pickle_paths = lambda: (movies_file, model_file)
+
+    def unload():
+        views._snapshot = None
+
+    results = []
+
+    def record(name, params, timing):
+        result = {"name": name, "size": size, "params": params, **timing}
+        results.append(result)
+        print(f"{name:>17} {size:>7} {json.dumps(params):<45} "
+              f"{timing['median_ms']:>9.3f} {timing['p95_ms']:>9.3f}")
+
+    record("load_ml_model", {}, _timings(lambda i: views.load_ml_model(), max(2, repeat // 20), setup=unload))
+    movies_df, _, sim_graph, rankings = views.load_ml_model()
+
+    for count in COUNTS:
+        for offset in OFFSETS:
+            for diversity in DIVERSITIES:
+                record("recommend", {"count": count, "offset": offset, "diversity": diversity}, _timings(
+                    lambda i: views.get_mood_based_recommendations_proc(
+                        movies_df, sim_graph, rankings, MOODS[i % len(MOODS)],
+                        n=offset + count, diversity_factor=diversity,
+                    ), repeat,
+                ))
+
+    labels = movies_df.index[np.random.default_rng(0).integers(0, len(movies_df), repeat)]
+    record("format_movie_row", {}, _timings(lambda i: views.format_movie_row(movies_df.loc[labels[i]]), repeat))
+
+    client = Client()
+    responses = caches[settings.RESPONSE_CACHE_ALIAS]
+
+    def request(i):
+        response = client.get("/recommendations/", {"mood": MOODS[i % len(MOODS)], "count": 10})
+        assert response.status_code == 200, response.content
+
+    # First pass fills the poster caches, so misses measure our own work
+    for i in range(len(MOODS)):
+        request(i)
+    record("view_miss", {"count": 10}, _timings(request, repeat, setup=responses.clear))
+    record("view_hit", {"count": 10}, _timings(request, repeat))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--repeat", type=int, default=100, help="Timed calls per measurement")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "moodflix_bench"),
+                        help="Where synthetic pickles are written and reused")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    parser.add_argument("--compare", help="Earlier --json output to compare medians against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    from Moodflix import posters
+    from benchmarks.tmdb_stub import StubTMDBServer
+
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = ["testserver"]
+    settings.MODEL_BUNDLE_DIR = os.path.join(args.data_dir, "no_bundle")
+    old_name = connection.creation.create_test_db(verbosity=0)
+    server = StubTMDBServer().start()
+    settings.TMDB_API_URL = server.api_url
+    posters._resolver = None
+
+    results = []
+    print(f"{'benchmark':>17} {'size':>7} {'params':<45} {'median ms':>9} {'p95 ms':>9}")
+    try:
+        for size in args.sizes:
+            results.extend(run_size(size, args.data_dir, args.repeat))
+    finally:
+        server.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    report = {
+        "commit": commit_id(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpus": len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count(),
+        "results": results,
+    }
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Surprise throughput on a single core.
+
+    python -m benchmarks.bench_surprise --sizes 5000 100000 --count 10
+
+Reports the alias-table build time at model load, sampler draws/s
+(k distinct titles per draw) and end-to-end /surprise/ requests/s through
+the Django view. Posters are pre-filled so no TMDB calls are made.
+"""
+import argparse
+import json
+import os
+import time
+
+
+def _rate(fn, seconds):
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn(calls)
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 100000])
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=3.0, help="Time spent on each measurement")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Main.settings")
+    import django
+    django.setup()
+    os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+    from django.test import RequestFactory
+
+    from Moodflix import views
+    from Moodflix.moods import MOODS
+    from Moodflix.rankings import build_mood_rankings
+    from Moodflix.snapshot import ModelSnapshot
+    from Moodflix.surprise import build_surprise_sampler
+    from benchmarks.synthetic import catalog
+
+    factory = RequestFactory()
+    results = []
+    print(f"{'size':>8} {'build s':>8} {'draws/s':>9} {'mood draws/s':>13} {'requests/s':>11}")
+    for size in args.sizes:
+        movies_df = catalog(size)
+        movies_df["poster_path"] = "/bench.jpg"
+
+        start = time.perf_counter()
+        sampler = build_surprise_sampler(movies_df, MOODS)
+        build_s = time.perf_counter() - start
+
+        views._snapshot = ModelSnapshot(movies_df, None, None, build_mood_rankings(movies_df, MOODS),
+                                        surprise_sampler=sampler)
+        body = json.dumps({"count": args.count})
+
+        def request(i):
+            response = views.get_surprise_recommendations(
+                factory.post("/surprise/", body, content_type="application/json"))
+            assert response.status_code == 200
+
+        result = {
+            "size": size,
+            "count": args.count,
+            "build_s": build_s,
+            "draws_per_s": _rate(lambda i: sampler.sample(args.count, seed=i), args.seconds),
+            "mood_draws_per_s": _rate(lambda i: sampler.sample(args.count, mood=MOODS[i % len(MOODS)], seed=i),
+                                      args.seconds),
+            "requests_per_s": _rate(request, args.seconds),
+        }
+        results.append(result)
+        print(f"{size:>8} {build_s:>8.2f} {result['draws_per_s']:>9.0f} "
+              f"{result['mood_draws_per_s']:>13.0f} {result['requests_per_s']:>11.0f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
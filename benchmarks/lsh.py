@@ -0,0 +1,90 @@
+"""
+Random-projection (SimHash) index, measured against exact search by
+bench_neighbors.py.
+
+/similar/ does not use it: TF-IDF neighbors are too far apart in angle
+for SimHash buckets to reach recall 0.9 without probing most of the
+catalog, which is slower than Moodflix.neighbors.exact_neighbors.
+"""
+import numpy as np
+from scipy import sparse
+
+from Moodflix.neighbors import top_k_columns
+
+
+class RandomProjectionIndex:
+    """
+    Signed random projection (SimHash) index for cosine similarity.
+
+    Every title gets `n_tables` hash codes of `n_bits` bits each, one bit
+    per random hyperplane. A query's candidates are the titles sharing a
+    code with it in any table (optionally also codes one bit away); they
+    are re-ranked with exact sparse dot products.
+    """
+
+    def __init__(self, content_matrix, n_tables=16, n_bits=10, probe_radius=1, seed=0):
+        self.content_matrix = sparse.csr_matrix(content_matrix)
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.probe_radius = probe_radius
+
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((self.content_matrix.shape[1], n_tables * n_bits)).astype(np.float32)
+        self.bit_values = (1 << np.arange(n_bits)).astype(np.int64)
+
+        codes = self._codes(self.content_matrix)
+        # Per table: positions sorted by code, so a bucket is a searchsorted range
+        self.order = np.argsort(codes, axis=0, kind="stable")
+        self.sorted_codes = np.take_along_axis(codes, self.order, axis=0)
+
+    @property
+    def nbytes(self):
+        return self.planes.nbytes + self.order.nbytes + self.sorted_codes.nbytes
+
+    def _codes(self, rows):
+        projected = np.asarray(rows @ self.planes)
+        bits = (projected > 0).reshape(len(projected), self.n_tables, self.n_bits)
+        return bits.astype(np.int64) @ self.bit_values
+
+    def _probe_codes(self, codes):
+        """B x T codes -> B x T x P codes to probe (P = 1 + n_bits at radius 1)."""
+        probes = codes[:, :, None]
+        if self.probe_radius >= 1:
+            flipped = codes[:, :, None] ^ self.bit_values[None, None, :]
+            probes = np.concatenate([probes, flipped], axis=2)
+        return probes
+
+    def candidates(self, code_row):
+        return self._candidates(self._probe_codes(np.asarray(code_row)[None, :]))[0]
+
+    def _candidates(self, probes):
+        """Bucket members for every query, one searchsorted per table."""
+        n_queries = len(probes)
+        found = [[] for _ in range(n_queries)]
+        for table in range(self.n_tables):
+            column = self.sorted_codes[:, table]
+            table_probes = probes[:, table, :]
+            starts = np.searchsorted(column, table_probes, side="left")
+            ends = np.searchsorted(column, table_probes, side="right")
+            order = self.order[:, table]
+            for i, j in zip(*np.nonzero(ends > starts)):
+                found[i].append(order[starts[i, j]:ends[i, j]])
+        return [np.unique(np.concatenate(f)) if f else np.zeros(0, dtype=np.int64) for f in found]
+
+    def search(self, positions, k):
+        positions = np.asarray(positions, dtype=np.int64)
+        query_rows = self.content_matrix[positions]
+        candidate_lists = self._candidates(self._probe_codes(self._codes(query_rows)))
+
+        all_indices = np.full((len(positions), k), -1, dtype=np.int64)
+        all_scores = np.full((len(positions), k), -np.inf)
+        for i, (pos, candidates) in enumerate(zip(positions, candidate_lists)):
+            candidates = candidates[candidates != pos]
+            if len(candidates) == 0:
+                continue
+            scores = (self.content_matrix[candidates] @ query_rows[i].T).toarray()
+            indices, top_scores = top_k_columns(scores, k)
+            found = indices.shape[1]
+            all_indices[i, :found] = candidates[indices[0]]
+            all_scores[i, :found] = top_scores[0]
+        return all_indices, all_scores
@@ -0,0 +1,144 @@
+"""
+Synthetic data shaped like the artifacts in Data/.
+
+Used by the scripts in this package so they can run without the TMDB
+dataset checked out.
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from Moodflix.moods import MOODS
+
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary",
+    "Drama", "Family", "Fantasy", "History", "Horror", "Music", "Mystery",
+    "Romance", "Science Fiction", "Thriller", "War", "Western",
+]
+WORDS = (
+    "love war friend family journey secret city night life death dream "
+    "world team heart past future truth hero mission island"
+).split()
+
+
+def tfidf_matrix(n_rows, n_features=5000, terms_per_row=40, seed=0):
+    """
+    L2-normalized sparse matrix resembling TfidfVectorizer output.
+
+    Term ids follow a Zipf-like distribution so that rows share vocabulary
+    the way real overviews do, which gives a realistic similarity spread.
+    """
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, n_features + 1) ** 0.8
+    weights /= weights.sum()
+
+    cols = rng.choice(n_features, size=(n_rows, terms_per_row), p=weights)
+    cols.sort(axis=1)
+    rows = np.repeat(np.arange(n_rows), terms_per_row)
+    data = rng.random(n_rows * terms_per_row) + 0.1
+
+    matrix = sparse.csr_matrix((data, (rows, cols.ravel())), shape=(n_rows, n_features))
+    matrix.sum_duplicates()
+    norms = np.sqrt(matrix.multiply(matrix).sum(axis=1)).A1
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix)
+
+
+def vocabulary(size=20000, seed=0):
+    """Pseudo-words built from syllables, the first ones taken from WORDS."""
+    rng = np.random.default_rng(seed)
+    syllables = ["ka", "lo", "mi", "ra", "ten", "vo", "shi", "an", "el", "dor", "qu", "is", "ne", "bar", "ul"]
+    words = ["".join(rng.choice(syllables, size=rng.integers(1, 4))) for _ in range(size)]
+    words[:len(WORDS)] = WORDS
+    return words
+
+
+def _zipf_words(n_words, words, rng, exponent):
+    weights = 1.0 / np.arange(1, len(words) + 1) ** exponent
+    return rng.choice(words, size=n_words, p=weights / weights.sum())
+
+
+def titles(n_rows, vocabulary_size=20000, seed=0):
+    """
+    Title strings of 1-5 pseudo-words drawn Zipf-like from a large
+    vocabulary, with a share of leading articles like real catalogs.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, 6, n_rows)
+    words = _zipf_words(lengths.sum(), vocabulary(vocabulary_size, seed), rng, 0.9)
+    split = np.split(words, np.cumsum(lengths)[:-1])
+    articles = rng.choice(["", "", "", "The ", "A "], size=n_rows)
+    return [f"{article}{' '.join(w).title()}" for article, w in zip(articles, split)]
+
+
+def overviews(n_rows, words_per_row=40, vocabulary_size=20000, seed=0):
+    """Plot summaries of Zipf-drawn pseudo-words, for TF-IDF builds."""
+    rng = np.random.default_rng(seed + 1)
+    lengths = rng.integers(words_per_row // 2, words_per_row * 3 // 2, n_rows)
+    words = _zipf_words(lengths.sum(), vocabulary(vocabulary_size, seed), rng, 1.0)
+    return [" ".join(w) for w in np.split(words, np.cumsum(lengths)[:-1])]
+
+
+def catalog(n_rows, seed=0):
+    """DataFrame with the columns of processed_movies.pkl that the views read."""
+    rng = np.random.default_rng(seed)
+
+    genre_counts = rng.integers(1, 4, n_rows)
+    genre_names = [list(rng.choice(GENRES, size=k, replace=False)) for k in genre_counts]
+    cast_names = [[f"Actor {a}" for a in rng.integers(0, n_rows // 2 + 10, 5)] for _ in range(n_rows)]
+    days = rng.integers(0, 365 * 80, n_rows)
+    release_dates = (np.datetime64("1940-01-01") + days.astype("timedelta64[D]")).astype(str)
+
+    movies_df = pd.DataFrame({
+        "id": np.arange(n_rows) + 1,
+        "title": titles(n_rows, seed=seed),
+        "overview": overviews(n_rows, seed=seed),
+        "genres": genre_names,
+        "genre_names": genre_names,
+        "vote_average": np.round(np.clip(rng.normal(6.3, 1.0, n_rows), 1, 10), 1),
+        "vote_count": rng.integers(50, 15000, n_rows),
+        "popularity": np.round(rng.lognormal(2.5, 1.0, n_rows), 3),
+        "release_date": release_dates,
+        "runtime": rng.integers(70, 200, n_rows).astype(float),
+        "cast_names": cast_names,
+        "director": [f"Director {d}" for d in rng.integers(0, n_rows // 5 + 10, n_rows)],
+    })
+    for mood in MOODS:
+        movies_df[f"mood_{mood}_score"] = np.round(rng.uniform(0, 12, n_rows), 2)
+
+    # Preprocessing drops rows, so labels are not 0..N-1
+    movies_df.index = np.sort(rng.choice(n_rows * 2, size=n_rows, replace=False))
+    return movies_df
+
+
+def write_pickles(directory, n_rows, seed=0, k=50):
+    """Write processed_movies.pkl and ml_model.pkl for a synthetic catalog."""
+    from Moodflix.similarity import build_neighbor_graph
+
+    os.makedirs(directory, exist_ok=True)
+    movies_df = catalog(n_rows, seed=seed)
+    content_matrix = tfidf_matrix(n_rows, seed=seed)
+    model_data = {"content_matrix": content_matrix}
+    model_data.update(build_neighbor_graph(content_matrix, k=k).to_dict())
+
+    movies_file = os.path.join(directory, "processed_movies.pkl")
+    model_file = os.path.join(directory, "ml_model.pkl")
+    with open(movies_file, "wb") as f:
+        pickle.dump(movies_df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(model_file, "wb") as f:
+        pickle.dump(model_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return movies_file, model_file
+
+
+def write_bundle(directory, n_rows, seed=0, k=50):
+    """Write a model bundle (see Moodflix.bundle) for a synthetic catalog."""
+    from Moodflix.bundle import export_bundle
+    from Moodflix.similarity import build_neighbor_graph
+
+    content_matrix = tfidf_matrix(n_rows, seed=seed)
+    return export_bundle(directory, catalog(n_rows, seed=seed), content_matrix,
+                         build_neighbor_graph(content_matrix, k=k))
@@ -0,0 +1,112 @@
+"""
+Local stand-in for api.themoviedb.org.
+
+Serves GET /3/movie/<id> with a deterministic poster_path, with optional
+latency and error injection. Point TMDB_API_URL at it:
+
+    python -m benchmarks.tmdb_stub --port 8765 --latency 0.05 --error-rate 0.01
+    TMDB_API_URL=http://127.0.0.1:8765/3 python manage.py runserver
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+MOVIE_PATH = re.compile(r"^/3/movie/(\d+)")
+
+
+class StubTMDBServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0,
+                 slow_ids=(), missing_ids=(), seed=None):
+        super().__init__((host, port), StubTMDBHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.slow_ids = set(slow_ids)
+        self.missing_ids = set(missing_ids)
+        self.slow_latency = 5.0
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @property
+    def api_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/3"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    @staticmethod
+    def poster_for(tmdb_id):
+        return f"/stub/{tmdb_id}.jpg"
+
+
+class StubTMDBHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server._lock:
+            server.requests += 1
+            fail = server.random.random() < server.error_rate
+            if fail:
+                server.errors += 1
+
+        match = MOVIE_PATH.match(self.path)
+        tmdb_id = int(match.group(1)) if match else None
+
+        delay = server.slow_latency if tmdb_id in server.slow_ids else server.latency
+        if delay:
+            time.sleep(delay)
+
+        if fail:
+            self._reply(500, {"status_message": "stub error"})
+        elif tmdb_id is None or tmdb_id in server.missing_ids:
+            self._reply(404, {"status_message": "not found"})
+        else:
+            self._reply(200, {"id": tmdb_id, "poster_path": server.poster_for(tmdb_id)})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of replies that are HTTP 500")
+    args = parser.parse_args()
+
+    server = StubTMDBServer(args.host, args.port, latency=args.latency, error_rate=args.error_rate)
+    print(f"Stub TMDB listening on {server.api_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()